@@ -0,0 +1,56 @@
+"""
+Micro-benchmark of the catalog work done by the shop, template and profile views on each request.
+
+Run from the repository root with: python benchmarks/catalog.py
+"""
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'mysite.settings')
+
+import django  # noqa: E402
+
+django.setup()
+
+from qa_rpg.catalog import catalog  # noqa: E402
+from qa_rpg.items_catalog import ItemCatalog  # noqa: E402
+from qa_rpg.template_question import TemplateCatalog  # noqa: E402
+
+NUMBER = 20000
+OWNED = {0: 2, 1: 1, 5: 3, 102: 1}
+items, templates = ItemCatalog(), TemplateCatalog()
+
+
+def legacy_shop():
+    """Build the shop listings the way ShopView.get did before the catalogs were compiled."""
+    template = {}
+    for index in templates.get_all_templates().keys():
+        template[" ".join(templates.get_template(index)) + " ?"] = [templates.get_price(index), index]
+    return items.get_store_items(), template
+
+
+def legacy_available():
+    """Build the owned templates the way get_available_template did before the catalogs were compiled."""
+    return {" ".join(templates.get_template(index)) + " ?": [index, value] for index, value in OWNED.items()}
+
+
+def main():
+    results = {
+        "shop listings (legacy)": timeit.timeit(legacy_shop, number=NUMBER),
+        "shop listings (compiled)": timeit.timeit(lambda: (catalog.store_items, catalog.shop_templates),
+                                                  number=NUMBER),
+        "owned templates (legacy)": timeit.timeit(legacy_available, number=NUMBER),
+        "owned templates (compiled)": timeit.timeit(
+            lambda: {catalog.template_texts[index]: [index, value] for index, value in OWNED.items()},
+            number=NUMBER),
+        "chest items (legacy)": timeit.timeit(items.get_chest_items, number=NUMBER),
+        "chest items (compiled)": timeit.timeit(lambda: catalog.chest_items, number=NUMBER),
+    }
+    for name, seconds in results.items():
+        print(f"{name:28} {seconds / NUMBER * 1e6:8.3f} us/call")
+
+
+if __name__ == '__main__':
+    main()
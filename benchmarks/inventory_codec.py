@@ -0,0 +1,47 @@
+"""
+Micro-benchmark of reading and writing inventories on the hot paths of the dungeon views.
+
+Run from the repository root with: python benchmarks/inventory_codec.py
+"""
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'mysite.settings')
+
+import django  # noqa: E402
+
+django.setup()
+
+from qa_rpg.inventory_codec import encode_counts  # noqa: E402
+from qa_rpg.models import Inventory  # noqa: E402
+
+NUMBER = 100000
+RAW = encode_counts({item_id: item_id + 1 for item_id in range(8)})
+
+
+def legacy_get_inventory(raw):
+    """Parse the inventory string the way Inventory.get_inventory did before the decoded form was kept."""
+    dict_item = {}
+    for item in raw.split(';')[:-1]:
+        item_list = item.split(":")
+        dict_item[int(item_list[0])] = int(item_list[1])
+    return dict_item
+
+
+def main():
+    inventory = Inventory(dungeon_inventory=RAW)
+    inventory.get_inventory("dungeon")
+    results = {
+        "legacy parse per read": timeit.timeit(lambda: legacy_get_inventory(inventory.dungeon_inventory),
+                                               number=NUMBER),
+        "get_inventory (decoded once)": timeit.timeit(lambda: inventory.get_inventory("dungeon"), number=NUMBER),
+        "has_room (decoded once)": timeit.timeit(lambda: inventory.has_room(3), number=NUMBER),
+    }
+    for name, seconds in results.items():
+        print(f"{name:32} {seconds / NUMBER * 1e6:8.3f} us/call")
+
+
+if __name__ == '__main__':
+    main()
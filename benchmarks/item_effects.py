@@ -0,0 +1,73 @@
+"""
+Micro-benchmark of applying item effects with the compiled effect table against the item subclasses
+it replaced, loaded from the BASELINE commit of the repository.
+
+Run from the repository root with: python benchmarks/item_effects.py
+"""
+import os
+import random
+import subprocess
+import sys
+import timeit
+import types
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from qa_rpg.items_catalog import ITEM_TABLE, STATS, EffectContext, ItemCatalog, apply_effect, \
+    apply_effects  # noqa: E402
+
+# Last commit with one Item subclass per item.
+BASELINE = "0202972"
+NUMBER = 20
+USES = 10000
+item_ids = [random.choice(list(ITEM_TABLE)) for _ in range(USES)]
+contexts = [EffectContext(coin=random.randrange(5, 40), escape=0.3, damage=random.randrange(5, 40), health=100)
+            for _ in range(USES)]
+
+
+def load_baseline():
+    """Return the item catalog module of the BASELINE commit."""
+    source = subprocess.run(["git", "show", f"{BASELINE}:qa_rpg/items_catalog.py"], cwd=ROOT,
+                            capture_output=True, text=True, check=True).stdout
+    module = types.ModuleType("baseline_items_catalog")
+    exec(compile(source, "baseline_items_catalog.py", "exec"), module.__dict__)
+    return module
+
+
+def method_uses(items):
+    """Apply every stat of each use through the modifier methods of the items of a catalog."""
+    results = []
+    for item_id, context in zip(item_ids, contexts):
+        item = items.get_item(item_id)
+        results.append((item.coin_modifier(context.coin), item.escape_modifier(context.escape),
+                        item.damage_modifier(context.damage), item.health_modifier(context.health),
+                        item.item_modifier(context.item)))
+    return results
+
+
+def single_uses():
+    """Apply every stat of each use with the single item fast path, the way the views do."""
+    results = []
+    for item_id, context in zip(item_ids, contexts):
+        results.append((apply_effect(item_id, "coin", context.coin), apply_effect(item_id, "escape", context.escape),
+                        apply_effect(item_id, "damage", context.damage),
+                        apply_effect(item_id, "health", context.health), apply_effect(item_id, "item", context.item)))
+    return results
+
+
+def main():
+    baseline = load_baseline().ItemCatalog()
+    items = ItemCatalog()
+    results = {
+        f"{USES} uses (subclasses)": timeit.timeit(lambda: method_uses(baseline), number=NUMBER),
+        f"{USES} uses (methods)": timeit.timeit(lambda: method_uses(items), number=NUMBER),
+        f"{USES} uses (apply_effect)": timeit.timeit(single_uses, number=NUMBER),
+        f"{USES} uses (batch)": timeit.timeit(lambda: apply_effects(item_ids, contexts, STATS), number=NUMBER),
+    }
+    for name, seconds in results.items():
+        print(f"{name:28} {seconds / NUMBER * 1e3:8.3f} ms/batch")
+
+
+if __name__ == '__main__':
+    main()
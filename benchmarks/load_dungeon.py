@@ -0,0 +1,164 @@
+"""
+Load test of many players clicking through the dungeon at once, served by the sync views through the WSGI
+handler or by the async views through the ASGI handler.
+
+Each mode runs in its own process on a fresh database file with the production-sqlite profile. Every player
+walks, answers the monsters they meet and opens the chests they find, the script reports the requests per
+second and the latency percentiles of the clicks.
+
+Run from the repository root with: python benchmarks/load_dungeon.py
+"""
+import asyncio
+import os
+import re
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from urllib.parse import urlencode
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MODES = {"wsgi": "False", "asgi": "True"}
+PLAYERS = 32
+CLICKS = 40
+QUESTIONS = 30
+FORM = "application/x-www-form-urlencoded"
+CHECK_URL = re.compile(r"/dungeon/battle/check/(\d+)")
+
+
+def percentile(latencies: list, fraction: float):
+    """Return the latency below which the fraction of the sorted latencies falls."""
+    return latencies[min(len(latencies) - 1, int(len(latencies) * fraction))]
+
+
+def next_click(response, answers: dict):
+    """
+    Return the method, path and form of the click a player makes after a response. Redirects are followed,
+    monsters are answered correctly and chests are picked up, on any other page the player walks.
+    """
+    from django.urls import reverse
+    if response.status_code == 302:
+        return "get", response["Location"], None
+    path = response.request.get("PATH_INFO", response.request.get("path"))
+    if path == reverse("qa_rpg:battle"):
+        question_id = int(CHECK_URL.search(response.content.decode()).group(1))
+        return "post", reverse("qa_rpg:check", args=(question_id,)), {"choice": answers[question_id],
+                                                                      "option": "not select"}
+    if path == reverse("qa_rpg:treasure"):
+        return "post", reverse("qa_rpg:treasure_action"), {"action": "pick up"}
+    return "post", reverse("qa_rpg:action"), {"action": "walk"}
+
+
+def setup_players():
+    """Migrate a fresh database and create the players in the dungeon and the questions they fight."""
+    from django.core.management import call_command
+    from django.db import connection
+    from qa_rpg.models import Choice, Inventory, Log, Player, Question, User
+
+    call_command("migrate", verbosity=0)
+    owner = User.objects.create_user(username="owner")
+    answers = {}
+    for index in range(QUESTIONS):
+        question = Question.objects.create(question_text=f"Question {index}?", owner=owner)
+        answers[question.id] = Choice.objects.create(question=question, choice_text="yes", correct_answer=True).id
+        Choice.objects.create(question=question, choice_text="no", correct_answer=False)
+    users = []
+    for index in range(PLAYERS):
+        user = User.objects.create_user(username=f"player{index}")
+        player = Player.objects.create(user=user, activity="dungeon")
+        Log.objects.create(player=player)
+        Inventory.objects.create(player=player)
+        users.append(user)
+    connection.close()
+    return users, answers
+
+
+def run_wsgi(users, answers, latencies):
+    """Click with one thread per player through the sync handler, closing connections as a request would."""
+    from django.db import close_old_connections, connection
+    from django.test import Client
+
+    def play(user):
+        client = Client()
+        client.force_login(user)
+        method, path, form = "post", "/qa_rpg/dungeon/action", {"action": "walk"}
+        for _ in range(CLICKS):
+            started = time.perf_counter()
+            if method == "get":
+                response = client.get(path)
+            else:
+                response = client.post(path, urlencode(form), content_type=FORM)
+            latencies.append(time.perf_counter() - started)
+            close_old_connections()
+            method, path, form = next_click(response, answers)
+        connection.close()
+
+    threads = [threading.Thread(target=play, args=(user,)) for user in users]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+
+def run_asgi(users, answers, latencies):
+    """Click with one task per player through the async handler."""
+    from django.test import AsyncClient
+
+    clients = []
+    for user in users:
+        clients.append(AsyncClient())
+        clients[-1].force_login(user)
+
+    async def play(client):
+        method, path, form = "post", "/qa_rpg/dungeon/action", {"action": "walk"}
+        for _ in range(CLICKS):
+            started = time.perf_counter()
+            if method == "get":
+                response = await client.get(path)
+            else:
+                response = await client.post(path, urlencode(form), content_type=FORM)
+            latencies.append(time.perf_counter() - started)
+            method, path, form = next_click(response, answers)
+
+    async def main():
+        await asyncio.gather(*(play(client) for client in clients))
+
+    asyncio.run(main())
+
+
+def run_mode(mode: str):
+    """Run the load of one mode and print its requests per second and latency percentiles in milliseconds."""
+    sys.path.insert(0, ROOT)
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'mysite.settings')
+    import django
+    django.setup()
+    from django.test.utils import setup_test_environment
+
+    setup_test_environment()
+    users, answers = setup_players()
+    latencies = []
+    started = time.perf_counter()
+    (run_asgi if mode == "asgi" else run_wsgi)(users, answers, latencies)
+    seconds = time.perf_counter() - started
+    latencies.sort()
+    print(len(latencies) / seconds, *(percentile(latencies, fraction) * 1000 for fraction in (0.5, 0.95, 0.99)))
+
+
+def main():
+    print(f"{PLAYERS} players, {CLICKS} clicks each")
+    for mode, async_views in MODES.items():
+        with tempfile.TemporaryDirectory() as directory:
+            env = dict(os.environ, DATABASE_PROFILE="production-sqlite", ASYNC_DUNGEON_VIEWS=async_views,
+                       DATABASE_NAME=os.path.join(directory, "load.sqlite3"))
+            output = subprocess.run([sys.executable, os.path.abspath(__file__), mode], env=env, cwd=ROOT,
+                                    check=True, capture_output=True, text=True).stdout.split()
+        throughput, p50, p95, p99 = (float(value) for value in output[-4:])
+        print(f"{mode:5} {throughput:8.1f} requests/s   p50 {p50:7.2f} ms   p95 {p95:7.2f} ms   p99 {p99:7.2f} ms")
+
+
+if __name__ == '__main__':
+    if len(sys.argv) > 1 and sys.argv[1] in MODES:
+        run_mode(sys.argv[1])
+    else:
+        main()
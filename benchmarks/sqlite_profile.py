@@ -0,0 +1,87 @@
+"""
+Concurrency benchmark of simultaneous dungeon clicks on the development and production-sqlite database profiles.
+
+Each profile runs in its own process on a fresh database file, with one thread per player walking in the dungeon.
+Every click writes the run to the database and connections are handled as at the end of a real request.
+
+Run from the repository root with: python benchmarks/sqlite_profile.py
+"""
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PROFILES = ("development", "production-sqlite")
+PLAYERS = 8
+CLICKS = 60
+
+
+def run_profile():
+    """Migrate a fresh database, walk every player concurrently and print clicks per second and failed clicks."""
+    sys.path.insert(0, ROOT)
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'mysite.settings')
+    import django
+    django.setup()
+
+    from django.core.management import call_command
+    from django.db import close_old_connections, connection
+    from django.test import Client
+    from django.test.utils import setup_test_environment
+    from django.urls import reverse
+    from qa_rpg.models import Activity, Inventory, Log, Player, User
+
+    setup_test_environment()
+    call_command("migrate", verbosity=0)
+    users = []
+    for index in range(PLAYERS):
+        user = User.objects.create_user(username=f"walker{index}")
+        player = Player.objects.create(user=user, activity="dungeon")
+        Log.objects.create(player=player)
+        Inventory.objects.create(player=player)
+        users.append(user)
+    connection.close()
+    failures = []
+
+    def walk(user):
+        client = Client()
+        client.force_login(user)
+        for _ in range(CLICKS):
+            try:
+                Player.objects.filter(user=user).update(activity_state=Activity.DUNGEON, status="")
+                response = client.post(reverse("qa_rpg:action"), {"action": "walk"})
+                if response.status_code != 302:
+                    failures.append(response.status_code)
+            except Exception as error:  # noqa: B902, a locked database fails the click
+                failures.append(error)
+            close_old_connections()
+        connection.close()
+
+    threads = [threading.Thread(target=walk, args=(user,)) for user in users]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    seconds = time.perf_counter() - started
+    print(f"{PLAYERS * CLICKS / seconds:.1f} {len(failures)}")
+
+
+def main():
+    for profile in PROFILES:
+        with tempfile.TemporaryDirectory() as directory:
+            env = dict(os.environ, DATABASE_PROFILE=profile, DUNGEON_CHECKPOINT_CLICKS="0",
+                       DATABASE_NAME=os.path.join(directory, "benchmark.sqlite3"))
+            output = subprocess.run([sys.executable, os.path.abspath(__file__), "--run"], env=env, cwd=ROOT,
+                                    check=True, capture_output=True, text=True).stdout.split()
+        throughput, failures = output[-2:]
+        print(f"{profile:18} {float(throughput):8.1f} clicks/s {int(failures):5d} failed clicks")
+
+
+if __name__ == '__main__':
+    if "--run" in sys.argv:
+        run_profile()
+    else:
+        main()
@@ -13,6 +13,7 @@ https://docs.djangoproject.com/en/4.1/ref/settings/
 from decouple import config
 from pathlib import Path
 import os
+import tempfile
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -56,6 +57,8 @@ MIDDLEWARE = [
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
+    'qa_rpg.middleware.UnitOfWorkMiddleware',
+    'qa_rpg.middleware.GameContextMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
     "django_browser_reload.middleware.BrowserReloadMiddleware",
 ]
@@ -123,10 +126,94 @@ WSGI_APPLICATION = 'mysite.wsgi.application'
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+        'NAME': config('DATABASE_NAME', cast=str, default=BASE_DIR / 'db.sqlite3'),
+        # A file instead of the shared in-memory database, so tests can write from several connections at once.
+        'TEST': {
+            'NAME': config('TEST_DATABASE_NAME', cast=str,
+                           default=os.path.join(tempfile.gettempdir(), 'qa-rpg-test.sqlite3')),
+        },
     }
 }
 
+# Pragmas run on every new SQLite connection.
+SQLITE_PRAGMAS = {}
+
+# The production-sqlite profile keeps connections open between requests and runs SQLite in WAL mode,
+# so readers do not wait for the game writers and a writer waits for the lock instead of failing.
+DATABASE_PROFILE = config('DATABASE_PROFILE', cast=str, default='development')
+if DATABASE_PROFILE == 'production-sqlite':
+    DATABASES['default']['CONN_MAX_AGE'] = config('CONN_MAX_AGE', cast=int, default=600)
+    DATABASES['default']['CONN_HEALTH_CHECKS'] = True
+    SQLITE_PRAGMAS = {
+        'journal_mode': 'WAL',
+        'synchronous': 'NORMAL',
+        'busy_timeout': config('SQLITE_BUSY_TIMEOUT', cast=int, default=5000),
+        'mmap_size': config('SQLITE_MMAP_SIZE', cast=int, default=128 * 1024 * 1024),
+    }
+
+# Cache
+# https://docs.djangoproject.com/en/4.1/topics/cache/
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'qa-rpg',
+        'OPTIONS': {
+            'MAX_ENTRIES': config('CACHE_MAX_ENTRIES', cast=int, default=10000),
+        },
+    },
+    # Dungeon runs between their checkpoints, apart from the default cache so that its culling never drops a run.
+    # Every worker of the server has to share it, e.g. django.core.cache.backends.filebased.FileBasedCache
+    # or django.core.cache.backends.redis.RedisCache, for the runs to be kept in it.
+    'dungeon_runs': {
+        'BACKEND': config('DUNGEON_RUN_CACHE_BACKEND', cast=str,
+                          default='django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': config('DUNGEON_RUN_CACHE_LOCATION', cast=str, default='qa-rpg-dungeon-runs'),
+        'TIMEOUT': 60 * 60 * 24,
+        'OPTIONS': {
+            'MAX_ENTRIES': config('DUNGEON_RUN_CACHE_MAX_ENTRIES', cast=int, default=100000),
+        },
+    },
+    # Battle cards of the questions, dropped on every edit of a question or its choices. Only a cache
+    # shared by every worker, like the run cache, sees the drops of the other workers.
+    'battle_cards': {
+        'BACKEND': config('BATTLE_CARD_CACHE_BACKEND', cast=str,
+                          default='django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': config('BATTLE_CARD_CACHE_LOCATION', cast=str, default='qa-rpg-battle-cards'),
+        'OPTIONS': {
+            'MAX_ENTRIES': config('BATTLE_CARD_CACHE_MAX_ENTRIES', cast=int, default=10000),
+        },
+    },
+}
+PER_PROCESS_CACHES = (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+SHARED_RUN_CACHE = CACHES['dungeon_runs']['BACKEND'] not in PER_PROCESS_CACHES
+SHARED_CARD_CACHE = CACHES['battle_cards']['BACKEND'] not in PER_PROCESS_CACHES
+
+# Seconds a battle card is cached. A card cached per process is only dropped in the process that saved
+# the question, so the other workers serve it until it expires, 30 seconds by default. A shared
+# card cache keeps cards for an hour by default.
+BATTLE_CARD_TIMEOUT = config('BATTLE_CARD_TIMEOUT', cast=int, default=60 * 60 if SHARED_CARD_CACHE else 30)
+
+# Number of requests of a dungeon run kept in the run cache between two writes of the run to the
+# database. 0 writes the run on every request, the default unless the run cache is shared by the workers.
+DUNGEON_CHECKPOINT_CLICKS = config('DUNGEON_CHECKPOINT_CLICKS', cast=int, default=20 if SHARED_RUN_CACHE else 0)
+
+# Serve the dungeon pages with the async views, for deployments under ASGI.
+ASYNC_DUNGEON_VIEWS = config('ASYNC_DUNGEON_VIEWS', cast=bool, default=False)
+
+# Weighted drop tables of chests, monster corpses and treasure coins, reloaded when the file changes.
+LOOT_TABLES_PATH = config('LOOT_TABLES_PATH', cast=str, default=os.path.join(BASE_DIR, 'qa_rpg', 'loot_tables.json'))
+
+# Draw weight multipliers of the question pool buckets, keyed by question category
+# and by damage tier (0 easy, 1 medium, 2 hard). Unlisted buckets have a weight of 1.
+# Random draws pick buckets by weight, and the decks of the encounters deal a question
+# with the weight of its bucket relative to the heaviest one, 0 never draws a bucket.
+QUESTION_CATEGORY_WEIGHTS = {}
+QUESTION_TIER_WEIGHTS = {}
+
 # Password validation
 # https://docs.djangoproject.com/en/4.1/ref/settings/#auth-password-validators
 
@@ -181,6 +268,9 @@ NPM_BIN_PATH = config('NPM_BIN_PATH', cast=str, default='Your path')
 
 AUTH_USER_MODEL = 'qa_rpg.User'
 
+# User that owns the preset questions, its questions are never disabled by reports.
+SYSTEM_USER_ID = config('SYSTEM_USER_ID', cast=str, default='08169793-f6d3-4368-bbc6-270e37156fc6')
+
 RECAPTCHA_PUBLIC_KEY = config('RECAPTCHA_PUBLIC_KEY', cast=str, default="missing-recaptcha-public-key")
 RECAPTCHA_PRIVATE_KEY = config('RECAPTCHA_PRIVATE_KEY', cast=str, default="missing-recaptcha-private-key")
 STLENCED_SYSTEM_CHECKS = ['captcha.recaptcha_test_key_error']
\ No newline at end of file
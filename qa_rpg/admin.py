@@ -1,11 +1,69 @@
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin
-from .models import User, Question, Choice, Player, Log, Inventory, ReportAndCommend
+from django.core.paginator import Paginator
+from django.db import connections, transaction, DatabaseError
+from django.utils.functional import cached_property
+from .models import User, Question, Choice, Player, Log, LogEntry, Inventory, ReportAndCommend
+
+ESTIMATE_THRESHOLD = 100000
+
+
+class EstimatedCountPaginator(Paginator):
+    """Paginator that estimates the size of a large unfiltered table from the statistics of the database."""
+
+    @cached_property
+    def count(self):
+        """Return the estimated row count of an unfiltered table, or the exact count otherwise."""
+        query = getattr(self.object_list, 'query', None)
+        if query is not None and not query.where:
+            estimate = self.estimate(self.object_list.db, self.object_list.model._meta.db_table)
+            if estimate is not None and estimate > ESTIMATE_THRESHOLD:
+                return estimate
+        return super().count
+
+    @staticmethod
+    def estimate(alias, table):
+        """
+        Read the row count kept by the database statistics, they are refreshed by ANALYZE.
+        :param alias: database alias
+        :param table: name of the table
+        :return: estimated row count or None when no statistics exist
+        """
+        connection = connections[alias]
+        if connection.vendor == 'postgresql':
+            sql = "SELECT reltuples FROM pg_class WHERE relname = %s"
+        elif connection.vendor == 'sqlite':
+            sql = "SELECT stat FROM sqlite_stat1 WHERE tbl = %s"
+        else:
+            return None
+        try:
+            with transaction.atomic(using=alias), connection.cursor() as cursor:
+                cursor.execute(sql, [table])
+                row = cursor.fetchone()
+        except DatabaseError:
+            return None
+        if row is None:
+            return None
+        return EstimatedCountPaginator.row_count(row[0])
+
+    @staticmethod
+    def row_count(stat):
+        """
+        Read the row count from a statistics value, the "rows ..." string of SQLite or the float of PostgreSQL.
+        :param stat: value read from the statistics table
+        :return: row count or None when the table was never analyzed
+        """
+        if isinstance(stat, str):
+            stat = stat.split()[0]
+        count = int(float(stat))
+        return count if count >= 0 else None
 
 
 class CustomUserAdmin(UserAdmin):
     list_display = ('username', 'email', 'first_name', 'last_name', 'id')
     readonly_fields = ('id',)
+    # The names are encrypted, so they can not be searched.
+    search_fields = ('username', 'email')
 
 
 class ChoiceInline(admin.TabularInline):
@@ -20,33 +78,48 @@ class QuestionAdmin(admin.ModelAdmin):
                                         'category', 'owner', 'enable'],}),
     ]
     inlines = [ChoiceInline]
-    list_display = ('question_text', 'damage', 'currency',
-                    'owner', 'category', 'enable', 'correct_choice')
-    list_filter = ['owner', 'enable', 'damage', 'currency',
-                   'category']
-    search_fields = ['question_text', 'owner']
+    list_display = ('question_text', 'damage', 'currency', 'owner', 'category',
+                    'enable', 'correct_choice', 'report_count', 'commend_count')
+    list_filter = ['enable', 'damage', 'category']
+    list_select_related = ['owner', 'correct_choice']
+    search_fields = ['question_text', 'owner__username']
+    autocomplete_fields = ['owner']
+    ordering = ['-report_count']
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
 
 
 class PlayerAdmin(admin.ModelAdmin):
     fieldsets = [
         ('Player Info', {'fields': ['player_name', 'user',
                                     'max_hp', 'currency', 'luck', 'awake']}),
-        ('Action', {'fields': ['activity']}),
+        ('Action', {'fields': ['activity_state', 'battle_question_id', 'summon_template', 'summon_choices']}),
     ]
     readonly_fields = ('player_name', 'user', 'luck')
     list_display = ('player_name', 'user', 'max_hp',
                     'currency', 'luck', 'activity')
-    list_filter = ['max_hp', 'currency', 'activity']
+    list_filter = ['max_hp', 'currency', 'activity_state']
+
+
+class LogEntryInline(admin.TabularInline):
+    model = LogEntry
+    fields = ('seq', 'style', 'text')
+    readonly_fields = ('seq', 'style', 'text')
+    ordering = ['seq']
+    extra = 0
+    can_delete = False
 
 
 class LogAdmin(admin.ModelAdmin):
     fieldsets = [
-        ('Text Log Info', {'fields': ['log_text', 'player']}),
+        ('Text Log Info', {'fields': ['player']}),
         ('Question Log Info', {'fields': ['log_questions', 'log_report_question']})
     ]
+    inlines = [LogEntryInline]
     readonly_fields = ('player',)
     list_display = ('player',)
-    list_filter = ['player']
+    list_select_related = ['player']
+    search_fields = ['player__user__username']
 
 
 class InventoryAdmin(admin.ModelAdmin):
@@ -57,7 +130,9 @@ class InventoryAdmin(admin.ModelAdmin):
     ]
     readonly_fields = ('player',)
     list_display = ('player', 'max_inventory')
-    list_filter = ['player', 'max_inventory']
+    list_filter = ['max_inventory']
+    list_select_related = ['player']
+    search_fields = ['player__user__username']
 
 
 class ReportCommendAdmin(admin.ModelAdmin):
@@ -66,7 +141,11 @@ class ReportCommendAdmin(admin.ModelAdmin):
     ]
     readonly_fields = ('question', 'user', 'vote')
     list_display = ('question', 'user', 'vote')
-    list_filter = ['question', 'user', 'vote']
+    list_filter = ['vote']
+    list_select_related = ['question', 'user']
+    search_fields = ['question__question_text', 'user__username']
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
 
 
 admin.site.register(User, CustomUserAdmin)
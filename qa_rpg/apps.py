@@ -4,3 +4,11 @@ from django.apps import AppConfig
 class QaRpgConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'qa_rpg'
+
+    def ready(self):
+        # Register the signal receivers that keep the question pool and battle cards in sync.
+        from . import question_pool, battle_card  # noqa: F401
+        # Compile the static catalogs once, before the first request.
+        from . import catalog  # noqa: F401
+        # Apply the pragmas of the database profile to every new SQLite connection.
+        from . import sqlite  # noqa: F401
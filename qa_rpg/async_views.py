@@ -0,0 +1,165 @@
+"""
+Module that contains the async views of the dungeon, served under ASGI when ASYNC_DUNGEON_VIEWS is set.
+
+The game context is loaded with the async ORM and the questions, fails and coin transfers go through it too.
+The game itself is resolved in memory by the same functions as the sync views, and the unit of work
+writes the player state once when the request ends.
+"""
+from datetime import datetime
+from functools import wraps
+
+from asgiref.sync import sync_to_async
+from django.contrib import messages
+from django.contrib.auth.views import redirect_to_login
+from django.shortcuts import redirect
+from django.utils.cache import add_never_cache_headers
+
+from .battle_card import aget_battle_card
+from .middleware import GameContextMiddleware
+from .models import Activity, Question, RunEventKind
+from .views import ACTION_ACTIVITIES, BATTLE_ACTIVITIES, DUNGEON_ACTIVITIES, TREASURE_ACTION_ACTIVITIES, answer, \
+    battle_page, check_player_activity, dungeon_page, encounter, flee, logger, one_user_per_report, open_treasure, \
+    set_question_activation, use_item, walk_or_exit
+
+
+def game_view(view):
+    """
+    Load the game context of an async view before calling it, and mark its response as never cached.
+    Anonymous users are redirected to the login page.
+    """
+    @wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        if await GameContextMiddleware.aload(request) is None:
+            return redirect_to_login(request.get_full_path())
+        response = await view(request, *args, **kwargs)
+        add_never_cache_headers(response)
+        return response
+    return wrapper
+
+
+async def report(request, question_id, log, disable: bool = True):
+    """Record the report or commend of the question, the votes are saved with their counters in a thread."""
+    await sync_to_async(one_user_per_report)(request, question_id, log)
+    if disable:
+        await sync_to_async(set_question_activation)(question_id)
+
+
+@game_view
+async def dungeon(request):
+    """Return Dungeon page."""
+    player, log = request.game.player, request.game.log
+    check_url = check_player_activity(player, DUNGEON_ACTIVITIES)
+    if check_url is not None:
+        return redirect(check_url)
+    return dungeon_page(request, player, log)
+
+
+@game_view
+async def action(request):
+    """
+    Check if player found monster in walking or exiting.
+    :param request: HTML request
+    :return: redirect player to dungeon or index page
+    """
+    player = request.game.player
+    check_url = check_player_activity(player, ACTION_ACTIVITIES)
+    if check_url is not None:
+        return redirect(check_url)
+
+    url = walk_or_exit(player, request.game.log, request.game.inventory, request.POST['action'])
+    if url == "qa_rpg:index":
+        await player.aadd_dungeon_currency()
+    return redirect(url)
+
+
+@game_view
+async def treasure_action(request):
+    """
+    Check if the player Choose between pick up item from treasure or walk away.
+    :param request: HTML request
+    :return: redirect to dungeon page
+    """
+    player = request.game.player
+    check_url = check_player_activity(player, TREASURE_ACTION_ACTIVITIES)
+    if check_url is not None:
+        return redirect(check_url)
+    return open_treasure(request, player, request.game.log, request.game.inventory)
+
+
+@game_view
+async def battle(request):
+    """Return Battle page."""
+    player, log, inventory = request.game
+
+    check_url = check_player_activity(player, BATTLE_ACTIVITIES)
+    if check_url is not None:
+        return redirect(check_url)
+
+    if player.activity_state == Activity.BATTLE and player.battle_question_id is not None:
+        question = await aget_battle_card(player.battle_question_id)
+    else:
+        # The question pool is shared by the threads of the server and reloads itself when stale.
+        question = await sync_to_async(encounter)(log, player.user_id)
+    player.set_activity(Activity.BATTLE, question_id=question.id)
+    return battle_page(request, question, player, inventory)
+
+
+@game_view
+async def item(request):
+    """
+    Check the items that the player chooses to use.
+    :param request: HTML request
+    :return: redirect player to battle page
+    """
+    try:
+        index = int(request.POST['item'])
+    except KeyError:
+        messages.error(request, "You need to select an item to use.")
+        return redirect("qa_rpg:battle")
+    return use_item(request, index, *request.game)
+
+
+@game_view
+async def check(request, question_id):
+    """
+    Checks the player's answer and checks the results of the item used by the player.
+    :param request: HTML request
+    :param question_id:
+    :return: redirect player to right page
+    """
+    question = await aget_battle_card(question_id)
+    player, log, _ = request.game
+    if not player.in_battle(question_id):
+        return redirect("qa_rpg:dungeon")
+
+    if request.POST.get('option') in ['report', 'commend']:
+        await report(request, question_id, log, disable=request.POST['option'] == 'report')
+        logger.info(f'{str(datetime.now())}: {player.player_name}({player.pk}) has {request.POST["option"]}ed the '
+                    f'question({question.id})')
+
+    response, failed = answer(request, question, player, log)
+    if failed:
+        await Question.arecord_fail(question_id)
+    return response
+
+
+@game_view
+async def run_away(request, question_id):
+    """
+    Randomize whether the player can escape from the question or not.
+    :param request: HTML request
+    :param question_id:
+    :return: render or redirect player to battle or dungeon page
+    """
+    question = await aget_battle_card(question_id)
+    player, log, inventory = request.game
+
+    if not player.in_battle(question_id):
+        return redirect("qa_rpg:dungeon")
+    log.record_event(RunEventKind.FLEE, question_id=question_id)
+    await report(request, question_id, log)
+
+    response, failed = flee(request, question, player, log, inventory)
+    if failed:
+        await Question.arecord_fail(question_id)
+    return response
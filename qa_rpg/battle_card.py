@@ -0,0 +1,114 @@
+"""Module that contains the cached read model of a question shown in battle."""
+from dataclasses import dataclass
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from .models import Question, Choice
+
+CARD_CACHE = "battle_cards"
+
+
+@dataclass(frozen=True)
+class BattleCard:
+    """Immutable bundle of everything the battle page needs from a question."""
+
+    id: int
+    question_text: str
+    damage: int
+    category: str
+    owner_id: object
+    choices: tuple
+    correct_choice_id: int = None
+
+    def has_choice(self, choice_id: int):
+        """Return whether the choice belongs to this question."""
+        return any(card_choice_id == choice_id for card_choice_id, _ in self.choices)
+
+    def is_correct(self, choice_id: int):
+        """Return whether the choice is the correct answer of this question."""
+        return self.correct_choice_id is not None and choice_id == self.correct_choice_id
+
+
+def card_key(question_id: int):
+    """Return cache key of a battle card."""
+    return f"battle_card:{question_id}"
+
+
+def card_cache():
+    """Return the cache that keeps the battle cards, see BATTLE_CARD_TIMEOUT for how long."""
+    return caches[CARD_CACHE]
+
+
+def build_battle_card(question_id: int):
+    """
+    Build a battle card with a single query over the question's choices.
+    :param question_id:
+    :return: BattleCard object
+    """
+    choices = list(Choice.objects.filter(question_id=question_id).select_related('question').order_by('id'))
+    question = choices[0].question if choices else Question.objects.get(pk=question_id)
+    return BattleCard(id=question.id,
+                      question_text=question.question_text,
+                      damage=question.damage,
+                      category=question.category,
+                      owner_id=question.owner_id,
+                      choices=tuple((choice.id, choice.choice_text) for choice in choices),
+                      correct_choice_id=question.correct_choice_id)
+
+
+def get_battle_card(question_id: int):
+    """
+    Return the battle card of the question from cache, building it on a miss.
+    :param question_id:
+    :return: BattleCard object
+    """
+    card = card_cache().get(card_key(question_id))
+    if card is None:
+        card = build_battle_card(question_id)
+        card_cache().set(card_key(question_id), card, settings.BATTLE_CARD_TIMEOUT)
+    return card
+
+
+async def abuild_battle_card(question_id: int):
+    """Build a battle card with the async ORM, see build_battle_card."""
+    choices = [choice async for choice in
+               Choice.objects.filter(question_id=question_id).select_related('question').order_by('id')]
+    question = choices[0].question if choices else await Question.objects.aget(pk=question_id)
+    return BattleCard(id=question.id,
+                      question_text=question.question_text,
+                      damage=question.damage,
+                      category=question.category,
+                      owner_id=question.owner_id,
+                      choices=tuple((choice.id, choice.choice_text) for choice in choices),
+                      correct_choice_id=question.correct_choice_id)
+
+
+async def aget_battle_card(question_id: int):
+    """Return the battle card of the question from cache, building it with the async ORM on a miss."""
+    card = await card_cache().aget(card_key(question_id))
+    if card is None:
+        card = await abuild_battle_card(question_id)
+        await card_cache().aset(card_key(question_id), card, settings.BATTLE_CARD_TIMEOUT)
+    return card
+
+
+def invalidate_battle_card(question_id: int):
+    """Remove the battle card of the question from cache."""
+    card_cache().delete(card_key(question_id))
+
+
+@receiver(post_save, sender=Question)
+@receiver(post_delete, sender=Question)
+def invalidate_question_card(sender, instance, **kwargs):
+    """Drop the card when a question is edited, moderated or deleted."""
+    invalidate_battle_card(instance.pk)
+
+
+@receiver(post_save, sender=Choice)
+@receiver(post_delete, sender=Choice)
+def invalidate_choice_card(sender, instance, **kwargs):
+    """Drop the card when one of its choices is edited or deleted."""
+    invalidate_battle_card(instance.question_id)
@@ -0,0 +1,48 @@
+"""Module that compiles the static item and template catalogs once, at app load, into immutable tables."""
+from dataclasses import dataclass
+from types import MappingProxyType
+
+from .items_catalog import ItemCatalog
+from .template_question import TemplateCatalog
+
+
+@dataclass(frozen=True)
+class CompiledCatalog:
+    """Read-only views of the catalogs shared by every request, mappings are wrapped in MappingProxyType."""
+
+    store_items: MappingProxyType
+    item_prices: MappingProxyType
+    template_texts: MappingProxyType
+    template_prices: MappingProxyType
+    shop_templates: MappingProxyType
+    chest_items: tuple
+    cursed_items: tuple
+
+
+def template_text(template: list):
+    """Return the display string of a template."""
+    return " ".join(template) + " ?"
+
+
+def compile_catalog(items: ItemCatalog, templates: TemplateCatalog):
+    """
+    Build the display strings, prices and store listings of the catalogs.
+    :param items: ItemCatalog object
+    :param templates: TemplateCatalog object
+    :return: CompiledCatalog object
+    """
+    item_prices = items.get_store_prices()
+    texts = {index: template_text(template) for index, template in templates.get_all_templates().items()}
+    prices = {index: templates.get_price(index) for index in texts}
+    store_items = {name: tuple(listing) for name, listing in items.get_store_items().items()}
+    return CompiledCatalog(store_items=MappingProxyType(store_items),
+                           item_prices=MappingProxyType(item_prices),
+                           template_texts=MappingProxyType(texts),
+                           template_prices=MappingProxyType(prices),
+                           shop_templates=MappingProxyType({text: (prices[index], index)
+                                                            for index, text in texts.items()}),
+                           chest_items=tuple(items.get_chest_items()),
+                           cursed_items=tuple(items.get_cursed_items()))
+
+
+catalog = compile_catalog(ItemCatalog(), TemplateCatalog())
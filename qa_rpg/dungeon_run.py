@@ -0,0 +1,119 @@
+"""Module that keeps the state of a dungeon run in the run cache, and writes it to the database at checkpoints."""
+from dataclasses import dataclass
+
+from django.conf import settings
+from django.core.cache import caches
+
+from .models import Activity, LogEntry, RunEvent, RunSnapshot
+
+RUN_CACHE = "dungeon_runs"
+RUN_TIMEOUT = 60 * 60 * 24
+RUN_ACTIVITIES = frozenset({Activity.DUNGEON, Activity.TREASURE, Activity.FOUND_MONSTER, Activity.BATTLE})
+RUN_FIELDS = {
+    "player": ('current_hp', 'luck', 'dungeon_currency', 'status', 'activity_state', 'battle_question_id'),
+    "log": ('log_questions', 'deck_cursor', 'journal_seq'),
+    "inventory": ('dungeon_inventory',),
+}
+
+
+@dataclass(frozen=True)
+class DungeonRun:
+    """Run fields of a player, log and inventory since their last checkpoint."""
+
+    stored: tuple
+    values: tuple
+    entries: tuple = ()
+    events: tuple = ()
+    snapshots: tuple = ()
+    clicks: int = 0
+
+
+def run_key(user_id):
+    """Return cache key of the dungeon run of a user."""
+    return f"dungeon_run:{user_id}"
+
+
+def run_cache():
+    """Return the cache shared by the workers that keeps the dungeon runs."""
+    return caches[RUN_CACHE]
+
+
+def held_instances(game):
+    """Return pairs of the instances of a game context and their run fields."""
+    return [(getattr(game, name), fields) for name, fields in RUN_FIELDS.items()]
+
+
+def stored_values(game):
+    """Return the stored values of the run fields, as loaded from the database."""
+    return tuple(tuple(instance._loaded_values[field] for field in fields) for instance, fields in held_instances(game))
+
+
+def current_values(game):
+    """Return the current values of the run fields."""
+    return tuple(tuple(getattr(instance, field) for field in fields) for instance, fields in held_instances(game))
+
+
+def attach_run(game, unit_of_work, checkpoint_clicks: int = None):
+    """
+    Apply the cached run of the player to the game context, and hold its run fields in the unit of work.
+    A run cached before the rows were written by something else is dropped.
+    :param game: GameContext loaded from the database
+    :param unit_of_work: unit of work of the request
+    :param checkpoint_clicks: requests between two checkpoints, DUNGEON_CHECKPOINT_CLICKS by default
+    """
+    if checkpoint_clicks is None:
+        checkpoint_clicks = settings.DUNGEON_CHECKPOINT_CLICKS
+    if checkpoint_clicks <= 0:
+        return
+    cache = run_cache()
+    key = run_key(game.player.user_id)
+    run = cache.get(key)
+    if run is not None and run.stored != stored_values(game):
+        cache.delete(key)
+        run = None
+    if run is not None:
+        for (instance, fields), values in zip(held_instances(game), run.values):
+            for field, value in zip(fields, values):
+                setattr(instance, field, value)
+        game.log.pending_entries = tuple(LogEntry(log=game.log, slot=slot, seq=seq, style=style, text=text)
+                                         for slot, seq, style, text in run.entries)
+        game.log.pending_events = tuple(RunEvent(player=game.player, seq=seq, kind=kind, question_id=question_id,
+                                                 item_id=item_id, changes=changes, created=created)
+                                        for seq, kind, question_id, item_id, changes, created in run.events)
+        game.log.pending_snapshots = tuple(RunSnapshot(player=game.player, seq=seq, state=state)
+                                           for seq, state in run.snapshots)
+    for instance, fields in held_instances(game):
+        instance.hold_fields(*fields)
+    unit_of_work.before_flush(lambda: save_run(game, unit_of_work, run, checkpoint_clicks))
+
+
+def save_run(game, unit_of_work, run: DungeonRun = None, checkpoint_clicks: int = None):
+    """
+    Cache the run fields of the game context, or write them with this flush at a checkpoint.
+    A checkpoint is made when the player leaves the dungeon or dies, every checkpoint_clicks
+    flushes, and whenever a row is written for a field outside of the run anyway.
+    :param game: GameContext of the request
+    :param unit_of_work: unit of work being flushed
+    :param run: DungeonRun the context was loaded with
+    :param checkpoint_clicks: requests between two checkpoints, DUNGEON_CHECKPOINT_CLICKS by default
+    """
+    if checkpoint_clicks is None:
+        checkpoint_clicks = settings.DUNGEON_CHECKPOINT_CLICKS
+    cache = run_cache()
+    key = run_key(game.player.user_id)
+    clicks = run.clicks + 1 if run is not None else 1
+    instances = held_instances(game)
+    written = any(set(instance.changed_fields() or ()) - set(fields) for instance, fields in instances)
+    if game.player.activity_state not in RUN_ACTIVITIES or written or clicks >= checkpoint_clicks:
+        for instance, _ in instances:
+            instance.release_fields()
+            unit_of_work.register(instance)
+        cache.delete(key)
+        return
+    log = game.log
+    entries = tuple((entry.slot, entry.seq, entry.style, entry.text) for entry in log.pending_entries)
+    events = tuple((event.seq, event.kind, event.question_id, event.item_id, event.changes, event.created)
+                   for event in log.pending_events)
+    snapshots = tuple((snapshot.seq, snapshot.state) for snapshot in log.pending_snapshots)
+    cache.set(key, DungeonRun(stored_values(game), current_values(game), entries, events, snapshots, clicks),
+              RUN_TIMEOUT)
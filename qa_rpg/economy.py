@@ -0,0 +1,56 @@
+"""Module that applies coin transfers with atomic conditional updates instead of read-modify-write saves."""
+from django.db import transaction
+from django.db.models import F
+
+from .models import FailCounter, Player, Question
+
+CLAIM_ATTEMPTS = 5
+
+
+def spend(player: Player, cost: int):
+    """
+    Take coins from a player if they have enough, with a single conditional update.
+    :param player: Player paying
+    :param cost: number of coins
+    :return: whether the coins were taken
+    """
+    if cost < 0:
+        return False
+    with transaction.atomic():
+        spent = Player.objects.filter(pk=player.pk, currency__gte=cost).update(currency=F('currency') - cost)
+        player.refresh_stored_fields('currency')
+    return bool(spent)
+
+
+def earn(player: Player, amount: int):
+    """
+    Give coins to a player.
+    :param player: Player earning
+    :param amount: number of coins
+    """
+    with transaction.atomic():
+        Player.objects.filter(pk=player.pk).update(currency=F('currency') + amount)
+        player.refresh_stored_fields('currency')
+
+
+def claim_question_coins(player: Player, question_id: int):
+    """
+    Move the coins earned by a question to a player, each coin is claimed only once.
+    :param player: Player claiming
+    :param question_id:
+    :return: number of coins claimed
+    """
+    for _ in range(CLAIM_ATTEMPTS):
+        with transaction.atomic():
+            question = Question.objects.select_related('fail_counter').get(pk=question_id)
+            amount = question.claimable
+            if amount == 0:
+                return 0
+            fails = FailCounter.objects.filter(question_id=question_id, fails=question.fails)
+            if question.fails and not fails.update(fails=0):
+                continue
+            if Question.objects.filter(pk=question_id, currency=question.currency).update(currency=0):
+                earn(player, amount)
+                return amount
+            transaction.set_rollback(True)
+    return 0
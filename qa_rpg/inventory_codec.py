@@ -0,0 +1,24 @@
+"""Module that contains the codec of the "id:count;" strings stored by Inventory."""
+
+
+def decode_counts(raw: str):
+    """
+    Decode an inventory string.
+    :param raw: string in the "id:count;id:count;" form
+    :return: dict of id to count
+    """
+    counts = {}
+    for entry in raw.split(';'):
+        if entry:
+            key, _, value = entry.partition(':')
+            counts[int(key)] = int(value)
+    return counts
+
+
+def encode_counts(counts: dict):
+    """
+    Encode counts to an inventory string, ids with no count left are dropped.
+    :param counts: dict of id to count
+    :return: string in the "id:count;id:count;" form
+    """
+    return "".join(f"{key}:{value};" for key, value in counts.items() if value > 0)
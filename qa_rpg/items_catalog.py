@@ -1,460 +1,225 @@
-"""Module that contains all item classes and item catalog class."""
+"""Module that contains the item table, its compiled effect table and the item catalog class."""
 import random
-from abc import ABC
-
-
-class Item(ABC):
-
-    @property
-    def description(self):
-        return ""
-
-    @property
-    def effect(self):
-        return ""
-
-    def coin_modifier(self, coin):
-        """Abstract method for getting money modifier."""
-        return 0
-
-    def escape_modifier(self, chance):
-        """Abstract method for getting escape chance modifier."""
-        return 0
-
-    def damage_modifier(self, incoming_damage):
-        """Abstract method for getting damage modifier."""
-        return 0
-
-    def health_modifier(self, max_health):
-        """Abstract method for getting health modifier."""
-        return 0
-
-    def item_modifier(self, item):
-        """Abstract method for getting extra items."""
-        return 0
-
-
-class DungeonCandyItem(Item):
-    """Heal 5-10 health points instantly."""
-
-    def health_modifier(self, max_health):
-        return random.randrange(5, 11, 1)
-
-    def __str__(self):
-        return "Dungeon Candy"
-
-    @property
-    def description(self):
-        return "A sweet candy favored by adventurers."
-
-    @property
-    def effect(self):
-        return "Heals 5 to 10 health points instantly upon use."
-
-
-class PotionItem(Item):
-    """Heal 20 health points instantly."""
-
-    def health_modifier(self, max_health):
-        return 20
-
-    def __str__(self):
-        return "Minor Potion"
-
-    @property
-    def description(self):
-        return "A simple healing concoction made from various herbs and monster parts."
-
-    @property
-    def effect(self):
-        return "Heals 20 health points instantly upon use."
-
-
-class MegaPotionItem(Item):
-    """Heal 50 percent of max health."""
-
-    def health_modifier(self, max_health):
-        return int(max_health * 0.5)
-
-    def __str__(self):
-        return "Mythical Potion"
-
-    @property
-    def description(self):
-        return "A potion left behind by the greatest wizard of all the lands."
-
-    @property
-    def effect(self):
-        return "Heal 50 percent of max health instantly."
-
-
-class CrossBowItem(Item):
-    """Add 10 percent to escape chance."""
-
-    def escape_modifier(self, chance):
-        return 0.1
-
-    def __str__(self):
-        return "Crossbow"
-
-    @property
-    def description(self):
-        return "Mechanical engineering at its finest, shoots straight as a die."
-
-    @property
-    def effect(self):
-        return "Adds 10 percent to your escape chance."
-
-
-class SmokeBombItem(Item):
-    """Ensures 100 percent escape chance."""
-
-    def escape_modifier(self, chance):
-        return chance
-
-    def __str__(self):
-        return "Ninja Smoke Bomb"
-
-    @property
-    def description(self):
-        return "The recipe to replicate this thick fog remains a mystery."
-
-    @property
-    def effect(self):
-        return "Gain 100 percent escape chance."
-
-
-class WoodenShieldItem(Item):
-    """Incoming damage is subtracted by 6 damage."""
-
-    def damage_modifier(self, incoming_damage):
-        return 6
-
-    def __str__(self):
-        return "Wooden Shield"
-
-    @property
-    def description(self):
-        return "Flimsy shield that looks like its about to break any time."
-
-    @property
-    def effect(self):
-        return "Blocks 6 points of incoming damage."
-
-
-class ShieldItem(Item):
-    """Incoming damage is subtracted by 20 percent."""
-
-    def damage_modifier(self, incoming_damage):
-        return int(incoming_damage * 0.375)
-
-    def __str__(self):
-        return "Iron Shield"
-
-    @property
-    def description(self):
-        return "Sturdy, reliable, now that's a shield."
-
-    @property
-    def effect(self):
-        return "Blocks 37.5 percent of damage taken."
-
-
-class GreatShieldItem(Item):
-    """Incoming damage is halved."""
-
-    def damage_modifier(self, incoming_damage):
-        return int(incoming_damage * 0.75)
-
-    def __str__(self):
-        return "Aegis Shield"
-
-    @property
-    def description(self):
-        return "A shield built from materials existing only in legends."
-
-    @property
-    def effect(self):
-        return "Blocks 75 percent of incoming damage."
-
-
-class CoinBagItem(Item):
-    """Coin gain is multiplied by 2.1."""
-
-    multiplier = 1.1
-
-    def coin_modifier(self, coin):
-        return int(coin * self.multiplier)
-
-    def __str__(self):
-        return "Coin Bag"
-
-    @property
-    def description(self):
-        return "Hand crafted leather bag that holds more than you think."
-
-    @property
-    def effect(self):
-        return f"Coin gain is multiplied by {1 + self.multiplier}."
-
-
-class BookAlchemyItem(Item):
-    f"""Coin gain is multiplied by 4."""
-
-    multiplier = 3
-
-    def coin_modifier(self, coin):
-        return int(coin * self.multiplier)
-
-    def __str__(self):
-        return "Book of Alchemy"
-
-    @property
-    def description(self):
-        return "Every imaginable forbidden magic is contained in this very book."
-
-    @property
-    def effect(self):
-        return f"Coin gain is multiplied by {1 + self.multiplier}."
-
-
-class AmbrosiaItem(Item):
-    """Heal 30 percent instantly and 30 percent incoming damage is blocked."""
-
-    def health_modifier(self, max_health):
-        return int(max_health * 0.3)
-
-    def damage_modifier(self, incoming_damage):
-        return int(incoming_damage * 0.3)
-
-    def __str__(self):
-        return "Ambrosia"
-
-    @property
-    def description(self):
-        return "This drink is said to be procured from the Fountain of Youth."
-
-    @property
-    def effect(self):
-        return "Heal 30 percent of max health instantly and blocks 30 percent of incoming damage."
-
-
-class GreedyBagItem(Item):
-    """Coin gain is multiplied by 3.25, but incoming damage is multiplied by 2."""
+from dataclasses import dataclass
+from typing import NamedTuple
+
+NO_ITEM = 999
+STATS = ("coin", "escape", "damage", "health", "item")
+
+# Modifier kinds, each is given the parameters of an item and returns the modifier of the base value of its stat.
+MODIFIERS = {
+    "none": lambda: lambda value: 0,
+    "add": lambda amount: lambda value: amount,
+    "all": lambda: lambda value: value,
+    "all_loss": lambda: lambda value: -value,
+    "scale": lambda factor: lambda value: int(value * factor),
+    "scale_loss": lambda factor: lambda value: -int(value * factor),
+    "random": lambda low, high: lambda value: random.randrange(low, high + 1, 1),
+    "random_percent": lambda low, high: lambda value: int(random.randrange(low, high + 1, 1) * 0.01 * value),
+    "block_up_to": lambda limit, factor: lambda value: value if value <= limit else -int(value * factor),
+}
+
+# item id: (name, description, effect text, {stat: (modifier kind, *parameters)})
+ITEM_TABLE = {
+    0: ("Dungeon Candy", "A sweet candy favored by adventurers.",
+        "Heals 5 to 10 health points instantly upon use.",
+        {"health": ("random", 5, 10)}),
+    1: ("Wooden Shield", "Flimsy shield that looks like its about to break any time.",
+        "Blocks 6 points of incoming damage.",
+        {"damage": ("add", 6)}),
+    6: ("Minor Potion", "A simple healing concoction made from various herbs and monster parts.",
+        "Heals 20 health points instantly upon use.",
+        {"health": ("add", 20)}),
+    7: ("Crossbow", "Mechanical engineering at its finest, shoots straight as a die.",
+        "Adds 10 percent to your escape chance.",
+        {"escape": ("add", 0.1)}),
+    8: ("Iron Shield", "Sturdy, reliable, now that's a shield.",
+        "Blocks 37.5 percent of damage taken.",
+        {"damage": ("scale", 0.375)}),
+    9: ("Coin Bag", "Hand crafted leather bag that holds more than you think.",
+        "Coin gain is multiplied by 2.1.",
+        {"coin": ("scale", 1.1)}),
+
+    10: ("Mythical Potion", "A potion left behind by the greatest wizard of all the lands.",
+         "Heal 50 percent of max health instantly.",
+         {"health": ("scale", 0.5)}),
+    11: ("Ninja Smoke Bomb", "The recipe to replicate this thick fog remains a mystery.",
+         "Gain 100 percent escape chance.",
+         {"escape": ("all",)}),
+    12: ("Aegis Shield", "A shield built from materials existing only in legends.",
+         "Blocks 75 percent of incoming damage.",
+         {"damage": ("scale", 0.75)}),
+    13: ("Ambrosia", "This drink is said to be procured from the Fountain of Youth.",
+         "Heal 30 percent of max health instantly and blocks 30 percent of incoming damage.",
+         {"health": ("scale", 0.3), "damage": ("scale", 0.3)}),
+    14: ("Book of Alchemy", "Every imaginable forbidden magic is contained in this very book.",
+         "Coin gain is multiplied by 4.",
+         {"coin": ("scale", 3)}),
+    15: ("Glove of Midas", "A glove enchanted with replication magic.",
+         "Ensures that 2 items of the same kind drop from monster.",
+         {"item": ("add", 1)}),
+
+    50: ("Greedy Bag", "A mysterious devilish aura surrounds it.",
+         "Multiplies coin gain by 3.25 times, but also multiplies damage taken by 2 times.",
+         {"coin": ("scale", 2.25), "damage": ("scale_loss", 1.5)}),
+    51: ("Blood Pact", "Your blood is valuable to demons as coins are to you.",
+         "Lose 15 percent of max health instantly, but multiplies coin gain by 2.5 times.",
+         {"coin": ("scale", 1.5), "health": ("scale_loss", 0.15)}),
+    52: ("Poisonous Cloud", "Don't know who thought using poison was a good idea.",
+         "Lose 15 health instantly, but adds 40 percent escape chance.",
+         {"escape": ("add", 0.4), "health": ("add", -15)}),
+    53: ("Adrenaline Shot", "Blood rushes through your body, empowering you for a short period.",
+         "Heals 12 percent of max health, but coin gains becomes zero.",
+         {"health": ("scale", 0.12), "coin": ("all_loss",)}),
+    54: ("Broken Shield", "A once legendary shield worn down to its last use.",
+         "Blocks 100 percent of damage taken up to 27 damage otherwise take 50 percent extra damage.",
+         {"damage": ("block_up_to", 27, 0.5)}),
+    55: ("Vial of Ichor", "A vial filled with a peculiar glowing substance, use at your own risk.",
+         "Randomizes from -15 percent to 15 percent which will be added to your health.",
+         {"health": ("random_percent", -15, 15)}),
+    56: ("Rune of Bulwark", "An Ancient rune which is triggered with your blood.",
+         "Lose 5 percent of your max health instantly, and block 27.5 percent of incoming damage.",
+         {"health": ("scale_loss", 0.05), "damage": ("scale", 0.275)}),
+    57: ("Mermaid Tears", "Legend has it, these tears were from a grieving mother.",
+         "Heal 17.5 percent of max health instantly, but gain 1.75 multiplier to incoming damage.",
+         {"health": ("scale", 0.175), "damage": ("scale_loss", 0.75)}),
+
+    NO_ITEM: ("", "", "", {}),
+}
+
+STORE_PRICES = {0: 30, 1: 30, 9: 30, 6: 80, 7: 80, 8: 80}
+
+
+class EffectContext(NamedTuple):
+    """Base values the modifiers of each stat are applied to."""
+
+    coin: int = 0
+    escape: float = 0
+    damage: int = 0
+    health: int = 0
+    item: int = 1
+
+
+class Effects(NamedTuple):
+    """Modifiers of each stat given by an item."""
+
+    coin: int = 0
+    escape: float = 0
+    damage: int = 0
+    health: int = 0
+    item: int = 0
+
+
+class EffectTable:
+    """Item table compiled into one column of modifier functions per stat, bound to the parameters of each item."""
+
+    def __init__(self, table: dict):
+        self.positions = {item_id: position for position, item_id in enumerate(table)}
+        self.functions, self.modified = {}, {}
+        for stat in STATS:
+            specs = [effects.get(stat, ("none",)) for *_, effects in table.values()]
+            self.functions[stat] = tuple(MODIFIERS[kind](*parameters) for kind, *parameters in specs)
+            self.modified[stat] = frozenset(item_id for item_id, (*_, effects) in table.items() if stat in effects)
+
+
+EFFECTS = EffectTable(ITEM_TABLE)
+
+
+def apply_effect(item_id: int, stat: str, value):
+    """
+    Apply the effect of a single item on one stat, indexing the compiled table directly.
+    :param item_id: id of the used item
+    :param stat: name of the stat
+    :param value: base value of the stat
+    :return: modifier of the stat
+    """
+    return EFFECTS.functions[stat][EFFECTS.positions[item_id]](value)
+
+
+def apply_effects(item_ids, context, stats=STATS):
+    """
+    Apply the effects of a batch of item uses with one pass over the compiled table per stat,
+    for simulations, a single use goes through apply_effect.
+    :param item_ids: ids of the used items
+    :param context: EffectContext shared by the items, or a sequence of one per item
+    :param stats: stats to compute, the modifiers of the others are left at 0
+    :return: list of Effects, one per item
+    """
+    positions = [EFFECTS.positions[item_id] for item_id in item_ids]
+    contexts = [context] * len(positions) if isinstance(context, EffectContext) else context
+    zeros = [0] * len(positions)
+    columns = {}
+    for stat in stats:
+        functions, index = EFFECTS.functions[stat], STATS.index(stat)
+        columns[stat] = [functions[position](base[index]) for position, base in zip(positions, contexts)]
+    return [Effects(*row) for row in zip(*(columns.get(stat, zeros) for stat in STATS))]
+
+
+def modifies(item_id: int, stat: str):
+    """Return whether the item has an effect on the stat."""
+    return item_id in EFFECTS.modified[stat]
+
+
+@dataclass(frozen=True)
+class Item:
+    """Item of the table, its modifiers come from the compiled effect table."""
+
+    id: int = NO_ITEM
+    name: str = ""
+    description: str = ""
+    effect: str = ""
 
     def coin_modifier(self, coin):
-        return int(coin * 2.25)
-
-    def damage_modifier(self, incoming_damage):
-        return -int(incoming_damage * 1.5)
-
-    def __str__(self):
-        return "Greedy Bag"
-
-    @property
-    def description(self):
-        return "A mysterious devilish aura surrounds it."
-
-    @property
-    def effect(self):
-        return "Multiplies coin gain by 3.25 times, but also multiplies damage taken by 2 times."
-
-
-class BloodPactItem(Item):
-    """Instantly lose 15 percent of max health, but gain 2.25 times multiplier to coin."""
-
-    def coin_modifier(self, coin):
-        return int(coin * 1.5)
-
-    def health_modifier(self, max_health):
-        return -int(max_health * 0.15)
-
-    def __str__(self):
-        return "Blood Pact"
-
-    @property
-    def description(self):
-        return "Your blood is valuable to demons as coins are to you."
-
-    @property
-    def effect(self):
-        return "Lose 15 percent of max health instantly, but multiplies coin gain by 2.5 times."
-
-
-class PoisonousSmokeBombItem(Item):
-    """Add 40 percent to escape chance but lose 15 health instantly."""
+        """Return coins added to the coins earned."""
+        return apply_effect(self.id, "coin", coin)
 
     def escape_modifier(self, chance):
-        return 0.4
-
-    def health_modifier(self, max_health):
-        return -15
-
-    def __str__(self):
-        return "Poisonous Cloud"
-
-    @property
-    def description(self):
-        return "Don't know who thought using poison was a good idea."
-
-    @property
-    def effect(self):
-        return "Lose 15 health instantly, but adds 40 percent escape chance."
-
-
-class AdrenalineItem(Item):
-    """Heal 12 percent of max health but don't gain coins from current battle."""
-
-    def health_modifier(self, max_health):
-        return int(max_health * 0.12)
-
-    def coin_modifier(self, coin):
-        return -coin
-
-    def __str__(self):
-        return "Adrenaline Shot"
-
-    @property
-    def description(self):
-        return "Blood rushes through your body, empowering you for a short period."
-
-    @property
-    def effect(self):
-        return "Heals 12 percent of max health, but coin gains becomes zero."
-
-
-class BrokenShieldItem(Item):
-    """Blocks 100 percent of incoming damage up to 27 damage if it fails 1.5 damage is applied."""
+        """Return escape chance added to the chance."""
+        return apply_effect(self.id, "escape", chance)
 
     def damage_modifier(self, incoming_damage):
-        if incoming_damage <= 27:
-            return incoming_damage
-        return -int(incoming_damage * 0.5)
-
-    def __str__(self):
-        return "Broken Shield"
-
-    @property
-    def description(self):
-        return "A once legendary shield worn down to its last use."
-
-    @property
-    def effect(self):
-        return "Blocks 100 percent of damage taken up to 27 damage otherwise take 50 percent extra damage."
-
-
-class RuneBulwarkItem(Item):
-    """Sacrifice 5 percent of max health to block 27.5 percent of incoming damage."""
-
-    def health_modifier(self, max_health):
-        return -int(max_health * 0.05)
-
-    def damage_modifier(self, incoming_damage):
-        return int(incoming_damage * 0.275)
-
-    def __str__(self):
-        return "Rune of Bulwark"
-
-    @property
-    def description(self):
-        return "An Ancient rune which is triggered with your blood."
-
-    @property
-    def effect(self):
-        return "Lose 5 percent of your max health instantly, and block 27.5 percent of incoming damage."
-
-
-class VialIchorItem(Item):
-    """50 percent chance of healing or damaging you up to 15 percent."""
-
-    def health_modifier(self, max_health):
-        return int((random.randrange(-15, 16, 1)) * 0.01 * max_health)
-
-    def __str__(self):
-        return "Vial of Ichor"
-
-    @property
-    def description(self):
-        return "A vial filled with a peculiar glowing substance, use at your own risk."
-
-    @property
-    def effect(self):
-        return "Randomizes from -15 percent to 15 percent which will be added to your health."
-
-
-class MermaidTearItem(Item):
-    """Heal 17.5 percent of max health instantly, but incoming damage is multiplied by 1.75."""
+        """Return damage blocked from the incoming damage, negative when more damage is taken."""
+        return apply_effect(self.id, "damage", incoming_damage)
 
     def health_modifier(self, max_health):
-        return int(max_health * 0.175)
-
-    def damage_modifier(self, incoming_damage):
-        return -int(incoming_damage * 0.75)
-
-    def __str__(self):
-        return "Mermaid Tears"
-
-    @property
-    def description(self):
-        return "Legend has it, these tears were from a grieving mother."
-
-    @property
-    def effect(self):
-        return "Heal 17.5 percent of max health instantly, but gain 1.75 multiplier to incoming damage."
-
-
-class GloveMidasItem(Item):
-    """Ensures you get a cursed item and times it by 2."""
+        """Return health points healed, negative when health is lost."""
+        return apply_effect(self.id, "health", max_health)
 
     def item_modifier(self, item):
-        return 1
+        """Return extra items looted."""
+        return apply_effect(self.id, "item", item)
 
     def __str__(self):
-        return "Glove of Midas"
-
-    @property
-    def description(self):
-        return "A glove enchanted with replication magic."
-
-    @property
-    def effect(self):
-        return "Ensures that 2 items of the same kind drop from monster."
+        return self.name
 
 
 class ItemCatalog:
     """Dataclass containing all items and their corresponding index."""
 
-    __ITEMS = {0: DungeonCandyItem(), 1: WoodenShieldItem(),
-               6: PotionItem(), 7: CrossBowItem(), 8: ShieldItem(), 9: CoinBagItem(),
-
-               10: MegaPotionItem(), 11: SmokeBombItem(), 12: GreatShieldItem(), 13: AmbrosiaItem(),
-               14: BookAlchemyItem(), 15: GloveMidasItem(),
-
-               50: GreedyBagItem(), 51: BloodPactItem(), 52: PoisonousSmokeBombItem(), 53: AdrenalineItem(),
-               54: BrokenShieldItem(), 55: VialIchorItem(), 56: RuneBulwarkItem(), 57: MermaidTearItem(),
-
-               999: Item()}
-
-    __STORE_30 = [0, 1, 9]
-    __STORE_80 = [6, 7, 8]
+    __ITEMS = {item_id: Item(item_id, name, description, effect)
+               for item_id, (name, description, effect, _) in ITEM_TABLE.items()}
+    __CHEST = tuple(item_id for item_id in ITEM_TABLE if 10 <= item_id < 20)
+    __CURSED = tuple(item_id for item_id in ITEM_TABLE if 50 <= item_id < 60)
 
     def get_item(self, index: int):
         """Return item to the corresponding index."""
         return self.__ITEMS[index]
-        
+
+    def get_store_prices(self):
+        """Return price of each item sold in the store."""
+        return dict(STORE_PRICES)
+
     def get_store_items(self):
         in_store = {}
-        for index in self.__STORE_30:
+        for index, price in self.get_store_prices().items():
             item = self.get_item(index)
-            in_store[str(item)] = [index, 30, item.description, item.effect]
-        for index in self.__STORE_80:
-            item = self.get_item(index)
-            in_store[str(item)] = [index, 80, item.description, item.effect]
+            in_store[str(item)] = [index, price, item.description, item.effect]
         return in_store
 
     def get_chest_items(self):
-        return [key for key in self.__ITEMS.keys() if (10 <= key < 20)]
+        """Return ids of the items found in treasure chests."""
+        return self.__CHEST
 
     def get_cursed_items(self):
-        return [key for key in self.__ITEMS.keys() if (50 <= key < 60)]
-
+        """Return ids of the cursed items looted from monsters."""
+        return self.__CURSED
@@ -0,0 +1,100 @@
+"""Module that records dungeon runs as an append-only journal of events with periodic snapshots."""
+from .dungeon_run import RUN_ACTIVITIES, RUN_FIELDS
+from .models import RunEvent, RunEventKind, RunSnapshot
+
+SNAPSHOT_EVENTS = 50
+STATE_FIELDS = tuple((name, field) for name, fields in RUN_FIELDS.items() for field in fields if field != 'journal_seq')
+
+
+def run_state(game):
+    """Return the journaled run fields of a game context by field name."""
+    return {field: getattr(getattr(game, name), field) for name, field in STATE_FIELDS}
+
+
+class RunJournal:
+    """
+    Journal of the dungeon run of one request. Each event gets the run fields that changed from it until
+    the next event, the events are appended to the log's pending events and written with it.
+    """
+
+    def __init__(self, game):
+        self.game = game
+        self.state = run_state(game)
+        self.events = []
+        self.snapshot = None
+
+    def take_changes(self):
+        """Return the run fields changed since the last call, by field name."""
+        state = run_state(self.game)
+        changes = {field: value for field, value in state.items() if self.state.get(field) != value}
+        self.state = state
+        return changes
+
+    def attach(self, changes: dict):
+        """Add changes to the last event of the request, and to its snapshot."""
+        self.events[-1].changes.update(changes)
+        if self.snapshot is not None and self.snapshot.seq == self.events[-1].seq:
+            self.snapshot.state.update(changes)
+
+    def append(self, kind, changes: dict, question_id: int = None, item_id: int = None):
+        """Append an event to the log's pending events, with a snapshot at the start of a run and periodically."""
+        log = self.game.log
+        log.journal_seq += 1
+        event = RunEvent(player=self.game.player, seq=log.journal_seq, kind=kind,
+                         question_id=question_id, item_id=item_id, changes=changes)
+        self.events.append(event)
+        log.pending_events = tuple(log.pending_events) + (event,)
+        if kind == RunEventKind.START or event.seq % SNAPSHOT_EVENTS == 0:
+            self.snapshot = RunSnapshot(player=self.game.player, seq=event.seq, state=dict(self.state))
+            log.pending_snapshots = tuple(log.pending_snapshots) + (self.snapshot,)
+        log.save()
+
+    def record(self, kind, question_id: int = None, item_id: int = None):
+        """
+        Append an event, the changes made before it go to the previous event of the request.
+        :param kind: RunEventKind of the event
+        :param question_id: question encountered, answered or fled from
+        :param item_id: item used or found
+        """
+        changes = self.take_changes()
+        if self.events:
+            self.attach(changes)
+            changes = {}
+        self.append(kind, changes, question_id, item_id)
+
+    def finish(self):
+        """Give the changes left at the end of the request to its last event, or to a state event in the dungeon."""
+        before = self.state['activity_state']
+        changes = self.take_changes()
+        if not changes:
+            return
+        if self.events:
+            self.attach(changes)
+        elif before in RUN_ACTIVITIES or self.state['activity_state'] in RUN_ACTIVITIES:
+            self.append(RunEventKind.STATE, changes)
+
+
+def attach_journal(game, unit_of_work):
+    """Record the dungeon run of the request in a journal, finished when the unit of work flushes."""
+    game.log.journal = RunJournal(game)
+    unit_of_work.before_flush(game.log.journal.finish)
+
+
+def rebuild_state(player_id, seq: int = None):
+    """
+    Rebuild the run fields of a player from the latest snapshot and the events after it.
+    :param player_id:
+    :param seq: rebuild the state after this event instead of the last one
+    :return: run fields by name, or None when the player has no snapshot
+    """
+    snapshots = RunSnapshot.objects.filter(player_id=player_id)
+    events = RunEvent.objects.filter(player_id=player_id)
+    if seq is not None:
+        snapshots, events = snapshots.filter(seq__lte=seq), events.filter(seq__lte=seq)
+    snapshot = snapshots.order_by('-seq').first()
+    if snapshot is None:
+        return None
+    state = dict(snapshot.state)
+    for changes in events.filter(seq__gt=snapshot.seq).order_by('seq').values_list('changes', flat=True):
+        state.update(changes)
+    return state
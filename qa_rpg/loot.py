@@ -0,0 +1,115 @@
+"""Module that contains the weighted drop tables of chests, monster corpses and treasure coins."""
+import json
+import logging
+import os
+import random
+import threading
+import time
+
+from django.conf import settings
+
+from .items_catalog import ITEM_TABLE
+
+RELOAD_INTERVAL = 5
+ITEM_TABLES = ("chest", "cursed")
+TABLES = ITEM_TABLES + ("treasure_coins",)
+
+logger = logging.getLogger(__name__)
+
+
+class AliasTable:
+    """Walker alias table, draws an outcome by weight with two uniform numbers whatever the number of outcomes."""
+
+    def __init__(self, weights: dict):
+        """
+        Build the table with Vose's method.
+        :param weights: positive weight of each outcome
+        """
+        if not weights or any(weight <= 0 for weight in weights.values()):
+            raise ValueError("A drop table needs outcomes with positive weights.")
+        self.outcomes = tuple(weights)
+        size, total = len(weights), sum(weights.values())
+        scaled = [weight * size / total for weight in weights.values()]
+        self.probability, self.alias = [1.0] * size, list(range(size))
+        small = [index for index, value in enumerate(scaled) if value < 1]
+        large = [index for index, value in enumerate(scaled) if value >= 1]
+        while small and large:
+            less, more = small.pop(), large.pop()
+            self.probability[less], self.alias[less] = scaled[less], more
+            scaled[more] -= 1 - scaled[less]
+            (small if scaled[more] < 1 else large).append(more)
+
+    def draw(self):
+        """Return an outcome drawn by weight."""
+        column = int(random.random() * len(self.outcomes))
+        if random.random() < self.probability[column]:
+            return self.outcomes[column]
+        return self.outcomes[self.alias[column]]
+
+
+def compile_tables(data: dict):
+    """
+    Compile the drop tables of a data file into alias tables.
+    :param data: weights of each table keyed by outcome, as loaded from the json file
+    :return: dictionary of AliasTable by table name
+    """
+    tables = {}
+    for name in TABLES:
+        weights = {int(outcome): float(weight) for outcome, weight in data[name].items()}
+        if name in ITEM_TABLES and not set(weights) <= set(ITEM_TABLE):
+            raise ValueError(f"Drop table '{name}' has unknown items {sorted(set(weights) - set(ITEM_TABLE))}.")
+        tables[name] = AliasTable(weights)
+    return tables
+
+
+class LootTables:
+    """
+    Drop tables loaded from a json file. The file is checked for changes at most every reload interval,
+    so every worker picks up new weights without a restart. A file that fails to load keeps the previous tables.
+    """
+
+    def __init__(self, path=None, reload_interval: float = RELOAD_INTERVAL):
+        self.__path = path
+        self.__reload_interval = reload_interval
+        self.__tables = None
+        self.__modified = None
+        self.__checked_at = None
+        self.__lock = threading.Lock()
+
+    @property
+    def path(self):
+        return self.__path or settings.LOOT_TABLES_PATH
+
+    def __ensure_loaded(self):
+        """Reload the tables when the file changed since they were loaded."""
+        now = time.monotonic()
+        if self.__checked_at is not None and now - self.__checked_at < self.__reload_interval:
+            return
+        with self.__lock:
+            if self.__checked_at is not None and now - self.__checked_at < self.__reload_interval:
+                return
+            self.__checked_at = now
+            try:
+                modified = os.stat(self.path).st_mtime_ns
+                if modified == self.__modified:
+                    return
+                with open(self.path) as data_file:
+                    self.__tables = compile_tables(json.load(data_file))
+                self.__modified = modified
+            except (OSError, ValueError, KeyError, TypeError, AttributeError) as error:
+                if self.__tables is None:
+                    raise
+                logger.error(f"Drop tables of {self.path} were not reloaded: {error}")
+
+    def reload(self):
+        """Check the file for changes on the next draw."""
+        with self.__lock:
+            self.__checked_at = None
+
+    def draw(self, name: str):
+        """Return an outcome of a drop table drawn by weight."""
+        self.__ensure_loaded()
+        return self.__tables[name].draw()
+
+
+loot_tables = LootTables()
@@ -0,0 +1,56 @@
+"""Command that audits the stored correct choice of every question."""
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from qa_rpg.models import Question, Choice
+
+
+class Command(BaseCommand):
+    help = "Scan questions in chunks for a missing, ambiguous or stale correct choice pointer."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=1000,
+                            help="Number of questions audited per query.")
+        parser.add_argument('--fix', action='store_true',
+                            help="Repoint stale pointers to the first correct choice, or to none.")
+
+    def handle(self, *args, **options):
+        chunk_size = options['chunk_size']
+        checked = missing = ambiguous = stale = 0
+        last_pk = 0
+        while True:
+            questions = list(Question.objects.filter(pk__gt=last_pk).order_by('pk')
+                             .only('pk', 'correct_choice')[:chunk_size])
+            if not questions:
+                break
+            last_pk = questions[-1].pk
+            correct = {}
+            for question_id, choice_id in (Choice.objects.filter(question_id__in=[question.pk for question in questions],
+                                                                 correct_answer=True)
+                                           .values_list('question_id', 'pk')):
+                correct.setdefault(question_id, []).append(choice_id)
+
+            repoint = []
+            for question in questions:
+                choice_ids = correct.get(question.pk, [])
+                if not choice_ids:
+                    missing += 1
+                    self.stdout.write(f"Question({question.pk}) has no correct choice.")
+                elif len(choice_ids) > 1:
+                    ambiguous += 1
+                    self.stdout.write(f"Question({question.pk}) has {len(choice_ids)} correct choices.")
+                expected = choice_ids[0] if choice_ids else None
+                if question.correct_choice_id != expected and not (len(choice_ids) > 1 and
+                                                                   question.correct_choice_id in choice_ids):
+                    stale += 1
+                    self.stdout.write(f"Question({question.pk}) points to choice {question.correct_choice_id}.")
+                    question.correct_choice_id = expected
+                    repoint.append(question)
+            checked += len(questions)
+            if repoint and options['fix']:
+                with transaction.atomic():
+                    Question.objects.bulk_update(repoint, ['correct_choice'])
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Checked {checked} questions: {missing} without a correct choice, {ambiguous} with several, "
+            f"{stale} {'repointed' if options['fix'] else 'with a stale pointer'}."))
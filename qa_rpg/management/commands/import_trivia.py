@@ -0,0 +1,103 @@
+"""Command that imports questions from the Open Trivia Database API or from question pack dumps."""
+import contextlib
+import itertools
+import json
+import os
+import time
+import urllib.request
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from qa_rpg.question_pool import question_pool
+from qa_rpg.trivia import TriviaImporter, iter_trivia_records, DEFAULT_BATCH_SIZE, DEFAULT_DAMAGE
+
+
+class Command(BaseCommand):
+    help = "Stream trivia questions from an Open Trivia Database url or a local JSON/JSONL question pack."
+
+    def add_arguments(self, parser):
+        parser.add_argument('source', help="Open Trivia Database API url, e.g. https://opentdb.com/api.php?amount=50, "
+                                           "or path of a JSON or JSONL question pack.")
+        parser.add_argument('--format', choices=['json', 'jsonl'], default=None,
+                            help="Format of the source, guessed from its extension by default.")
+        parser.add_argument('--owner', default=settings.SYSTEM_USER_ID,
+                            help="Primary key or username of the user owning the imported questions.")
+        parser.add_argument('--category', default=None,
+                            help="Category given to every question instead of the category of the record.")
+        parser.add_argument('--damage', type=int, default=DEFAULT_DAMAGE, help="Damage of the imported questions.")
+        parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE,
+                            help="Number of questions inserted per bulk insert.")
+        parser.add_argument('--checkpoint', default=None,
+                            help="File recording how many records were committed, an interrupted import "
+                                 "resumes from it. Every batch is committed on its own.")
+        parser.add_argument('--low-memory', action='store_true',
+                            help="Look up duplicates per batch instead of preloading the owner's questions.")
+
+    def get_owner(self, owner):
+        """Return the user with the given primary key or username."""
+        User = get_user_model()
+        try:
+            return User.objects.get(pk=owner)
+        except (User.DoesNotExist, ValidationError):
+            try:
+                return User.objects.get(username=owner)
+            except User.DoesNotExist:
+                raise CommandError(f"User '{owner}' does not exist.")
+
+    @staticmethod
+    def open_source(source):
+        """Open a url or a local file as a binary stream."""
+        if '://' in source:
+            return urllib.request.urlopen(source)
+        return open(source, 'rb')
+
+    @staticmethod
+    def read_checkpoint(path, source):
+        """Return the number of records already committed from the source."""
+        if path is None or not os.path.exists(path):
+            return 0
+        with open(path) as file:
+            checkpoint = json.load(file)
+        if checkpoint['source'] != source:
+            raise CommandError(f"Checkpoint {path} belongs to {checkpoint['source']}.")
+        return checkpoint['offset']
+
+    @staticmethod
+    def write_checkpoint(path, source, offset):
+        """Atomically record the number of committed records."""
+        with open(f"{path}.tmp", 'w') as file:
+            json.dump({'source': source, 'offset': offset}, file)
+        os.replace(f"{path}.tmp", path)
+
+    def handle(self, *args, **options):
+        owner = self.get_owner(options['owner'])
+        source, checkpoint = options['source'], options['checkpoint']
+        data_format = options['format'] or ('jsonl' if source.split('?')[0].endswith(('.jsonl', '.ndjson'))
+                                            else 'json')
+        offset = self.read_checkpoint(checkpoint, source)
+
+        def save_progress(importer):
+            self.write_checkpoint(checkpoint, source, offset + importer.processed)
+        on_flush = save_progress if checkpoint is not None else None
+
+        start = time.perf_counter()
+        importer = TriviaImporter(owner, category=options['category'], damage=options['damage'],
+                                  batch_size=options['batch_size'], low_memory=options['low_memory'],
+                                  on_flush=on_flush)
+        atomic = transaction.atomic() if checkpoint is None else contextlib.nullcontext()
+        with self.open_source(source) as stream, atomic:
+            records = itertools.islice(iter_trivia_records(stream, data_format), offset, None)
+            importer.add_all(records)
+        question_pool.invalidate()
+        elapsed = time.perf_counter() - start
+
+        rows = importer.created + importer.choices_created
+        resumed = f" after resuming at record {offset}" if offset else ""
+        self.stdout.write(self.style.SUCCESS(
+            f"Imported {importer.created} questions and {importer.choices_created} choices, "
+            f"skipped {importer.skipped} duplicates{resumed} in {elapsed:.2f}s "
+            f"({rows / max(elapsed, 1e-9):.0f} rows/sec)."))
@@ -0,0 +1,53 @@
+"""Command that rebuilds the report and commend counters of every question."""
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count
+
+from qa_rpg.models import Question, ReportAndCommend, VOTE_COUNTERS
+
+
+class Command(BaseCommand):
+    help = "Recount the votes of every question and fix counters that drifted."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=1000,
+                            help="Number of questions recounted per query.")
+        parser.add_argument('--check', action='store_true',
+                            help="Only report questions with wrong counters, do not fix them.")
+
+    def handle(self, *args, **options):
+        chunk_size = options['chunk_size']
+        checked = drifted = 0
+        last_pk = 0
+        while True:
+            questions = list(Question.objects.filter(pk__gt=last_pk).order_by('pk')
+                             .only('pk', *VOTE_COUNTERS.values())[:chunk_size])
+            if not questions:
+                break
+            last_pk = questions[-1].pk
+            counts = {}
+            votes = (ReportAndCommend.objects.filter(question_id__in=[question.pk for question in questions])
+                     .values_list('question_id', 'vote').annotate(total=Count('pk')).order_by())
+            for question_id, vote, total in votes:
+                counts[(question_id, vote)] = total
+
+            wrong = []
+            for question in questions:
+                changed = False
+                for vote, counter in VOTE_COUNTERS.items():
+                    total = counts.get((question.pk, vote), 0)
+                    if getattr(question, counter) != total:
+                        setattr(question, counter, total)
+                        changed = True
+                if changed:
+                    wrong.append(question)
+                    self.stdout.write(f"Question({question.pk}) has {question.report_count} reports "
+                                      f"and {question.commend_count} commends.")
+            checked += len(questions)
+            drifted += len(wrong)
+            if wrong and not options['check']:
+                with transaction.atomic():
+                    Question.objects.bulk_update(wrong, list(VOTE_COUNTERS.values()))
+
+        action = "found" if options['check'] else "fixed"
+        self.stdout.write(self.style.SUCCESS(f"Checked {checked} questions, {action} {drifted} drifted counters."))
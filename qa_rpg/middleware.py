@@ -0,0 +1,160 @@
+"""Module containing the middlewares of the game."""
+import asyncio
+from typing import NamedTuple
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import transaction
+from django.utils.functional import SimpleLazyObject
+
+from .dungeon_run import attach_run
+from .inventory_codec import encode_counts
+from .journal import attach_journal
+from .models import Player, Log, Inventory
+from .unit_of_work import UnitOfWork, current_unit_of_work
+
+
+STARTING_ITEMS = {0: 5}
+STARTING_TEMPLATES = {0: 1, 1: 1}
+
+
+class GameContext(NamedTuple):
+    """Player state shared by the game views of a request."""
+
+    player: Player
+    log: Log
+    inventory: Inventory
+
+
+def load_game_context(user):
+    """
+    Load the player of the user with their log, inventory and user in one joined query,
+    creating whichever of them is missing in one transaction.
+    :param user: logged in User
+    :return: GameContext of the user
+    """
+    try:
+        player = Player.objects.select_related('user', 'log', 'inventory').get(user=user)
+        if hasattr(player, 'log') and hasattr(player, 'inventory'):
+            return GameContext(player, player.log, player.inventory)
+    except Player.DoesNotExist:
+        player = None
+    with transaction.atomic():
+        if player is None:
+            player = Player.objects.create(user=user)
+        if not hasattr(player, 'log'):
+            Log.objects.create(player=player)
+        if not hasattr(player, 'inventory'):
+            # The starting grant is written with the row, as the unit of work would defer updates to it.
+            Inventory.objects.create(player=player, player_inventory=encode_counts(STARTING_ITEMS),
+                                     question_template=encode_counts(STARTING_TEMPLATES))
+    return GameContext(player, player.log, player.inventory)
+
+
+async def aload_game_context(user):
+    """
+    Load the game context of the user with the async ORM, see load_game_context.
+    A player missing their log or inventory is completed by load_game_context in a thread.
+    :param user: logged in User
+    :return: GameContext of the user
+    """
+    try:
+        player = await Player.objects.select_related('user', 'log', 'inventory').aget(user=user)
+        if hasattr(player, 'log') and hasattr(player, 'inventory'):
+            return GameContext(player, player.log, player.inventory)
+    except Player.DoesNotExist:
+        pass
+    return await sync_to_async(load_game_context)(user)
+
+
+def mark_coroutine(middleware):
+    """
+    Mark a middleware as a coroutine function for the handler when it wraps an async handler,
+    its __call__ has to return a coroutine then.
+    :param middleware: middleware instance with get_response set
+    :return: whether the middleware runs in async mode
+    """
+    if asyncio.iscoroutinefunction(middleware.get_response):
+        middleware._is_coroutine = asyncio.coroutines._is_coroutine
+        return True
+    return False
+
+
+class UnitOfWorkMiddleware:
+    """Run every request in a unit of work, so player, log and inventory rows are written once at the end."""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = mark_coroutine(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        with UnitOfWork() as unit_of_work:
+            request.unit_of_work = unit_of_work
+            response = self.get_response(request)
+        return response
+
+    async def __acall__(self, request):
+        async with UnitOfWork() as unit_of_work:
+            request.unit_of_work = unit_of_work
+            response = await self.get_response(request)
+        return response
+
+    def process_exception(self, request, exception):
+        """Drop the pending writes of a view that raised."""
+        request.unit_of_work.discard()
+
+
+class GameContextMiddleware:
+    """
+    Expose the player, log and inventory of the logged in user as request.game, loaded on first use.
+    Async views load it with aload instead, as the lazy load runs synchronous queries.
+    The run fields of a player in the dungeon are read from and written to the cache, see dungeon_run.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        mark_coroutine(self)
+
+    def __call__(self, request):
+        # Under an async handler get_response returns the coroutine of the response, which is returned as is.
+        request.game = SimpleLazyObject(lambda: self.load(request.user))
+        return self.get_response(request)
+
+    @staticmethod
+    def load(user):
+        """Load the game context of the user, with the dungeon run they are in and its journal."""
+        game = load_game_context(user)
+        unit_of_work = current_unit_of_work()
+        if unit_of_work is not None:
+            attach_run(game, unit_of_work)
+            attach_journal(game, unit_of_work)
+        return game
+
+    @staticmethod
+    async def aload(request):
+        """
+        Load the game context of the request in an async view, with its log entries, and set it as request.game.
+        The run fields are always held, so nothing is written before the flush, which checkpoints
+        on every request when the run is not kept in the cache.
+        :param request: HTML request
+        :return: GameContext of the logged in user, or None for an anonymous user
+        """
+        user = await sync_to_async(lambda: request.user if request.user.is_authenticated else None)()
+        if user is None:
+            return None
+        game = await aload_game_context(user)
+        unit_of_work = current_unit_of_work()
+        if unit_of_work is not None:
+            attach_run(game, unit_of_work, checkpoint_clicks=max(1, settings.DUNGEON_CHECKPOINT_CLICKS))
+            attach_journal(game, unit_of_work)
+        await game.log.arecent_entries()
+        request.game = game
+        return game
@@ -0,0 +1,28 @@
+# Generated by Django 4.1.5 on 2026-10-18 14:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('qa_rpg', '0004_alter_user_email'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='log',
+            name='deck_cursor',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='log',
+            name='deck_seed',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='log',
+            name='deck_size',
+            field=models.IntegerField(default=0),
+        ),
+    ]
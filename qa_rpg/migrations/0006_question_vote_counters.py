@@ -0,0 +1,35 @@
+# Generated by Django 4.1.5 on 2026-10-18 14:44
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def count_votes(apps, schema_editor):
+    Question = apps.get_model('qa_rpg', 'Question')
+    ReportAndCommend = apps.get_model('qa_rpg', 'ReportAndCommend')
+    for counter, vote in (('report_count', 0), ('commend_count', 1)):
+        votes = (ReportAndCommend.objects.filter(question=OuterRef('pk'), vote=vote)
+                 .order_by().values('question').annotate(total=Count('pk')).values('total'))
+        Question.objects.update(**{counter: Coalesce(Subquery(votes), 0)})
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('qa_rpg', '0005_log_question_deck'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='question',
+            name='commend_count',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='question',
+            name='report_count',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.RunPython(count_votes, migrations.RunPython.noop),
+    ]
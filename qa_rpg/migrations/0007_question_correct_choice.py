@@ -0,0 +1,28 @@
+# Generated by Django 4.1.5 on 2026-10-18 14:50
+
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+import django.db.models.deletion
+
+
+def point_correct_choice(apps, schema_editor):
+    Question = apps.get_model('qa_rpg', 'Question')
+    Choice = apps.get_model('qa_rpg', 'Choice')
+    correct = Choice.objects.filter(question=OuterRef('pk'), correct_answer=True).order_by('pk').values('pk')[:1]
+    Question.objects.update(correct_choice=Subquery(correct))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('qa_rpg', '0006_question_vote_counters'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='question',
+            name='correct_choice',
+            field=models.ForeignKey(blank=True, editable=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='qa_rpg.choice'),
+        ),
+        migrations.RunPython(point_correct_choice, migrations.RunPython.noop),
+    ]
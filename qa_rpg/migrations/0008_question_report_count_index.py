@@ -0,0 +1,18 @@
+# Generated by Django 4.1.5 on 2026-10-18 14:53
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('qa_rpg', '0007_question_correct_choice'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='question',
+            name='report_count',
+            field=models.IntegerField(db_index=True, default=0),
+        ),
+    ]
@@ -0,0 +1,57 @@
+# Generated by Django 4.1.5 on 2026-10-18 14:57
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+LOG_CAPACITY = 10
+
+
+def copy_log_text(apps, schema_editor):
+    Log = apps.get_model('qa_rpg', 'Log')
+    LogEntry = apps.get_model('qa_rpg', 'LogEntry')
+    entries = []
+    for log in Log.objects.only('pk', 'log_text').iterator(chunk_size=2000):
+        lines = [line for line in log.log_text.split(';')[:-1] if line][-LOG_CAPACITY:]
+        for seq, line in enumerate(lines):
+            style, separator, text = line.partition(':')
+            if not separator:
+                style, text = '', line
+            entries.append(LogEntry(log_id=log.pk, slot=seq, seq=seq, style=style, text=text))
+        if len(entries) >= 2000:
+            LogEntry.objects.bulk_create(entries)
+            entries = []
+    LogEntry.objects.bulk_create(entries)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('qa_rpg', '0008_question_report_count_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LogEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('slot', models.PositiveSmallIntegerField()),
+                ('seq', models.IntegerField()),
+                ('style', models.CharField(blank=True, default='', max_length=50)),
+                ('text', models.CharField(max_length=300)),
+                ('log', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='entries', to='qa_rpg.log')),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='logentry',
+            index=models.Index(fields=['log', '-seq'], name='log_entry_recent'),
+        ),
+        migrations.AddConstraint(
+            model_name='logentry',
+            constraint=models.UniqueConstraint(fields=('log', 'slot'), name='unique_log_slot'),
+        ),
+        migrations.RunPython(copy_log_text, migrations.RunPython.noop),
+        migrations.RemoveField(
+            model_name='log',
+            name='log_text',
+        ),
+    ]
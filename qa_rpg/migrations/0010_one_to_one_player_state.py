@@ -0,0 +1,42 @@
+# Generated by Django 4.1.5 on 2026-10-18 15:02
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+from django.db.models import Count, Min
+
+
+def drop_duplicates(apps, schema_editor):
+    """Keep the oldest row of each owner, the views always expected a single one."""
+    for model_name, owner in (('Player', 'user'), ('Log', 'player'), ('Inventory', 'player')):
+        model = apps.get_model('qa_rpg', model_name)
+        duplicated = (model.objects.values(owner).annotate(rows=Count('pk'), keep=Min('pk'))
+                      .filter(rows__gt=1).order_by())
+        for row in duplicated:
+            model.objects.filter(**{owner: row[owner]}).exclude(pk=row['keep']).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('qa_rpg', '0009_log_entry'),
+    ]
+
+    operations = [
+        migrations.RunPython(drop_duplicates, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='inventory',
+            name='player',
+            field=models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, to='qa_rpg.player'),
+        ),
+        migrations.AlterField(
+            model_name='log',
+            name='player',
+            field=models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, to='qa_rpg.player'),
+        ),
+        migrations.AlterField(
+            model_name='player',
+            name='user',
+            field=models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL),
+        ),
+    ]
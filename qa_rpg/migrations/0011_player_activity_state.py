@@ -0,0 +1,74 @@
+# Generated by Django 4.1.5 on 2026-10-18 15:06
+
+import re
+
+from django.db import migrations, models
+
+STATES = {'index', 'select_dg', 'dungeon', 'treasure', 'found monster', 'battle',
+          'template', 'choose', 'summon', 'profile', 'shop', 'upgrade'}
+ALIASES = {'select': 'select_dg', 'select_items': 'select_dg', 'buy': 'shop'}
+FIELDS = ['activity_state', 'battle_question_id', 'summon_template', 'summon_choices']
+LEGACY_ACTIVITY = re.compile(r'(battle|choose|summon)(\d*)(?: (\d+))?')
+
+
+def split_activity(apps, schema_editor):
+    """Move the activity strings into the state and payload fields, unknown activities go back to index."""
+    Player = apps.get_model('qa_rpg', 'Player')
+    players = []
+    for player in Player.objects.only('pk', 'activity').iterator(chunk_size=2000):
+        activity = ALIASES.get(player.activity, player.activity)
+        match = LEGACY_ACTIVITY.fullmatch(activity)
+        if activity in STATES:
+            player.activity_state = activity
+        elif match is not None:
+            name, number, template = match.group(1), match.group(2), match.group(3)
+            number = int(number) if number else None
+            player.activity_state = name
+            if name == 'battle':
+                player.battle_question_id = number
+            elif name == 'choose':
+                player.summon_template = number
+            else:
+                player.summon_choices, player.summon_template = number, int(template) if template else None
+        else:
+            player.activity_state = 'index'
+        players.append(player)
+        if len(players) >= 2000:
+            Player.objects.bulk_update(players, FIELDS)
+            players = []
+    Player.objects.bulk_update(players, FIELDS)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('qa_rpg', '0010_one_to_one_player_state'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='player',
+            name='activity_state',
+            field=models.CharField(choices=[('index', 'Index'), ('select_dg', 'Select Dungeon'), ('dungeon', 'Dungeon'), ('treasure', 'Treasure'), ('found monster', 'Found Monster'), ('battle', 'Battle'), ('template', 'Template'), ('choose', 'Choose'), ('summon', 'Summon'), ('profile', 'Profile'), ('shop', 'Shop'), ('upgrade', 'Upgrade')], default='index', max_length=20),
+        ),
+        migrations.AddField(
+            model_name='player',
+            name='battle_question_id',
+            field=models.IntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='player',
+            name='summon_choices',
+            field=models.IntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='player',
+            name='summon_template',
+            field=models.IntegerField(blank=True, null=True),
+        ),
+        migrations.RunPython(split_activity, migrations.RunPython.noop),
+        migrations.RemoveField(
+            model_name='player',
+            name='activity',
+        ),
+    ]
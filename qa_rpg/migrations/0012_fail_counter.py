@@ -0,0 +1,35 @@
+# Generated by Django 4.1.5 on 2026-10-18 15:15
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def create_counters(apps, schema_editor):
+    """Give every existing question an empty fail counter."""
+    Question = apps.get_model('qa_rpg', 'Question')
+    FailCounter = apps.get_model('qa_rpg', 'FailCounter')
+    counters = []
+    for question_id in Question.objects.values_list('pk', flat=True).iterator(chunk_size=2000):
+        counters.append(FailCounter(question_id=question_id))
+        if len(counters) >= 2000:
+            FailCounter.objects.bulk_create(counters, ignore_conflicts=True)
+            counters = []
+    FailCounter.objects.bulk_create(counters, ignore_conflicts=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('qa_rpg', '0011_player_activity_state'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FailCounter',
+            fields=[
+                ('question', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='fail_counter', serialize=False, to='qa_rpg.question')),
+                ('fails', models.IntegerField(default=0)),
+            ],
+        ),
+        migrations.RunPython(create_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,50 @@
+# Generated by Django 4.1.5 on 2026-10-18 15:24
+
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('qa_rpg', '0012_fail_counter'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='log',
+            name='journal_seq',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.CreateModel(
+            name='RunSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('seq', models.IntegerField()),
+                ('state', models.JSONField(default=dict)),
+                ('player', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='run_snapshots', to='qa_rpg.player')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='RunEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('seq', models.IntegerField()),
+                ('kind', models.CharField(choices=[('start', 'Start'), ('walk', 'Walk'), ('treasure', 'Treasure'), ('encounter', 'Encounter'), ('correct', 'Correct'), ('wrong', 'Wrong'), ('flee', 'Flee'), ('item', 'Item'), ('exit', 'Exit'), ('death', 'Death'), ('state', 'State')], max_length=10)),
+                ('question_id', models.IntegerField(blank=True, null=True)),
+                ('item_id', models.IntegerField(blank=True, null=True)),
+                ('changes', models.JSONField(default=dict)),
+                ('created', models.DateTimeField(default=django.utils.timezone.now)),
+                ('player', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='run_events', to='qa_rpg.player')),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='runsnapshot',
+            constraint=models.UniqueConstraint(fields=('player', 'seq'), name='unique_run_snapshot'),
+        ),
+        migrations.AddConstraint(
+            model_name='runevent',
+            constraint=models.UniqueConstraint(fields=('player', 'seq'), name='unique_run_event'),
+        ),
+    ]
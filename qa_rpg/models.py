@@ -1,11 +1,22 @@
 """Module containing models for storing data in database."""
+import re
 import uuid
-from django.db import models
+from django.db import models, transaction
+from django.db.models import F
 from django.contrib.auth.models import AbstractUser
+from django.utils import timezone
 from django_cryptography.fields import encrypt
 
+from .inventory_codec import decode_counts, encode_counts
+from .unit_of_work import TrackedModelMixin
+
 BASE_LUCK = 0.25
 BASE_HEALTH = 100
+REPORT = 0
+COMMEND = 1
+VOTE_COUNTERS = {REPORT: 'report_count', COMMEND: 'commend_count'}
+LOG_CAPACITY = 10
+INVENTORY_FIELDS = {"player": "player_inventory", "dungeon": "dungeon_inventory", "template": "question_template"}
 
 
 class User(AbstractUser):
@@ -26,33 +37,80 @@ class Question(models.Model):
     owner = models.ForeignKey(User, on_delete=models.CASCADE)
     category = models.CharField(max_length=100, null=False, default="test")
     enable = models.BooleanField(default=True)
+    report_count = models.IntegerField(default=0, db_index=True)
+    commend_count = models.IntegerField(default=0)
+    correct_choice = models.ForeignKey('Choice', null=True, blank=True, editable=False,
+                                       on_delete=models.SET_NULL, related_name='+')
 
     @property
     def report(self):
         """Get amount of reports this question has."""
-        return ReportAndCommend.objects.filter(question=self, vote=0).count()
+        return self.report_count
 
     @property
     def commend(self):
         """Get amount of commends this question has."""
-        return ReportAndCommend.objects.filter(question=self, vote=1).count()
-
-    @property
-    def correct_choice(self):
-        """Get the correct answer of this question."""
-        return Choice.objects.get(question=self, correct_answer=True)
+        return self.commend_count
+
+    def save(self, *args, **kwargs):
+        """Save the question, a new question starts with an empty fail counter."""
+        adding = self._state.adding
+        super().save(*args, **kwargs)
+        if adding:
+            FailCounter.objects.create(question=self)
+
+    @classmethod
+    def record_fail(cls, question_id):
+        """Count a player failing a question without writing the question row, creating a missing counter."""
+        counters = FailCounter.objects.filter(question_id=question_id)
+        if not counters.update(fails=F('fails') + 1):
+            FailCounter.objects.bulk_create([FailCounter(question_id=question_id)], ignore_conflicts=True)
+            counters.update(fails=F('fails') + 1)
+
+    @classmethod
+    async def arecord_fail(cls, question_id):
+        """Count a player failing a question with the async ORM, see record_fail."""
+        counters = FailCounter.objects.filter(question_id=question_id)
+        if not await counters.aupdate(fails=F('fails') + 1):
+            await FailCounter.objects.abulk_create([FailCounter(question_id=question_id)], ignore_conflicts=True)
+            await counters.aupdate(fails=F('fails') + 1)
 
     def add_coin(self):
         """Add coins to question for owner to collect."""
-        if self.currency + self.rate <= self.max_currency:
-            self.currency += self.rate
-            self.save()
+        Question.record_fail(self.pk)
+        if Question.fail_counter.related.is_cached(self):
+            Question.fail_counter.related.delete_cached_value(self)
+
+    @property
+    def fails(self):
+        """Get amount of fails since the coins of this question were last claimed."""
+        try:
+            return self.fail_counter.fails
+        except FailCounter.DoesNotExist:
+            return 0
+
+    @property
+    def claimable(self):
+        """Get the coins the owner can claim, each fail earns the rate up to the maximum."""
+        return max(self.currency, min(self.max_currency, self.currency + self.fails * self.rate))
 
     def __str__(self):
         """Return Question string."""
         return self.question_text
 
 
+class FailCounter(models.Model):
+    """Fails of a question not yet turned into coins, kept apart so battles never write the question row."""
+
+    question = models.OneToOneField(Question, primary_key=True, on_delete=models.CASCADE,
+                                    related_name='fail_counter')
+    fails = models.IntegerField(default=0)
+
+    def __str__(self):
+        """Return the question and its fails."""
+        return f"{self.question_id}: {self.fails}"
+
+
 class Choice(models.Model):
     """Choice model for creating choices."""
 
@@ -60,6 +118,29 @@ class Choice(models.Model):
     choice_text = models.CharField(max_length=200)
     correct_answer = models.BooleanField()
 
+    _loaded_correct_answer = False
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        """Remember whether the stored choice was correct so that unmarking it clears the question pointer."""
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_correct_answer = instance.correct_answer
+        return instance
+
+    def save(self, *args, **kwargs):
+        """Save the choice and keep the correct choice pointer of its question in step."""
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            if self.correct_answer:
+                Question.objects.filter(pk=self.question_id).update(correct_choice=self)
+                if Choice.question.is_cached(self):
+                    self.question.correct_choice = self
+            elif self._loaded_correct_answer:
+                Question.objects.filter(pk=self.question_id, correct_choice=self).update(correct_choice=None)
+                if Choice.question.is_cached(self) and self.question.correct_choice_id == self.pk:
+                    self.question.correct_choice = None
+        self._loaded_correct_answer = self.correct_answer
+
     def __str__(self):
         """Return Choice string."""
         return self.choice_text
@@ -72,16 +153,111 @@ class ReportAndCommend(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE)
     vote = models.IntegerField()
 
-
-class Player(models.Model):
+    _loaded_vote = None
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        """Remember the stored vote so that a flipped vote moves the question counters."""
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_vote = instance.vote
+        return instance
+
+    def _update_counters(self, deltas: dict):
+        """Apply vote deltas to the question counters in the database and on a loaded question."""
+        Question.objects.filter(pk=self.question_id).update(
+            **{counter: F(counter) + delta for counter, delta in deltas.items()})
+        if ReportAndCommend.question.is_cached(self):
+            for counter, delta in deltas.items():
+                setattr(self.question, counter, getattr(self.question, counter) + delta)
+
+    def save(self, *args, **kwargs):
+        """Save the vote and keep the report and commend counters of the question in step."""
+        deltas = {}
+        if self._loaded_vote != self.vote:
+            if self._loaded_vote in VOTE_COUNTERS:
+                deltas[VOTE_COUNTERS[self._loaded_vote]] = -1
+            if self.vote in VOTE_COUNTERS:
+                deltas[VOTE_COUNTERS[self.vote]] = 1
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            if deltas:
+                self._update_counters(deltas)
+        self._loaded_vote = self.vote
+
+    def delete(self, *args, **kwargs):
+        """Delete the vote and remove it from the question counters."""
+        with transaction.atomic():
+            if self._loaded_vote in VOTE_COUNTERS:
+                self._update_counters({VOTE_COUNTERS[self._loaded_vote]: -1})
+            return super().delete(*args, **kwargs)
+
+
+class Activity(models.TextChoices):
+    """States of the player, each game page only accepts some of them."""
+
+    INDEX = "index"
+    SELECT_DUNGEON = "select_dg"
+    DUNGEON = "dungeon"
+    TREASURE = "treasure"
+    FOUND_MONSTER = "found monster"
+    BATTLE = "battle"
+    TEMPLATE = "template"
+    CHOOSE = "choose"
+    SUMMON = "summon"
+    PROFILE = "profile"
+    SHOP = "shop"
+    UPGRADE = "upgrade"
+
+
+# page a player is sent back to when the requested page does not accept their activity
+ACTIVITY_REDIRECTS = {activity: f"qa_rpg:{activity.value}" for activity in Activity}
+ACTIVITY_REDIRECTS[Activity.FOUND_MONSTER] = "qa_rpg:battle"
+ACTIVITY_REDIRECTS[Activity.CHOOSE] = "qa_rpg:summon"
+
+# legacy names that were only ever accepted through fuzzy matching
+ACTIVITY_ALIASES = {"select": Activity.SELECT_DUNGEON,
+                    "select_items": Activity.SELECT_DUNGEON,
+                    "buy": Activity.SHOP}
+LEGACY_ACTIVITY = re.compile(r'(battle|choose|summon)(\d*)(?: (\d+))?')
+
+
+def parse_activity(text: str):
+    """
+    Parse a legacy activity string such as "battle12", "choose3" or "summon4 3".
+    :param text: activity string
+    :return: tuple of Activity, question id, template index and choice count
+    :raise ValueError: the string is not a known activity
+    """
+    if text in ACTIVITY_ALIASES:
+        return ACTIVITY_ALIASES[text], None, None, None
+    if text in Activity.values:
+        return Activity(text), None, None, None
+    match = LEGACY_ACTIVITY.fullmatch(text)
+    if match is None:
+        raise ValueError(f"Unknown activity '{text}'.")
+    name, number, template = match.group(1), match.group(2), match.group(3)
+    number = int(number) if number else None
+    if name == "battle" and template is None:
+        return Activity.BATTLE, number, None, None
+    if name == "choose" and template is None:
+        return Activity.CHOOSE, None, number, None
+    if name == "summon":
+        return Activity.SUMMON, None, int(template) if template else None, number
+    raise ValueError(f"Unknown activity '{text}'.")
+
+
+class Player(TrackedModelMixin, models.Model):
     """Player model for creating players."""
 
-    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    user = models.OneToOneField(User, on_delete=models.CASCADE)
     max_hp = models.IntegerField(default=BASE_HEALTH)
     current_hp = models.IntegerField(default=BASE_HEALTH)
     currency = models.IntegerField(default=0)
     dungeon_currency = models.IntegerField(default=0)
-    activity = models.CharField(max_length=100, default="index")
+    activity_state = models.CharField(max_length=20, choices=Activity.choices, default=Activity.INDEX)
+    battle_question_id = models.IntegerField(null=True, blank=True)
+    summon_template = models.IntegerField(null=True, blank=True)
+    summon_choices = models.IntegerField(null=True, blank=True)
     luck = models.FloatField(default=BASE_LUCK)
     awake = models.IntegerField(default=0)
     question_max_currency = models.IntegerField(default=20)
@@ -111,61 +287,159 @@ class Player(models.Model):
         self.save()
 
     def add_dungeon_currency(self):
-        """Transfer coins from dungeon to main storage."""
-        self.currency += self.dungeon_currency
-        self.dungeon_currency = 0
-        self.save()
+        """Transfer coins from dungeon to main storage with a single update."""
+        with transaction.atomic():
+            Player.objects.filter(pk=self.pk).update(currency=F('currency') + self.dungeon_currency,
+                                                     dungeon_currency=0)
+            self.refresh_stored_fields('currency', 'dungeon_currency')
+
+    async def aadd_dungeon_currency(self):
+        """Transfer coins from dungeon to main storage with the async ORM, see add_dungeon_currency."""
+        await Player.objects.filter(pk=self.pk).aupdate(currency=F('currency') + self.dungeon_currency,
+                                                        dungeon_currency=0)
+        await self.arefresh_stored_fields('currency', 'dungeon_currency')
 
-    def set_activity(self, activity: str):
-        """Set player activity."""
-        self.activity = activity
+    @property
+    def activity(self):
+        """Return the activity in its legacy string form, e.g. "battle12" or "summon4 3"."""
+        if self.activity_state == Activity.BATTLE and self.battle_question_id is not None:
+            return f"battle{self.battle_question_id}"
+        if self.activity_state == Activity.CHOOSE and self.summon_template is not None:
+            return f"choose{self.summon_template}"
+        if self.activity_state == Activity.SUMMON:
+            template = f" {self.summon_template}" if self.summon_template is not None else ""
+            return f"summon{self.summon_choices or ''}{template}"
+        return str(self.activity_state)
+
+    @activity.setter
+    def activity(self, text: str):
+        """Set the activity from its legacy string form."""
+        self.activity_state, self.battle_question_id, self.summon_template, self.summon_choices = \
+            parse_activity(text)
+
+    def set_activity(self, activity, question_id: int = None, template: int = None, choices: int = None):
+        """
+        Set player activity.
+        :param activity: Activity, or its legacy string form
+        :param question_id: question fought in battle
+        :param template: index of the template chosen for summoning
+        :param choices: number of choices of the summoned question
+        """
+        if isinstance(activity, Activity):
+            self.activity_state, self.battle_question_id = activity, question_id
+            self.summon_template, self.summon_choices = template, choices
+        else:
+            self.activity = activity
         self.save()
 
+    def in_battle(self, question_id: int):
+        """Return whether the player is fighting the question."""
+        return self.activity_state == Activity.BATTLE and self.battle_question_id == question_id
+
     def check_death(self):
         """Check player's current health, if below zero, clear dungeon coins and inventory."""
         if self.current_hp <= 0:
-            self.set_activity("index")
+            if Player.log.related.is_cached(self):
+                self.log.record_event(RunEventKind.DEATH)
+            self.set_activity(Activity.INDEX)
             self.reset_stats()
-            Inventory.objects.get(player=self).clear_dungeon_inventory()
+            self.inventory.clear_dungeon_inventory()
             self.save()
             return True
         return False
 
 
-class Log(models.Model):
+class Log(TrackedModelMixin, models.Model):
     """Log model for creating logs."""
 
-    log_text = models.CharField(max_length=1000, default=";;;;;;;;;;")
-    player = models.ForeignKey(Player, on_delete=models.CASCADE)
+    player = models.OneToOneField(Player, on_delete=models.CASCADE)
     log_questions = models.CharField(max_length=1000, default="")
     log_report_question = models.CharField(max_length=1000, default="")
+    deck_seed = models.IntegerField(default=0)
+    deck_size = models.IntegerField(default=0)
+    deck_cursor = models.IntegerField(default=0)
+    journal_seq = models.IntegerField(default=0)
+
+    pending_entries = ()
+    pending_events = ()
+    pending_snapshots = ()
+    journal = None
+
+    def recent_entries(self):
+        """Return the last LOG_CAPACITY log entries from oldest to newest, read once per Log instance."""
+        if not hasattr(self, '_recent_entries'):
+            stored = list(self.entries.order_by('-seq')[:LOG_CAPACITY])[::-1]
+            self._recent_entries = (stored + list(self.pending_entries))[-LOG_CAPACITY:]
+        return self._recent_entries
+
+    async def arecent_entries(self):
+        """Read the recent log entries with the async ORM, see recent_entries."""
+        if not hasattr(self, '_recent_entries'):
+            stored = [entry async for entry in self.entries.order_by('-seq')[:LOG_CAPACITY]][::-1]
+            self._recent_entries = (stored + list(self.pending_entries))[-LOG_CAPACITY:]
+        return self._recent_entries
+
+    def recent_logs(self):
+        """Return [style, text] pairs of the text log, padded with empty lines to LOG_CAPACITY."""
+        entries = self.recent_entries()
+        return [['']] * (LOG_CAPACITY - len(entries)) + [[entry.style, entry.text] for entry in entries]
 
     def split_log(self, log_type):
         """Return list form of a log in accordance to the type inputted."""
         if log_type == "text":
-            return self.log_text.split(';')[:-1]
+            entries = self.recent_entries()
+            return [''] * (LOG_CAPACITY - len(entries)) + [str(entry) for entry in entries]
         if log_type == "question":
             return self.log_questions.split(';')[:-1]
         return self.log_report_question.split(';')[:-1]
 
     def clear_log(self):
         """Clear log to be empty."""
-        self.log_text = ";;;;;;;;;;"
-        self.save()
+        self.entries.all().delete()
+        self.pending_entries = ()
+        self._recent_entries = []
+
+    def add_log(self, text):
+        """
+        Add new player action log with a single upsert over the slot of the oldest entry.
+        While the log fields are held the entry is kept pending, and written by the flush that releases them.
+        """
+        style, separator, line = text.partition(':')
+        if not separator:
+            style, line = "", text
+        entries = self.recent_entries()
+        seq = entries[-1].seq + 1 if entries else 0
+        entry = LogEntry(log=self, slot=seq % LOG_CAPACITY, seq=seq, style=style, text=line)
+        if self._held_fields:
+            self.pending_entries = (tuple(self.pending_entries) + (entry,))[-LOG_CAPACITY:]
+            self.save()
+        else:
+            LogEntry.write(entry)
+        self._recent_entries = (entries + [entry])[-LOG_CAPACITY:]
+
+    def record_event(self, kind, question_id: int = None, item_id: int = None):
+        """Append an event to the run journal of the request, outside of a request nothing is recorded."""
+        if self.journal is not None:
+            self.journal.record(kind, question_id=question_id, item_id=item_id)
+
+    def flush(self):
+        """Write the changed fields, and the pending entries and events once the log fields are released."""
+        super().flush()
+        if self._held_fields:
+            return
+        if self.pending_entries:
+            LogEntry.write(*self.pending_entries)
+            self.pending_entries = ()
+        if self.pending_events:
+            RunEvent.objects.bulk_create(self.pending_events)
+            RunSnapshot.objects.bulk_create(self.pending_snapshots)
+            self.pending_events, self.pending_snapshots = (), ()
 
     def clear_question(self):
         """Clear seen questions to be none."""
         self.log_questions = ""
         self.save()
 
-    def add_log(self, text):
-        """Add new player action log."""
-        list_log = self.log_text.split(';')
-        del (list_log[0])
-        self.log_text = ";".join(list_log)
-        self.log_text += f"{text};"
-        self.save()
-
     def add_question(self, question_id: str):
         """Add seen question id to log."""
         self.log_questions += f"{question_id};"
@@ -189,72 +463,161 @@ class Log(models.Model):
 
     def __str__(self):
         """Return Log string."""
-        return self.log_text
+        return ";".join(self.split_log("text")) + ";"
 
 
-class Inventory(models.Model):
+class LogEntry(models.Model):
+    """One line of a player's text log, kept in LOG_CAPACITY slots that are reused in turn."""
+
+    log = models.ForeignKey(Log, on_delete=models.CASCADE, related_name='entries')
+    slot = models.PositiveSmallIntegerField()
+    seq = models.IntegerField()
+    style = models.CharField(max_length=50, blank=True, default="")
+    text = models.CharField(max_length=300)
+
+    class Meta:
+        constraints = [models.UniqueConstraint(fields=['log', 'slot'], name='unique_log_slot')]
+        indexes = [models.Index(fields=['log', '-seq'], name='log_entry_recent')]
+
+    @classmethod
+    def write(cls, *entries):
+        """Store entries of distinct slots with a single upsert."""
+        cls.objects.bulk_create(entries, update_conflicts=True, unique_fields=['log', 'slot'],
+                                update_fields=['seq', 'style', 'text'])
+
+    def __str__(self):
+        """Return the entry in the style:text form it was added with."""
+        return f"{self.style}:{self.text}" if self.style else self.text
+
+
+class RunEventKind(models.TextChoices):
+    """Kinds of events of a dungeon run."""
+
+    START = "start"
+    WALK = "walk"
+    TREASURE = "treasure"
+    ENCOUNTER = "encounter"
+    CORRECT = "correct"
+    WRONG = "wrong"
+    FLEE = "flee"
+    ITEM = "item"
+    EXIT = "exit"
+    DEATH = "death"
+    STATE = "state"
+
+
+class RunEvent(models.Model):
+    """One event of a player's dungeon runs, with the run fields that changed from it until the next event."""
+
+    player = models.ForeignKey(Player, on_delete=models.CASCADE, related_name='run_events')
+    seq = models.IntegerField()
+    kind = models.CharField(max_length=10, choices=RunEventKind.choices)
+    question_id = models.IntegerField(null=True, blank=True)
+    item_id = models.IntegerField(null=True, blank=True)
+    changes = models.JSONField(default=dict)
+    created = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        constraints = [models.UniqueConstraint(fields=['player', 'seq'], name='unique_run_event')]
+
+    def __str__(self):
+        """Return the sequence number and kind of the event."""
+        return f"{self.seq}:{self.kind}"
+
+
+class RunSnapshot(models.Model):
+    """Run fields of a player after the event with the same sequence number."""
+
+    player = models.ForeignKey(Player, on_delete=models.CASCADE, related_name='run_snapshots')
+    seq = models.IntegerField()
+    state = models.JSONField(default=dict)
+
+    class Meta:
+        constraints = [models.UniqueConstraint(fields=['player', 'seq'], name='unique_run_snapshot')]
+
+    def __str__(self):
+        """Return the sequence number of the snapshot."""
+        return f"{self.seq}"
+
+
+class Inventory(TrackedModelMixin, models.Model):
     """Inventory model for creating inventory."""
 
-    player = models.ForeignKey(Player, on_delete=models.CASCADE)
+    player = models.OneToOneField(Player, on_delete=models.CASCADE)
     player_inventory = models.CharField(max_length=1000, default="")
     dungeon_inventory = models.CharField(max_length=1000, default="")
     max_inventory = models.IntegerField(default=3)
     question_template = models.CharField(max_length=1000, default="")
 
+    def _counts(self, field: str):
+        """Return the decoded counts of an inventory field, decoded again only when the stored string changed."""
+        decoded = self.__dict__.setdefault('_decoded', {})
+        raw = getattr(self, field)
+        cached = decoded.get(field)
+        if cached is None or (cached[0] is not raw and cached[0] != raw):
+            cached = decoded[field] = (raw, decode_counts(raw))
+        return cached[1]
+
+    def _set_counts(self, field: str, counts: dict):
+        """Store counts in an inventory field and keep the decoded form, without saving."""
+        counts = {key: value for key, value in counts.items() if value > 0}
+        raw = encode_counts(counts)
+        setattr(self, field, raw)
+        self.__dict__.setdefault('_decoded', {})[field] = (raw, counts)
+
     def get_inventory(self, inventory_type):
         """Return dict of inventory."""
-        dict_item = {}
-        if inventory_type == "player":
-            inventory = self.player_inventory.split(';')[:-1]
-        else:
-            inventory = self.dungeon_inventory.split(';')[:-1]
-        for item in inventory:
-            item_list = item.split(":")
-            dict_item[int(item_list[0])] = int(item_list[1])
-        return dict_item
+        return dict(self._counts(INVENTORY_FIELDS[inventory_type]))
 
     def update_inventory(self, item: dict, inventory_type):
         """Update item into inventory."""
-        inventory = ""
-        for key, val in item.items():
-            if val > 0:
-                inventory += f"{key}:{val};"
-        if inventory_type == "player":
-            self.player_inventory = inventory
-        else:
-            self.dungeon_inventory = inventory
+        self._set_counts(INVENTORY_FIELDS[inventory_type], item)
         self.save()
 
     def clear_dungeon_inventory(self):
         """Clear dungeon inventory."""
-        self.dungeon_inventory = ""
+        self._set_counts(INVENTORY_FIELDS["dungeon"], {})
         self.save()
 
+    def has_room(self, item_id: int):
+        """Return whether the dungeon inventory can take the item, it holds at most max_inventory kinds of items."""
+        dungeon = self._counts(INVENTORY_FIELDS["dungeon"])
+        return item_id in dungeon or len(dungeon) < self.max_inventory
+
+    def move_item(self, item_id: int, amount: int, inventory_type: str):
+        """
+        Move items into the given inventory from the other one.
+        :param item_id:
+        :param amount: number of items moved
+        :param inventory_type: "dungeon" or "player", the inventory receiving the items
+        :return: False when there is no room or not enough items to move
+        """
+        target_field = INVENTORY_FIELDS[inventory_type]
+        source_field = INVENTORY_FIELDS["player" if inventory_type == "dungeon" else "dungeon"]
+        source, target = dict(self._counts(source_field)), dict(self._counts(target_field))
+        if amount < 0 or source.get(item_id, 0) < amount or (inventory_type == "dungeon" and not self.has_room(item_id)):
+            return False
+        source[item_id] -= amount
+        target[item_id] = target.get(item_id, 0) + amount
+        self._set_counts(source_field, source)
+        self._set_counts(target_field, target)
+        self.save()
+        return True
+
     def reset_inventory(self):
         """Move items from dungeon inventory to player inventory."""
         p_inventory = self.get_inventory("player")
-        d_inventory = self.get_inventory("dungeon")
-        for item, amount in d_inventory.items():
-            if item in p_inventory:
-                p_inventory[item] += amount
-            else:
-                p_inventory[item] = amount
-        self.update_inventory(p_inventory, "player")
-        self.clear_dungeon_inventory()
+        for item, amount in self._counts(INVENTORY_FIELDS["dungeon"]).items():
+            p_inventory[item] = p_inventory.get(item, 0) + amount
+        self._set_counts(INVENTORY_FIELDS["player"], p_inventory)
+        self._set_counts(INVENTORY_FIELDS["dungeon"], {})
+        self.save()
 
     def get_templates(self):
         """Return dict of player templates."""
-        owned = {}
-        for value in self.question_template.split(';')[:-1]:
-            value = value.split(":")
-            owned[int(value[0])] = int(value[1])
-        return owned
+        return dict(self._counts(INVENTORY_FIELDS["template"]))
 
     def update_templates(self, items: dict):
         """Update templates into inventory."""
-        item_string = ""
-        for key, value in items.items():
-            if value > 0:
-                item_string += f"{key}:{value};"
-        self.question_template = item_string
+        self._set_counts(INVENTORY_FIELDS["template"], items)
         self.save()
@@ -0,0 +1,265 @@
+"""Module that contains the in-memory pool of questions that monsters are drawn from."""
+import bisect
+import random
+import threading
+import time
+from itertools import accumulate
+
+from django.conf import settings
+
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from .models import Question
+
+POOL_TTL = 300
+MAX_ATTEMPTS = 16
+MAX_DEAL_SKIPS = 256
+DECK_ROUNDS = 4
+HASH_MASK = 0xFFFFFFFF
+EASY = 0
+MEDIUM = 1
+HARD = 2
+
+
+class QuestionDeck:
+    """Seeded pseudo-random permutation of the question ids below a size, dealt with a cursor."""
+
+    def __init__(self, seed: int, size: int):
+        self.seed = seed
+        self.size = size
+        self.__half_bits = max(1, ((size - 1).bit_length() + 1) // 2)
+        self.__half_mask = (1 << self.__half_bits) - 1
+
+    def __round(self, value: int, round_index: int):
+        """Deterministic integer mixing function used as the Feistel round function."""
+        mixed = (value * 0x9E3779B1 + self.seed * 0x85EBCA77 + round_index * 0xC2B2AE3D) & HASH_MASK
+        mixed ^= mixed >> 15
+        mixed = (mixed * 0x2C1B3C6D) & HASH_MASK
+        mixed ^= mixed >> 12
+        return mixed & self.__half_mask
+
+    def __permute(self, value: int):
+        left, right = value >> self.__half_bits, value & self.__half_mask
+        for round_index in range(DECK_ROUNDS):
+            left, right = right, left ^ self.__round(right, round_index)
+        return (left << self.__half_bits) | right
+
+    def __getitem__(self, cursor: int):
+        """Return the question id of the card at the cursor, every id below the size appears once per cycle."""
+        position = self.__permute(cursor)
+        while position >= self.size:
+            position = self.__permute(position)
+        return position
+
+
+def damage_tier(damage: int):
+    """Return the difficulty tier of a question damage, matching the bands of the battle page."""
+    if damage > 30:
+        return HARD
+    if damage > 25:
+        return MEDIUM
+    return EASY
+
+
+class QuestionBucket:
+    """Dense array of the question ids sharing a category and damage tier."""
+
+    def __init__(self, category: str, tier: int, weight: float):
+        self.category = category
+        self.tier = tier
+        self.weight = weight
+        self.ids = []
+
+
+class QuestionPool:
+    """
+    Enabled question ids sharded into buckets by category and damage tier.
+    A draw picks a bucket by weight and then a question of that bucket in constant time.
+    The per-player decks permute the range of question ids, an order shared by every process
+    and kept across reloads, so ids missing from the pool are skipped while dealing.
+    A deck deals a question of a lighter bucket with the probability of its weight relative to the heaviest
+    bucket, the rest of the cycle passes it over.
+    """
+
+    def __init__(self, ttl: int = POOL_TTL, category_weights: dict = None, tier_weights: dict = None):
+        """
+        :param ttl: seconds before the pool is reloaded from the database
+        :param category_weights: multiplier of the draw weight of a category, 1 by default
+        :param tier_weights: multiplier of the draw weight of a damage tier, 1 by default
+        """
+        self.__lock = threading.RLock()
+        self.__ttl = ttl
+        self.__category_weights = category_weights or {}
+        self.__tier_weights = tier_weights or {}
+        self.__loaded_at = None
+        self.__id_limit = 0
+        self.__entries = {}
+        self.__buckets = {}
+        self.__cumulative = None
+        self.__max_weight = None
+
+    def __len__(self):
+        self.__ensure_loaded()
+        return len(self.__entries)
+
+    def __ensure_loaded(self):
+        """Load the pool on first use or when it is older than its time to live."""
+        if self.__loaded_at is not None and time.monotonic() - self.__loaded_at < self.__ttl:
+            return
+        with self.__lock:
+            if self.__loaded_at is not None and time.monotonic() - self.__loaded_at < self.__ttl:
+                return
+            self.__id_limit, self.__entries, self.__buckets = 0, {}, {}
+            queryset = Question.objects.filter(enable=True).values_list('id', 'owner_id', 'category', 'damage')
+            for question_id, owner_id, category, damage in queryset.iterator(chunk_size=2000):
+                self.__insert(question_id, owner_id, category, damage)
+            self.__loaded_at = time.monotonic()
+
+    def invalidate(self):
+        """Drop the pool so that it is reloaded from the database on the next draw."""
+        with self.__lock:
+            self.__loaded_at = None
+
+    def __insert(self, question_id, owner_id, category, damage):
+        key = (category, damage_tier(damage))
+        bucket = self.__buckets.get(key)
+        if bucket is None:
+            weight = self.__category_weights.get(category, 1) * self.__tier_weights.get(key[1], 1)
+            bucket = self.__buckets[key] = QuestionBucket(category, key[1], weight)
+        self.__entries[question_id] = [key, len(bucket.ids), owner_id]
+        self.__id_limit = max(self.__id_limit, question_id + 1)
+        bucket.ids.append(question_id)
+        self.__cumulative = self.__max_weight = None
+
+    def __remove(self, question_id):
+        """Swap the last id of the bucket into the slot of the removed id."""
+        key, bucket_position, _ = self.__entries.pop(question_id)
+        bucket = self.__buckets[key]
+        last_id = bucket.ids.pop()
+        if last_id != question_id:
+            bucket.ids[bucket_position] = last_id
+            self.__entries[last_id][1] = bucket_position
+        if not bucket.ids:
+            del self.__buckets[key]
+        self.__cumulative = self.__max_weight = None
+
+    def add(self, question_id: int, owner_id, category: str, damage: int):
+        """Add an enabled question to the pool, or move it when its category or damage changed."""
+        with self.__lock:
+            if self.__loaded_at is None:
+                return
+            entry = self.__entries.get(question_id)
+            if entry is not None:
+                if entry[0] == (category, damage_tier(damage)):
+                    entry[2] = owner_id
+                    return
+                self.__remove(question_id)
+            self.__insert(question_id, owner_id, category, damage)
+
+    def discard(self, question_id: int):
+        """Remove a question from the pool."""
+        with self.__lock:
+            if self.__loaded_at is not None and question_id in self.__entries:
+                self.__remove(question_id)
+
+    def __is_eligible(self, question_id, exclude_owner, exclude_ids):
+        if exclude_owner is not None and self.__entries[question_id][2] == exclude_owner:
+            return False
+        return question_id not in exclude_ids
+
+    def __is_dealt(self, question_id):
+        """Roll whether the deck deals a question, by the weight of its bucket relative to the heaviest one."""
+        if self.__max_weight is None:
+            self.__max_weight = max((bucket.weight for bucket in self.__buckets.values()), default=0)
+        weight = self.__buckets[self.__entries[question_id][0]].weight
+        return weight >= self.__max_weight > 0 or random.random() * self.__max_weight < weight
+
+    def deal(self, log, exclude_owner=None, exclude_ids=()):
+        """
+        Deal the next eligible question from the player's deck, a new deck is shuffled once a cycle ends.
+        The deck covers the ids up to the largest one in the pool when it is shuffled, later questions join the next.
+        A deal passes over at most MAX_DEAL_SKIPS ids, missing from the pool after deletions or gaps in the ids,
+        before drawing a random question with sample, the cursor keeps its progress for the next deal.
+        :param log: player Log holding the deck seed, size and cursor, the caller saves it
+        :param exclude_owner: primary key of a user whose questions are not eligible
+        :param exclude_ids: collection of question ids that are not eligible
+        :return: question id or None if no question is eligible
+        """
+        self.__ensure_loaded()
+        exclude_ids = set(exclude_ids)
+        with self.__lock:
+            skips = 0
+            for _ in range(2):
+                if log.deck_cursor >= log.deck_size:
+                    log.deck_seed, log.deck_size, log.deck_cursor = random.getrandbits(31), self.__id_limit, 0
+                deck = QuestionDeck(log.deck_seed, log.deck_size)
+                while log.deck_cursor < log.deck_size:
+                    question_id = deck[log.deck_cursor]
+                    log.deck_cursor += 1
+                    if question_id in self.__entries and self.__is_eligible(question_id, exclude_owner, exclude_ids) \
+                            and self.__is_dealt(question_id):
+                        return question_id
+                    skips += 1
+                    if skips >= MAX_DEAL_SKIPS:
+                        return self.sample(exclude_owner, exclude_ids)
+        return None
+
+    def __weighted_buckets(self, category, tier):
+        """Return the buckets matching the filters with their cumulative draw weights."""
+        if category is None and tier is None:
+            if self.__cumulative is None:
+                buckets = [bucket for bucket in self.__buckets.values() if bucket.weight > 0]
+                self.__cumulative = (buckets, list(accumulate(len(bucket.ids) * bucket.weight
+                                                              for bucket in buckets)))
+            return self.__cumulative
+        buckets = [bucket for bucket in self.__buckets.values() if bucket.weight > 0
+                   and (category is None or bucket.category == category) and (tier is None or bucket.tier == tier)]
+        return buckets, list(accumulate(len(bucket.ids) * bucket.weight for bucket in buckets))
+
+    def sample(self, exclude_owner=None, exclude_ids=(), category: str = None, tier: int = None):
+        """
+        Return a random eligible question id without touching the database.
+        A bucket is picked with probability proportional to its size times its weight.
+        :param exclude_owner: primary key of a user whose questions are not eligible
+        :param exclude_ids: collection of question ids that are not eligible
+        :param category: only draw questions of this category
+        :param tier: only draw questions of this damage tier
+        :return: question id or None if no question is eligible
+        """
+        self.__ensure_loaded()
+        exclude_ids = set(exclude_ids)
+        with self.__lock:
+            buckets, cumulative = self.__weighted_buckets(category, tier)
+            if not buckets:
+                return None
+            for _ in range(MAX_ATTEMPTS):
+                bucket = buckets[bisect.bisect(cumulative, random.random() * cumulative[-1])]
+                question_id = bucket.ids[random.randrange(len(bucket.ids))]
+                if self.__is_eligible(question_id, exclude_owner, exclude_ids):
+                    return question_id
+            eligible = [(question_id, bucket.weight) for bucket in buckets for question_id in bucket.ids
+                        if self.__is_eligible(question_id, exclude_owner, exclude_ids)]
+        if not eligible:
+            return None
+        ids, weights = zip(*eligible)
+        return random.choices(ids, weights)[0]
+
+
+question_pool = QuestionPool(category_weights=getattr(settings, 'QUESTION_CATEGORY_WEIGHTS', None),
+                             tier_weights=getattr(settings, 'QUESTION_TIER_WEIGHTS', None))
+
+
+@receiver(post_save, sender=Question)
+def update_question_pool(sender, instance, **kwargs):
+    """Keep the pool in sync with saved questions."""
+    if instance.enable:
+        question_pool.add(instance.pk, instance.owner_id, instance.category, instance.damage)
+    else:
+        question_pool.discard(instance.pk)
+
+
+@receiver(post_delete, sender=Question)
+def remove_from_question_pool(sender, instance, **kwargs):
+    """Remove deleted questions from the pool."""
+    question_pool.discard(instance.pk)
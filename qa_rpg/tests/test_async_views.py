@@ -0,0 +1,156 @@
+import importlib
+from unittest import mock
+from urllib.parse import urlencode
+
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from django.test import TestCase, override_settings
+from django.urls import clear_url_caches, resolve, reverse
+from qa_rpg.dungeon_run import run_cache, run_key
+from qa_rpg.models import *
+
+URLCONFS = ("qa_rpg.urls", "mysite.urls")
+
+
+def reload_urls():
+    """Build the url patterns again, for the views selected by ASYNC_DUNGEON_VIEWS."""
+    for urlconf in URLCONFS:
+        importlib.reload(importlib.import_module(urlconf))
+    clear_url_caches()
+
+
+@override_settings(ASYNC_DUNGEON_VIEWS=True, DUNGEON_CHECKPOINT_CLICKS=20)
+class AsyncDungeonViewTest(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        # Registered first, the url patterns are built again after the settings are restored.
+        cls.addClassCleanup(reload_urls)
+        super().setUpClass()
+        reload_urls()
+
+    def setUp(self):
+        """Setup a logged in player in the dungeon and a question with a correct and a wrong choice."""
+        self.user = User.objects.create_user(username="demo")
+        self.async_client.force_login(self.user)
+        self.player = Player.objects.create(user=self.user, activity="dungeon", luck=0, dungeon_currency=10)
+        self.log = Log.objects.create(player=self.player)
+        self.inventory = Inventory.objects.create(player=self.player)
+        self.question = Question.objects.create(question_text="test", owner=User.objects.create_user(username="test"))
+        self.correct = Choice.objects.create(question=self.question, choice_text='yes', correct_answer=True)
+        self.wrong = Choice.objects.create(question=self.question, choice_text='no', correct_answer=False)
+
+    def tearDown(self):
+        run_cache().delete(run_key(self.user.pk))
+
+    async def post(self, url, data):
+        """Post a url encoded form, as multipart bodies are not fully read by the async test client of Django 4.1."""
+        return await self.async_client.post(url, urlencode(data), content_type="application/x-www-form-urlencoded")
+
+    def test_async_views_served(self):
+        """The dungeon hot path resolves to coroutine functions."""
+        for name in ("dungeon", "action", "battle", "item", "treasure_action"):
+            self.assertTrue(iscoroutinefunction(resolve(reverse(f"qa_rpg:{name}")).func), name)
+        self.assertTrue(iscoroutinefunction(resolve(reverse("qa_rpg:check", args=(1,))).func))
+
+    async def test_walk(self):
+        """Walking is kept in the cached run, and shown on the next dungeon page."""
+        with mock.patch("qa_rpg.views.random.random", return_value=0.9):
+            for _ in range(2):
+                response = await self.post(reverse("qa_rpg:action"), {"action": "walk"})
+                self.assertRedirects(response, reverse("qa_rpg:dungeon"), fetch_redirect_response=False)
+        self.assertEqual((await Player.objects.aget(pk=self.player.pk)).luck, 0)
+        response = await self.async_client.get(reverse("qa_rpg:dungeon"))
+        self.assertAlmostEqual(response.context["player"].luck, 0.04)
+        self.assertEqual(len([line for line in response.context["logs"] if line != ['']]), 2)
+        self.assertIn("no-cache", response["Cache-Control"])
+
+    async def test_exit(self):
+        """Exiting writes the run and moves the dungeon coins to the balance."""
+        with mock.patch("qa_rpg.views.random.random", return_value=0.9):
+            response = await self.post(reverse("qa_rpg:action"), {"action": "exit"})
+        self.assertRedirects(response, reverse("qa_rpg:index"), fetch_redirect_response=False)
+        player = await Player.objects.aget(pk=self.player.pk)
+        self.assertEqual((player.activity, player.currency, player.dungeon_currency), ("index", 10, 0))
+
+    @override_settings(DUNGEON_CHECKPOINT_CLICKS=0)
+    async def test_battle_write_through(self):
+        """Without a cached run every request is written, a wrong answer costs health and counts a fail."""
+        await Player.objects.filter(pk=self.player.pk).aupdate(activity_state=Activity.FOUND_MONSTER)
+        with mock.patch("qa_rpg.views.question_pool.deal", return_value=self.question.pk):
+            response = await self.async_client.get(reverse("qa_rpg:battle"))
+        self.assertEqual(response.context["question"].id, self.question.pk)
+        self.assertEqual((await Player.objects.aget(pk=self.player.pk)).activity, f"battle{self.question.pk}")
+        response = await self.post(reverse("qa_rpg:check", args=(self.question.pk,)),
+                                   {"choice": self.wrong.pk, "option": "not select"})
+        self.assertRedirects(response, reverse("qa_rpg:dungeon"), fetch_redirect_response=False)
+        player = await Player.objects.aget(pk=self.player.pk)
+        self.assertEqual((player.activity, player.current_hp), ("dungeon", player.max_hp - self.question.damage))
+        self.assertEqual((await FailCounter.objects.aget(question=self.question)).fails, 1)
+        self.assertEqual(await LogEntry.objects.filter(log=self.log).acount(), 2)
+
+    async def test_anonymous_redirected(self):
+        """An anonymous user is sent to the login page."""
+        self.async_client.cookies.clear()
+        response = await self.async_client.get(reverse("qa_rpg:dungeon"))
+        self.assertEqual(response.status_code, 302)
+        self.assertIn("login", response.url)
+
+    async def start_battle(self):
+        """Put the player in battle with the question."""
+        await Player.objects.filter(pk=self.player.pk).aupdate(activity_state=Activity.BATTLE,
+                                                               battle_question_id=self.question.pk)
+
+    @override_settings(DUNGEON_CHECKPOINT_CLICKS=0)
+    async def test_run_away(self):
+        """Running away records the vote in a thread, and sends the player back to the dungeon."""
+        await self.start_battle()
+        with mock.patch("qa_rpg.views.random.random", return_value=0.9):
+            response = await self.post(reverse("qa_rpg:run_away", args=(self.question.pk,)), {"option": "report"})
+        self.assertRedirects(response, reverse("qa_rpg:dungeon"), fetch_redirect_response=False)
+        self.assertEqual((await Player.objects.aget(pk=self.player.pk)).activity, "dungeon")
+        self.assertEqual((await ReportAndCommend.objects.aget(question=self.question, user=self.user)).vote, 0)
+
+    @override_settings(DUNGEON_CHECKPOINT_CLICKS=0)
+    async def test_treasure_action(self):
+        """Picking up the treasure chest with full luck puts an item in the dungeon inventory."""
+        await Player.objects.filter(pk=self.player.pk).aupdate(activity_state=Activity.TREASURE, luck=1)
+        with mock.patch("qa_rpg.views.random.random", return_value=0.1):
+            response = await self.post(reverse("qa_rpg:treasure_action"), {"action": "pick up"})
+        self.assertRedirects(response, reverse("qa_rpg:dungeon"), fetch_redirect_response=False)
+        self.assertEqual((await Player.objects.aget(pk=self.player.pk)).activity, "dungeon")
+        inventory = await Inventory.objects.aget(player=self.player)
+        self.assertEqual(sum(inventory.get_inventory("dungeon").values()), 1)
+
+    @override_settings(DUNGEON_CHECKPOINT_CLICKS=0)
+    async def test_item(self):
+        """Using a healing item takes it from the dungeon inventory and heals the player."""
+        await sync_to_async(self.inventory.update_inventory)({6: 5}, "dungeon")
+        await self.start_battle()
+        await Player.objects.filter(pk=self.player.pk).aupdate(current_hp=50)
+        response = await self.post(reverse("qa_rpg:item"), {"item": 6})
+        self.assertRedirects(response, reverse("qa_rpg:battle"), fetch_redirect_response=False)
+        player = await Player.objects.aget(pk=self.player.pk)
+        self.assertEqual((player.current_hp, player.status), (70, "6"))
+        self.assertEqual((await Inventory.objects.aget(player=self.player)).get_inventory("dungeon"), {6: 4})
+
+    @override_settings(DUNGEON_CHECKPOINT_CLICKS=0)
+    async def test_check_report(self):
+        """Reporting the question while answering records the vote and the reported question."""
+        await self.start_battle()
+        with mock.patch("qa_rpg.views.random.random", return_value=0.9):
+            response = await self.post(reverse("qa_rpg:check", args=(self.question.pk,)),
+                                       {"choice": self.correct.pk, "option": "report"})
+        self.assertRedirects(response, reverse("qa_rpg:dungeon"), fetch_redirect_response=False)
+        self.assertEqual((await ReportAndCommend.objects.aget(question=self.question, user=self.user)).vote, 0)
+        self.assertIn(str(self.question.pk), (await Log.objects.aget(pk=self.log.pk)).split_log("report"))
+
+    @override_settings(DUNGEON_CHECKPOINT_CLICKS=0)
+    async def test_check_commend(self):
+        """Commending the question while answering records the vote and leaves the question enabled."""
+        await self.start_battle()
+        with mock.patch("qa_rpg.views.random.random", return_value=0.9):
+            response = await self.post(reverse("qa_rpg:check", args=(self.question.pk,)),
+                                       {"choice": self.correct.pk, "option": "commend"})
+        self.assertRedirects(response, reverse("qa_rpg:dungeon"), fetch_redirect_response=False)
+        self.assertEqual((await ReportAndCommend.objects.aget(question=self.question, user=self.user)).vote, 1)
+        self.assertTrue((await Question.objects.aget(pk=self.question.pk)).enable)
@@ -0,0 +1,53 @@
+from django.test import TestCase, override_settings
+from qa_rpg.models import *
+from qa_rpg.battle_card import card_cache, card_key, get_battle_card
+
+
+class BattleCardTest(TestCase):
+
+    def setUp(self):
+        """Setup for testing battle cards."""
+        card_cache().clear()
+        self.system = User.objects.create_user(username="test")
+        self.question = Question.objects.create(question_text="test", owner=self.system, damage=25)
+        self.correct = Choice.objects.create(question=self.question, choice_text='yes', correct_answer=True)
+        self.wrong = Choice.objects.create(question=self.question, choice_text='no', correct_answer=False)
+
+    def test_build_card(self):
+        """A card bundles the question, its ordered choices and the correct choice."""
+        with self.assertNumQueries(1):
+            card = get_battle_card(self.question.id)
+        self.assertEqual(card.question_text, "test")
+        self.assertEqual(card.damage, 25)
+        self.assertEqual(card.choices, ((self.correct.id, 'yes'), (self.wrong.id, 'no')))
+        self.assertTrue(card.is_correct(self.correct.id))
+        self.assertFalse(card.is_correct(self.wrong.id))
+
+    def test_cached_card(self):
+        """A cached card is served without touching the database."""
+        get_battle_card(self.question.id)
+        with self.assertNumQueries(0):
+            get_battle_card(self.question.id)
+
+    def test_invalidate_card(self):
+        """Editing the question or one of its choices drops the cached card."""
+        get_battle_card(self.question.id)
+        self.wrong.choice_text = "maybe"
+        self.wrong.save()
+        self.assertEqual(get_battle_card(self.question.id).choices[1][1], "maybe")
+        self.question.damage = 30
+        self.question.save()
+        self.assertEqual(get_battle_card(self.question.id).damage, 30)
+
+    def test_missing_question(self):
+        """A card can not be built for a question that does not exist."""
+        with self.assertRaises(Question.DoesNotExist):
+            get_battle_card(self.question.id + 1)
+
+    @override_settings(BATTLE_CARD_TIMEOUT=0)
+    def test_card_timeout(self):
+        """Cards are kept in their own cache for BATTLE_CARD_TIMEOUT seconds."""
+        get_battle_card(self.question.id)
+        self.assertIsNone(card_cache().get(card_key(self.question.id)))
+        with self.assertNumQueries(1):
+            get_battle_card(self.question.id)
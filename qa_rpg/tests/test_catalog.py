@@ -0,0 +1,34 @@
+from django.test import TestCase
+from django.urls import reverse
+from qa_rpg.catalog import catalog
+from qa_rpg.items_catalog import ItemCatalog
+from qa_rpg.models import *
+from qa_rpg.template_question import TemplateCatalog
+
+
+class CompiledCatalogTest(TestCase):
+
+    def test_tables_match_catalogs(self):
+        """The compiled tables hold the same listings and prices as the catalogs."""
+        templates = TemplateCatalog()
+        self.assertEqual({name: list(listing) for name, listing in catalog.store_items.items()},
+                         ItemCatalog().get_store_items())
+        self.assertEqual(catalog.template_prices[2], templates.get_price(2))
+        self.assertEqual(catalog.template_texts[0], "Which of  the following  is  correct ?")
+        self.assertEqual(catalog.shop_templates[catalog.template_texts[100]], (999, 100))
+
+    def test_tables_are_frozen(self):
+        """The shared tables can not be changed by a request."""
+        with self.assertRaises(TypeError):
+            catalog.item_prices[6] = 0
+        with self.assertRaises(AttributeError):
+            catalog.chest_items.append(0)
+
+    def test_shop_renders_shared_tables(self):
+        """The shop page is given the compiled tables instead of building its own."""
+        user = User.objects.create_user(username="demo", password="12345")
+        self.client.login(username="demo", password="12345")
+        Player.objects.create(user=user)
+        response = self.client.get(reverse("qa_rpg:shop"))
+        self.assertIs(response.context["items"], catalog.store_items)
+        self.assertIs(response.context["template"], catalog.shop_templates)
@@ -0,0 +1,185 @@
+import io
+import json
+import os
+import tempfile
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from io import StringIO
+from django.core.management import call_command
+from django.test import TestCase
+from qa_rpg.models import *
+from qa_rpg.trivia import iter_json_records
+
+
+class RebuildVoteCountersTest(TestCase):
+
+    def setUp(self):
+        """Setup questions whose counters drifted from their votes."""
+        self.system = User.objects.create_user(username="test")
+        self.question = Question.objects.create(question_text="test", owner=self.system)
+        ReportAndCommend.objects.create(user=self.system, question=self.question, vote=0)
+        ReportAndCommend.objects.create(user=self.system, question=self.question, vote=1)
+        Question.objects.filter(pk=self.question.pk).update(report_count=5, commend_count=0)
+
+    def test_check_counters(self):
+        """Checking only reports drifted counters."""
+        out = StringIO()
+        call_command("rebuild_vote_counters", "--check", stdout=out)
+        self.assertIn("found 1 drifted", out.getvalue())
+        self.assertEqual(Question.objects.get(pk=self.question.pk).report, 5)
+
+    def test_rebuild_counters(self):
+        """Rebuilding recounts the votes of every question."""
+        out = StringIO()
+        call_command("rebuild_vote_counters", "--chunk-size", "1", stdout=out)
+        self.assertIn("fixed 1 drifted", out.getvalue())
+        question = Question.objects.get(pk=self.question.pk)
+        self.assertEqual((question.report, question.commend), (1, 1))
+
+
+class AuditCorrectChoicesTest(TestCase):
+
+    def setUp(self):
+        """Setup questions with a correct, missing, ambiguous and stale correct choice."""
+        self.system = User.objects.create_user(username="test")
+        self.questions = [Question.objects.create(question_text=f"test{i}", owner=self.system) for i in range(4)]
+        self.correct = Choice.objects.create(question=self.questions[0], choice_text="yes", correct_answer=True)
+        Choice.objects.create(question=self.questions[1], choice_text="no", correct_answer=False)
+        for _ in range(2):
+            Choice.objects.create(question=self.questions[2], choice_text="yes", correct_answer=True)
+        self.stale = Choice.objects.create(question=self.questions[3], choice_text="yes", correct_answer=True)
+        Question.objects.filter(pk=self.questions[3].pk).update(correct_choice=None)
+
+    def test_audit(self):
+        """Auditing reports every inconsistent question without changing them."""
+        out = StringIO()
+        call_command("audit_correct_choices", "--chunk-size", "3", stdout=out)
+        self.assertIn("Checked 4 questions: 1 without a correct choice, 1 with several, 1 with a stale pointer",
+                      out.getvalue())
+        self.assertIsNone(Question.objects.get(pk=self.questions[3].pk).correct_choice)
+
+    def test_fix(self):
+        """Fixing repoints stale pointers."""
+        call_command("audit_correct_choices", "--fix", stdout=StringIO())
+        self.assertEqual(Question.objects.get(pk=self.questions[3].pk).correct_choice, self.stale)
+        self.assertEqual(Question.objects.get(pk=self.questions[0].pk).correct_choice, self.correct)
+
+
+def trivia_record(index, incorrect=3):
+    """Return an OpenTDB formatted question."""
+    return {"category": "Science &amp; Nature", "type": "multiple", "difficulty": "easy",
+            "question": f"Question &quot;{index}&quot;?", "correct_answer": f"yes{index}",
+            "incorrect_answers": [f"no{index}-{i}" for i in range(incorrect)]}
+
+
+class ImportTriviaTest(TestCase):
+
+    def setUp(self):
+        """Setup an OpenTDB response on the file system."""
+        self.admin = User.objects.create_user(username="admin")
+        Question.objects.create(question_text='Question "0"?', owner=self.admin)
+        records = [trivia_record(i) for i in range(25)] + [trivia_record(25, incorrect=1)]
+        handle, self.path = tempfile.mkstemp(suffix=".json")
+        with os.fdopen(handle, "w") as file:
+            json.dump({"response_code": 0, "results": records}, file)
+
+    def tearDown(self):
+        os.remove(self.path)
+
+    def test_import_trivia(self):
+        """Questions are imported in batches with their choices, existing questions are skipped."""
+        out = StringIO()
+        call_command("import_trivia", f"file://{self.path}", "--owner", "admin", "--batch-size", "10", stdout=out)
+        self.assertIn("Imported 25 questions and 98 choices, skipped 1 duplicates", out.getvalue())
+        self.assertIn("rows/sec", out.getvalue())
+        question = Question.objects.get(question_text='Question "3"?')
+        self.assertEqual(question.category, "Science & Nature")
+        self.assertEqual(question.choice_set.count(), 4)
+        self.assertEqual(question.correct_choice.choice_text, "yes3")
+        self.assertEqual(Question.objects.get(question_text='Question "25"?').choice_set.count(), 2)
+
+    def test_import_twice(self):
+        """Importing the same questions twice does not duplicate them."""
+        call_command("import_trivia", f"file://{self.path}", "--owner", "admin", stdout=StringIO())
+        call_command("import_trivia", f"file://{self.path}", "--owner", "admin", "--category", "Quiz",
+                     stdout=StringIO())
+        self.assertEqual(Question.objects.count(), 26)
+        self.assertFalse(Question.objects.filter(category="Quiz").exists())
+
+
+class TriviaApiStandIn(BaseHTTPRequestHandler):
+    """Local stand-in of the Open Trivia Database API."""
+
+    def do_GET(self):
+        body = json.dumps({"response_code": 0, "results": [trivia_record(i) for i in range(5)]}).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class StreamingImportTest(TestCase):
+
+    def setUp(self):
+        """Setup a JSON lines question pack on the file system."""
+        self.admin = User.objects.create_user(username="admin")
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "pack.jsonl")
+        self.checkpoint = os.path.join(self.directory.name, "pack.checkpoint")
+        with open(self.path, "w") as file:
+            for i in range(30):
+                file.write(json.dumps(trivia_record(i)) + "\n")
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_stream_json_records(self):
+        """Records are decoded one at a time even when they straddle chunks."""
+        document = json.dumps({"response_code": 0, "results": [trivia_record(i) for i in range(20)]}).encode()
+        records = list(iter_json_records(io.BytesIO(document), chunk_size=7))
+        self.assertEqual(records, [trivia_record(i) for i in range(20)])
+        self.assertEqual(list(iter_json_records(io.BytesIO(b' [ ] '))), [])
+
+    def test_import_jsonl_with_checkpoint(self):
+        """Every committed batch moves the checkpoint forward."""
+        call_command("import_trivia", self.path, "--owner", "admin", "--batch-size", "8",
+                     "--checkpoint", self.checkpoint, stdout=StringIO())
+        self.assertEqual(Question.objects.count(), 30)
+        with open(self.checkpoint) as file:
+            self.assertEqual(json.load(file), {"source": self.path, "offset": 30})
+
+    def test_resume_from_checkpoint(self):
+        """An interrupted import resumes after the last committed record."""
+        with open(self.checkpoint, "w") as file:
+            json.dump({"source": self.path, "offset": 24}, file)
+        out = StringIO()
+        call_command("import_trivia", self.path, "--owner", "admin", "--checkpoint", self.checkpoint,
+                     "--low-memory", stdout=out)
+        self.assertIn("after resuming at record 24", out.getvalue())
+        self.assertEqual(Question.objects.count(), 6)
+        self.assertTrue(Question.objects.filter(question_text='Question "24"?').exists())
+
+    def test_low_memory_skips_existing(self):
+        """Duplicates are found per batch in low memory mode."""
+        Question.objects.create(question_text='Question "3"?', owner=self.admin)
+        call_command("import_trivia", self.path, "--owner", "admin", "--low-memory", "--batch-size", "4",
+                     stdout=StringIO())
+        self.assertEqual(Question.objects.filter(question_text='Question "3"?').count(), 1)
+        self.assertEqual(Question.objects.count(), 30)
+
+    def test_import_from_local_api(self):
+        """Questions are streamed from a local stand-in of the trivia API."""
+        server = ThreadingHTTPServer(("127.0.0.1", 0), TriviaApiStandIn)
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        try:
+            call_command("import_trivia", f"http://127.0.0.1:{server.server_port}/api.php?amount=5",
+                         "--owner", "admin", stdout=StringIO())
+        finally:
+            server.shutdown()
+            server.server_close()
+        self.assertEqual(Question.objects.count(), 5)
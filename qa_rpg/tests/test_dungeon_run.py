@@ -0,0 +1,169 @@
+from unittest import mock
+
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from qa_rpg.dungeon_run import run_cache, run_key
+from qa_rpg.models import *
+
+GAME_TABLES = ["qa_rpg_player", "qa_rpg_log", "qa_rpg_logentry", "qa_rpg_inventory"]
+
+
+def writes_of(queries):
+    """Return the INSERT and UPDATE statements on the game state tables among captured queries."""
+    return [query['sql'] for query in queries
+            if query['sql'].startswith(('UPDATE', 'INSERT'))
+            and any(f'"{table}"' in query['sql'][:40] for table in GAME_TABLES)]
+
+
+@override_settings(DUNGEON_CHECKPOINT_CLICKS=20)
+class DungeonRunTest(TestCase):
+
+    def setUp(self):
+        """Setup a logged in player walking in the dungeon."""
+        self.user = User.objects.create_user(username="demo")
+        self.user.set_password("12345")
+        self.user.save()
+        self.client.login(username="demo", password="12345")
+        self.player = Player.objects.create(user=self.user, activity="dungeon", luck=0, dungeon_currency=10)
+        self.log = Log.objects.create(player=self.player)
+        self.inventory = Inventory.objects.create(player=self.player, dungeon_inventory="6:1;")
+
+    def tearDown(self):
+        run_cache().delete(run_key(self.user.pk))
+
+    def walk(self, times: int = 1, action: str = "walk"):
+        """Walk in the dungeon without meeting anything and return the writes to the game state tables."""
+        with CaptureQueriesContext(connection) as queries, mock.patch("qa_rpg.views.random.random", return_value=0.9):
+            for _ in range(times):
+                self.client.post(reverse("qa_rpg:action"), {"action": action})
+        return writes_of(queries)
+
+    def test_walk_in_cache(self):
+        """Walking writes nothing to the database, the next request reads the run from the cache."""
+        self.assertEqual(self.walk(3), [])
+        stored = Player.objects.get(pk=self.player.pk)
+        self.assertEqual((stored.luck, LogEntry.objects.count()), (0, 0))
+        response = self.client.get(reverse("qa_rpg:dungeon"))
+        self.assertAlmostEqual(response.context["player"].luck, 0.06)
+        self.assertEqual(len([line for line in response.context["logs"] if line != ['']]), 3)
+
+    def test_exit_checkpoint(self):
+        """Exiting the dungeon writes the run to the database and drops it from the cache."""
+        self.walk(2)
+        self.assertNotEqual(self.walk(action="exit"), [])
+        player = Player.objects.get(pk=self.player.pk)
+        self.assertEqual((player.activity, player.currency, player.dungeon_currency), ("index", 10, 0))
+        self.assertEqual(Inventory.objects.get(pk=self.inventory.pk).get_inventory("player"), {6: 1})
+        self.assertEqual(LogEntry.objects.filter(log=self.log).count(), 2)
+        self.assertIsNone(run_cache().get(run_key(self.user.pk)))
+
+    @override_settings(DUNGEON_CHECKPOINT_CLICKS=3)
+    def test_periodic_checkpoint(self):
+        """Every DUNGEON_CHECKPOINT_CLICKS requests the run is written to the database."""
+        self.assertEqual(self.walk(2), [])
+        self.assertNotEqual(self.walk(), [])
+        self.assertAlmostEqual(Player.objects.get(pk=self.player.pk).luck, 0.06)
+        self.assertEqual(LogEntry.objects.filter(log=self.log).count(), 3)
+
+    def test_stale_run_dropped(self):
+        """A run cached before the player row was written elsewhere is dropped."""
+        self.walk()
+        Player.objects.filter(pk=self.player.pk).update(current_hp=50)
+        response = self.client.get(reverse("qa_rpg:dungeon"))
+        self.assertEqual(response.context["player"].current_hp, 50)
+        self.assertEqual(response.context["player"].luck, 0)
+
+
+@override_settings(DUNGEON_CHECKPOINT_CLICKS=20)
+class CachedRunActionTest(TestCase):
+
+    def setUp(self):
+        """Setup a logged in player in battle, with the run kept in the run cache."""
+        self.user = User.objects.create_user(username="demo")
+        self.user.set_password("12345")
+        self.user.save()
+        self.client.login(username="demo", password="12345")
+        system = User.objects.create_user(username="test")
+        self.question = Question.objects.create(question_text="test", owner=system)
+        self.correct = Choice.objects.create(question=self.question, choice_text='yes', correct_answer=True)
+        self.wrong = Choice.objects.create(question=self.question, choice_text='no', correct_answer=False)
+        self.player = Player.objects.create(user=self.user, activity=f"battle{self.question.pk}", luck=0.5,
+                                            current_hp=50)
+        self.log = Log.objects.create(player=self.player)
+        self.inventory = Inventory.objects.create(player=self.player, dungeon_inventory="6:2;")
+
+    def tearDown(self):
+        run_cache().delete(run_key(self.user.pk))
+
+    def post(self, name: str, data: dict, roll: float = 0.9, args: tuple = ()):
+        """Post to a game view with the rolls of the view fixed, and return the response and the game state writes."""
+        with CaptureQueriesContext(connection) as queries, mock.patch("qa_rpg.views.random.random",
+                                                                      return_value=roll):
+            response = self.client.post(reverse(f"qa_rpg:{name}", args=args), data)
+        return response, writes_of(queries)
+
+    def exit_dungeon(self):
+        """Exit the dungeon without meeting a monster, which writes the run, and return the stored player."""
+        self.post("action", {"action": "exit"})
+        return Player.objects.get(pk=self.player.pk)
+
+    def test_answer_in_cache(self):
+        """A correct answer is kept in the cached run until the player exits."""
+        response, writes = self.post("check", {"choice": self.correct.pk, "option": "not select"},
+                                     args=(self.question.pk,))
+        self.assertRedirects(response, reverse("qa_rpg:dungeon"), fetch_redirect_response=False)
+        self.assertEqual(writes, [])
+        self.assertEqual(Player.objects.get(pk=self.player.pk).activity, f"battle{self.question.pk}")
+        coins = self.client.get(reverse("qa_rpg:dungeon")).context["player"].dungeon_currency
+        self.assertGreater(coins, 0)
+        player = self.exit_dungeon()
+        self.assertEqual((player.activity, player.currency), ("index", coins))
+
+    def test_wrong_answer_in_cache(self):
+        """The damage of a wrong answer is kept in the cached run, and the fail is counted at once."""
+        response, writes = self.post("check", {"choice": self.wrong.pk, "option": "not select"},
+                                     args=(self.question.pk,))
+        self.assertEqual(writes, [])
+        self.assertEqual(FailCounter.objects.get(question=self.question).fails, 1)
+        response = self.client.get(reverse("qa_rpg:dungeon"))
+        self.assertEqual(response.context["player"].current_hp, 50 - self.question.damage)
+        self.assertEqual(self.exit_dungeon().current_hp, 50 - self.question.damage)
+
+    def test_item_in_cache(self):
+        """Using an item is kept in the cached run, the next battle page reads it from the cache."""
+        response, writes = self.post("item", {"item": "6"})
+        self.assertRedirects(response, reverse("qa_rpg:battle"), fetch_redirect_response=False)
+        self.assertEqual(writes, [])
+        self.assertEqual(Inventory.objects.get(pk=self.inventory.pk).get_inventory("dungeon"), {6: 2})
+        response = self.client.get(reverse("qa_rpg:battle"))
+        self.assertEqual(response.context["player"].current_hp, 70)
+        self.assertEqual([count for _, count, _, _ in response.context["items"].values()], [1])
+
+    def test_run_away_in_cache(self):
+        """Escaping is kept in the cached run, and the player can walk on from the dungeon."""
+        response, _ = self.post("run_away", {"option": "not select"}, args=(self.question.pk,))
+        self.assertRedirects(response, reverse("qa_rpg:dungeon"), fetch_redirect_response=False)
+        response = self.client.get(reverse("qa_rpg:dungeon"))
+        self.assertEqual(response.context["player"].activity, "dungeon")
+        self.assertEqual(self.exit_dungeon().activity, "index")
+
+    def test_failed_run_away_in_cache(self):
+        """The damage of a failed escape is kept in the cached run, the player stays in battle."""
+        response, writes = self.post("run_away", {"option": "not select"}, roll=0, args=(self.question.pk,))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(FailCounter.objects.get(question=self.question).fails, 1)
+        response = self.client.get(reverse("qa_rpg:battle"))
+        self.assertEqual(response.context["player"].current_hp, 50 - self.question.damage)
+        self.assertEqual(response.context["player"].activity, f"battle{self.question.pk}")
+
+    def test_treasure_in_cache(self):
+        """An item picked up from a treasure chest is kept in the cached run and stored when the player exits."""
+        Player.objects.filter(pk=self.player.pk).update(activity_state=Activity.TREASURE, battle_question_id=None)
+        response, writes = self.post("treasure_action", {"action": "pick up"}, roll=0)
+        self.assertRedirects(response, reverse("qa_rpg:dungeon"), fetch_redirect_response=False)
+        self.assertEqual(writes, [])
+        self.assertEqual(Inventory.objects.get(pk=self.inventory.pk).get_inventory("dungeon"), {6: 2})
+        self.assertEqual(self.exit_dungeon().activity, "index")
+        self.assertEqual(sum(Inventory.objects.get(pk=self.inventory.pk).get_inventory("player").values()), 3)
@@ -0,0 +1,114 @@
+import threading
+
+from django.db import connection
+from django.test import TestCase, TransactionTestCase
+from qa_rpg.economy import spend, earn, claim_question_coins
+from qa_rpg.models import *
+from qa_rpg.unit_of_work import UnitOfWork
+
+THREADS = 8
+
+
+class EconomyTest(TestCase):
+
+    def setUp(self):
+        """Setup a player with coins and a question with earned coins."""
+        self.user = User.objects.create_user(username="demo")
+        self.player = Player.objects.create(user=self.user, currency=100)
+        self.question = Question.objects.create(question_text="Who?", owner=self.user, currency=30)
+
+    def stored_currency(self):
+        return Player.objects.get(pk=self.player.pk).currency
+
+    def test_spend(self):
+        """Spending takes the coins and refreshes the instance."""
+        self.assertTrue(spend(self.player, 40))
+        self.assertEqual(self.player.currency, 60)
+        self.assertEqual(self.stored_currency(), 60)
+
+    def test_spend_more_than_owned(self):
+        """A player can not spend more coins than they own, nor a negative amount."""
+        self.assertFalse(spend(self.player, 101))
+        self.assertFalse(spend(self.player, -10))
+        self.assertEqual(self.stored_currency(), 100)
+
+    def test_stale_instances_do_not_lose_coins(self):
+        """Two stale copies of the same player both earn and never overspend."""
+        other = Player.objects.get(pk=self.player.pk)
+        earn(self.player, 10)
+        earn(other, 20)
+        self.assertEqual(self.stored_currency(), 130)
+        self.assertTrue(spend(self.player, 100))
+        self.assertFalse(spend(other, 100))
+        self.assertEqual((self.player.currency, other.currency), (30, 30))
+
+    def test_flush_keeps_direct_updates(self):
+        """The unit of work does not write back a balance changed by a direct update."""
+        player = Player.objects.get(pk=self.player.pk)
+        with UnitOfWork():
+            player.set_activity("shop")
+            Player.objects.filter(pk=player.pk).update(currency=500)
+            spend(player, 50)
+        self.assertEqual(self.stored_currency(), 450)
+
+    def test_claim_once(self):
+        """The coins of a question are claimed only once."""
+        other = Player.objects.create(user=User.objects.create_user(username="demo2"))
+        self.assertEqual(claim_question_coins(self.player, self.question.pk), 30)
+        self.assertEqual(claim_question_coins(other, self.question.pk), 0)
+        self.assertEqual(self.stored_currency(), 130)
+        self.assertEqual(Question.objects.get(pk=self.question.pk).currency, 0)
+
+    def test_claim_fails(self):
+        """Claiming turns the fails of a question into coins up to its maximum, and resets them."""
+        question = Question.objects.create(question_text="Why?", owner=self.user, currency=5)
+        for _ in range(5):
+            Question.record_fail(question.pk)
+        self.assertEqual(claim_question_coins(self.player, question.pk), 20)
+        self.assertEqual(Question.objects.get(pk=question.pk).claimable, 0)
+        Question.record_fail(question.pk)
+        self.assertEqual(claim_question_coins(self.player, question.pk), 5)
+        self.assertEqual(self.stored_currency(), 125)
+
+    def test_add_dungeon_currency(self):
+        """Dungeon coins move to the balance even when the instance is stale."""
+        Player.objects.filter(pk=self.player.pk).update(dungeon_currency=15, currency=120)
+        player = Player.objects.get(pk=self.player.pk)
+        Player.objects.filter(pk=self.player.pk).update(currency=F('currency') + 5)
+        player.add_dungeon_currency()
+        self.assertEqual((player.currency, player.dungeon_currency), (140, 0))
+        self.assertEqual(self.stored_currency(), 140)
+
+
+class ConcurrentEconomyTest(TransactionTestCase):
+
+    def setUp(self):
+        """Setup a player with coins."""
+        self.player = Player.objects.create(user=User.objects.create_user(username="demo"), currency=0)
+
+    def run_threads(self, target):
+        """Run a target in several threads, each with its own connection, and fail on any error they raised."""
+        errors = []
+
+        def run():
+            try:
+                target(Player.objects.get(pk=self.player.pk))
+            except Exception as error:
+                errors.append(error)
+            finally:
+                connection.close()
+        threads = [threading.Thread(target=run) for _ in range(THREADS)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(errors, [])
+
+    def test_no_lost_coins(self):
+        """Concurrent earnings and spendings add up."""
+        def target(player):
+            for _ in range(20):
+                earn(player, 2)
+                spend(player, 1)
+        self.run_threads(target)
+        self.assertEqual(Player.objects.get(pk=self.player.pk).currency, THREADS * 20)
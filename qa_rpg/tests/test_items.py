@@ -0,0 +1,49 @@
+import random
+
+from django.test import TestCase
+from qa_rpg.items_catalog import *
+
+
+class ItemEffectsTest(TestCase):
+
+    def test_modifiers(self):
+        """Each modifier kind of the table gives the effect described by its item."""
+        catalog = ItemCatalog()
+        self.assertEqual(catalog.get_item(1).damage_modifier(20), 6)
+        self.assertEqual(catalog.get_item(9).coin_modifier(10), 11)
+        self.assertEqual(catalog.get_item(11).escape_modifier(0.3), 0.3)
+        self.assertEqual(catalog.get_item(53).coin_modifier(15), -15)
+        self.assertEqual(catalog.get_item(54).damage_modifier(27), 27)
+        self.assertEqual(catalog.get_item(54).damage_modifier(30), -15)
+        self.assertEqual(catalog.get_item(15).item_modifier(1), 1)
+        self.assertEqual(str(catalog.get_item(13)), "Ambrosia")
+
+    def test_no_item(self):
+        """Without an item every stat is left as it is."""
+        self.assertEqual(apply_effects([NO_ITEM], EffectContext(10, 0.5, 20, 100)), [Effects()])
+        self.assertFalse(any(modifies(NO_ITEM, stat) for stat in STATS))
+
+    def test_item_ids(self):
+        """Chest and cursed items are precomputed from the ranges of the table."""
+        catalog = ItemCatalog()
+        self.assertEqual(catalog.get_chest_items(), (10, 11, 12, 13, 14, 15))
+        self.assertEqual(catalog.get_cursed_items(), (50, 51, 52, 53, 54, 55, 56, 57))
+        self.assertTrue(modifies(50, "coin") and modifies(50, "damage"))
+        self.assertFalse(modifies(50, "health"))
+
+    def test_batch_matches_single_uses(self):
+        """Applying a batch of items gives the same effects as applying them one at a time, stat by stat."""
+        item_ids = [item_id for item_id in ITEM_TABLE if item_id not in (0, 55)] * 50
+        contexts = [EffectContext(coin=index % 40, escape=0.5, damage=index % 35, health=100)
+                    for index in range(len(item_ids))]
+        single = [Effects(*(apply_effect(item_id, stat, base) for stat, base in zip(STATS, context)))
+                  for item_id, context in zip(item_ids, contexts)]
+        self.assertEqual(apply_effects(item_ids, contexts), single)
+
+    def test_batch_random_modifiers(self):
+        """Random modifiers stay in the range of their item over many uses."""
+        random.seed(0)
+        candy = {effects.health for effects in apply_effects([0] * 2000, EffectContext(health=100))}
+        self.assertEqual(candy, set(range(5, 11)))
+        vial = [effects.health for effects in apply_effects([55] * 2000, EffectContext(health=100))]
+        self.assertEqual((min(vial), max(vial)), (-15, 15))
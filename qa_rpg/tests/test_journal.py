@@ -0,0 +1,65 @@
+from unittest import mock
+
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from qa_rpg.dungeon_run import run_cache, run_key
+from qa_rpg.journal import STATE_FIELDS, rebuild_state
+from qa_rpg.models import *
+
+
+@override_settings(DUNGEON_CHECKPOINT_CLICKS=20)
+class RunJournalTest(TestCase):
+
+    def setUp(self):
+        """Setup a logged in player about to enter the dungeon."""
+        self.user = User.objects.create_user(username="demo")
+        self.user.set_password("12345")
+        self.user.save()
+        self.client.login(username="demo", password="12345")
+        self.player = Player.objects.create(user=self.user, activity="select_dg")
+        self.log = Log.objects.create(player=self.player)
+        self.inventory = Inventory.objects.create(player=self.player, dungeon_inventory="6:1;")
+
+    def tearDown(self):
+        run_cache().delete(run_key(self.user.pk))
+
+    def play(self, walks: int):
+        """Enter the dungeon, walk without meeting anything and exit."""
+        with mock.patch("qa_rpg.views.random.random", return_value=0.9):
+            self.client.get(reverse("qa_rpg:dungeon"))
+            for _ in range(walks):
+                self.client.post(reverse("qa_rpg:action"), {"action": "walk"})
+            with CaptureQueriesContext(connection) as queries:
+                self.client.post(reverse("qa_rpg:action"), {"action": "exit"})
+        return [query['sql'] for query in queries if query['sql'].startswith('INSERT INTO "qa_rpg_runevent"')]
+
+    def stored_state(self):
+        """Return the run fields stored in the database."""
+        rows = {"player": Player.objects.get(pk=self.player.pk), "log": Log.objects.get(pk=self.log.pk),
+                "inventory": Inventory.objects.get(pk=self.inventory.pk)}
+        return {field: getattr(rows[name], field) for name, field in STATE_FIELDS}
+
+    def test_events_appended_at_checkpoint(self):
+        """The events of a cached run are appended with one insert when the player exits."""
+        self.assertEqual(len(self.play(3)), 1)
+        kinds = list(RunEvent.objects.filter(player=self.player).order_by('seq').values_list('kind', flat=True))
+        self.assertEqual(kinds, ["start", "walk", "walk", "walk", "exit"])
+        self.assertEqual(RunSnapshot.objects.filter(player=self.player).count(), 1)
+
+    def test_rebuild_state(self):
+        """The state rebuilt from the snapshot and the events is the stored one."""
+        self.play(3)
+        self.assertEqual(rebuild_state(self.player.pk), self.stored_state())
+        self.assertAlmostEqual(rebuild_state(self.player.pk, seq=3)["luck"], BASE_LUCK + 0.04)
+
+    @mock.patch("qa_rpg.journal.SNAPSHOT_EVENTS", 2)
+    def test_periodic_snapshots(self):
+        """Snapshots are taken every SNAPSHOT_EVENTS events and the state rebuilds from the latest one."""
+        self.play(4)
+        self.assertEqual(list(RunSnapshot.objects.filter(player=self.player).order_by('seq')
+                         .values_list('seq', flat=True)),
+                         [1, 2, 4, 6])
+        self.assertEqual(rebuild_state(self.player.pk), self.stored_state())
+        self.assertAlmostEqual(rebuild_state(self.player.pk, seq=5)["luck"], BASE_LUCK + 0.08)
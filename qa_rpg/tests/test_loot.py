@@ -0,0 +1,81 @@
+import json
+import os
+import random
+import tempfile
+from collections import Counter
+
+from django.test import SimpleTestCase
+from qa_rpg.loot import AliasTable, LootTables, compile_tables, loot_tables
+
+DRAWS = 100000
+# Chi-square critical values at a 0.001 significance level, by degrees of freedom.
+CHI_SQUARE_CRITICAL = {3: 16.266, 7: 24.322}
+
+
+def chi_square(counts: Counter, weights: dict, draws: int):
+    """Return the chi-square statistic of drawn counts against the expected weights."""
+    total = sum(weights.values())
+    return sum((counts[outcome] - draws * weight / total) ** 2 / (draws * weight / total)
+               for outcome, weight in weights.items())
+
+
+class LootTablesTest(SimpleTestCase):
+
+    def setUp(self):
+        random.seed(2023)
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "loot.json")
+        self.data = {"chest": {"10": 1}, "cursed": {"50": 1}, "treasure_coins": {"15": 1}}
+        self.write()
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def write(self, **tables):
+        """Write the drop tables to the data file, with a later modification time than the last write."""
+        self.data.update(tables)
+        with open(self.path, "w") as data_file:
+            json.dump(self.data, data_file)
+        modified = os.stat(self.path).st_mtime + len(tables)
+        os.utime(self.path, (modified, modified))
+
+    def test_weighted_distribution(self):
+        """The drawn outcomes follow the weights of the table."""
+        weights = {15: 40, 30: 25, 60: 5, 69: 1}
+        table = AliasTable(weights)
+        counts = Counter(table.draw() for _ in range(DRAWS))
+        self.assertLess(chi_square(counts, weights, DRAWS), CHI_SQUARE_CRITICAL[3])
+
+    def test_shipped_tables_are_uniform(self):
+        """The shipped data file keeps the uniform drops of the previous item lists."""
+        counts = Counter(loot_tables.draw("cursed") for _ in range(DRAWS))
+        weights = {item_id: 1 for item_id in range(50, 58)}
+        self.assertLess(chi_square(counts, weights, DRAWS), CHI_SQUARE_CRITICAL[7])
+
+    def test_invalid_tables(self):
+        """Tables with unknown items or without positive weights are rejected."""
+        with self.assertRaises(ValueError):
+            compile_tables(dict(self.data, chest={"998": 1}))
+        with self.assertRaises(ValueError):
+            AliasTable({10: 0})
+
+    def test_hot_reload(self):
+        """A changed data file is picked up on the next check, a broken one keeps the previous tables."""
+        tables = LootTables(self.path, reload_interval=0)
+        self.assertEqual(tables.draw("chest"), 10)
+        self.write(chest={"12": 1})
+        self.assertEqual(tables.draw("chest"), 12)
+        with open(self.path, "w") as data_file:
+            data_file.write("{")
+        os.utime(self.path, (0, 0))
+        with self.assertLogs("qa_rpg.loot", level="ERROR"):
+            self.assertEqual(tables.draw("chest"), 12)
+
+    def test_reload_interval(self):
+        """The data file is not checked again before the reload interval."""
+        tables = LootTables(self.path, reload_interval=3600)
+        tables.draw("chest")
+        self.write(chest={"12": 1})
+        self.assertEqual(tables.draw("chest"), 10)
+        tables.reload()
+        self.assertEqual(tables.draw("chest"), 12)
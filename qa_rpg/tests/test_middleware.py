@@ -0,0 +1,50 @@
+from django.test import TestCase
+from qa_rpg.middleware import load_game_context
+from qa_rpg.models import *
+from qa_rpg.unit_of_work import UnitOfWork
+
+
+class GameContextTest(TestCase):
+
+    def setUp(self):
+        """Setup a user with a complete player state."""
+        self.user = User.objects.create_user(username="demo")
+        self.player = Player.objects.create(user=self.user)
+        self.log = Log.objects.create(player=self.player)
+        self.inventory = Inventory.objects.create(player=self.player)
+
+    def test_single_query(self):
+        """The player, log, inventory and username are loaded with one query."""
+        with self.assertNumQueries(1):
+            game = load_game_context(self.user)
+            self.assertEqual(game.player.player_name, "demo")
+            self.assertEqual(game.log.player, game.player)
+            self.assertEqual(game.inventory.pk, self.inventory.pk)
+        self.assertIs(game.player.inventory, game.inventory)
+
+    def test_create_missing_state(self):
+        """A user without a player gets a player, log and starting inventory."""
+        user = User.objects.create_user(username="demo2")
+        player, log, inventory = load_game_context(user)
+        self.assertEqual(player.user, user)
+        self.assertEqual(Log.objects.get(player=player), log)
+        self.assertEqual(Inventory.objects.get(player=player).get_inventory("player"), {0: 5})
+        self.assertEqual(inventory.get_templates(), {0: 1, 1: 1})
+
+    def test_starting_grant_kept_when_request_fails(self):
+        """The starting inventory is written with its row, not dropped with the writes of a failed request."""
+        user = User.objects.create_user(username="demo2")
+        with self.assertRaises(RuntimeError):
+            with UnitOfWork():
+                load_game_context(user)
+                raise RuntimeError
+        inventory = Inventory.objects.get(player__user=user)
+        self.assertEqual(inventory.get_inventory("player"), {0: 5})
+        self.assertEqual(inventory.get_templates(), {0: 1, 1: 1})
+
+    def test_create_missing_log(self):
+        """Only the missing rows of an existing player are created."""
+        self.log.delete()
+        player, log, _ = load_game_context(self.user)
+        self.assertEqual(player.pk, self.player.pk)
+        self.assertEqual(Log.objects.get(player=player), log)
@@ -1,6 +1,8 @@
+from unittest import mock
 from django.test import TestCase
+from qa_rpg.inventory_codec import decode_counts
 from qa_rpg.models import *
-from django.contrib.auth.models import User
+from qa_rpg.models import User
 
 empty_log = ['', '', '', '', '', '', '', '', '', '']
 
@@ -26,11 +28,47 @@ class QuestionModelTest(TestCase):
         ReportAndCommend.objects.create(user=self.system, question=self.question, vote=1)
         self.assertEqual(self.question.commend, 2)
 
+    def test_flip_vote(self):
+        """Flipping a vote moves it from one counter to the other, deleting it removes it."""
+        vote = ReportAndCommend.objects.create(user=self.system, question=self.question, vote=0)
+        vote = ReportAndCommend.objects.get(pk=vote.pk)
+        vote.vote = 1
+        vote.save()
+        self.question.refresh_from_db()
+        self.assertEqual((self.question.report, self.question.commend), (0, 1))
+        vote.delete()
+        self.question.refresh_from_db()
+        self.assertEqual((self.question.report, self.question.commend), (0, 0))
+
     def test_get_correct_answer(self):
         """correct_choice property returns the right answer."""
         choice = Choice.objects.create(question=self.question, choice_text='yes', correct_answer=True)
         Choice.objects.create(question=self.question, choice_text='no', correct_answer=False)
         self.assertEqual(self.question.correct_choice, choice)
+        self.assertEqual(Question.objects.get(pk=self.question.pk).correct_choice, choice)
+
+    def test_fails_earn_coins_on_read(self):
+        """Fails are counted apart from the question row, even without a counter, and earn the rate up to the maximum."""
+        self.assertEqual(self.question.claimable, 0)
+        FailCounter.objects.filter(question=self.question).delete()
+        with self.assertNumQueries(3):
+            self.question.add_coin()
+        for _ in range(5):
+            with self.assertNumQueries(1):
+                Question.record_fail(self.question.pk)
+        question = Question.objects.get(pk=self.question.pk)
+        self.assertEqual((question.currency, question.fails, question.claimable), (0, 6, 20))
+
+    def test_unmark_correct_answer(self):
+        """Unmarking or deleting the correct choice clears the pointer of the question."""
+        choice = Choice.objects.create(question=self.question, choice_text='yes', correct_answer=True)
+        choice = Choice.objects.get(pk=choice.pk)
+        choice.correct_answer = False
+        choice.save()
+        self.assertIsNone(Question.objects.get(pk=self.question.pk).correct_choice)
+        choice = Choice.objects.create(question=self.question, choice_text='no', correct_answer=True)
+        choice.delete()
+        self.assertIsNone(Question.objects.get(pk=self.question.pk).correct_choice)
 
 
 class PlayerModelTest(TestCase):
@@ -71,6 +109,26 @@ class PlayerModelTest(TestCase):
         self.player.set_activity("dungeon")
         self.assertEqual(self.player.activity, "dungeon")
 
+    def test_activity_payload(self):
+        """Legacy activity strings are stored as a state and payload fields and read back unchanged."""
+        for text in ["battle12", "choose3", "summon4 3", "summon4", "found monster"]:
+            self.player.set_activity(text)
+            player = Player.objects.get(pk=self.player.pk)
+            self.assertEqual(player.activity, text)
+        self.assertEqual((player.activity_state, player.summon_template, player.summon_choices),
+                         (Activity.FOUND_MONSTER, None, None))
+        self.player.set_activity(Activity.BATTLE, question_id=7)
+        self.assertTrue(self.player.in_battle(7))
+        self.assertFalse(self.player.in_battle(8))
+
+    def test_activity_alias(self):
+        """Names that only matched fuzzily map to a fixed state, and unknown names are rejected."""
+        self.assertEqual(parse_activity("select_items")[0], Activity.SELECT_DUNGEON)
+        self.assertEqual(parse_activity("buy")[0], Activity.SHOP)
+        for text in ["dungeons", "battle1 2", "choose1 2", "summonx"]:
+            with self.assertRaises(ValueError):
+                parse_activity(text)
+
     def test_dead_player(self):
         """When a player dies, their dungeon currency becomes 0 and returns to index page."""
         self.player.dungeon_currency += 10
@@ -122,6 +180,17 @@ class LogModelTest(TestCase):
         self.assertEqual(self.log.split_log("text"), logs_text[1:])
         self.assertEqual(len(self.log.split_log("text")), 10)
 
+    def test_ring_buffer_reload(self):
+        """Entries wrap around a fixed number of slots, and each new entry is a single write."""
+        self.log.split_log("text")
+        for i in range(25):
+            with self.assertNumQueries(1):
+                self.log.add_log(text=f"text-red-600:line {i}")
+        self.assertEqual(LogEntry.objects.filter(log=self.log).count(), LOG_CAPACITY)
+        log = Log.objects.get(pk=self.log.pk)
+        self.assertEqual(log.split_log("text"), [f"text-red-600:line {i}" for i in range(15, 25)])
+        self.assertEqual(log.recent_logs()[-1], ["text-red-600", "line 24"])
+
     def test_clear_log(self):
         """clear_log method should empty out the log."""
         self.log.add_log(text='test')
@@ -184,6 +253,32 @@ class InventoryModelTest(TestCase):
         self.assertEqual(len(item_player), 1)
         self.assertEqual(len(item_dungeon), 0)
 
+    def test_decode_once(self):
+        """The inventory string is decoded again only after it changed."""
+        self.inventory.update_inventory({0: 1, 1: 2}, "dungeon")
+        with mock.patch("qa_rpg.models.decode_counts", wraps=decode_counts) as decode:
+            for _ in range(3):
+                self.assertEqual(self.inventory.get_inventory("dungeon"), {0: 1, 1: 2})
+            self.assertEqual(decode.call_count, 0)
+            self.inventory.dungeon_inventory = "1:1;"
+            self.assertEqual(self.inventory.get_inventory("dungeon"), {1: 1})
+            self.assertEqual(self.inventory.get_inventory("dungeon"), {1: 1})
+            self.assertEqual(decode.call_count, 1)
+
+    def test_move_item(self):
+        """Items move between inventories, and the dungeon inventory holds at most max_inventory kinds."""
+        self.inventory.update_inventory({0: 2, 1: 1, 6: 1, 7: 1}, "player")
+        for item_id in [0, 1, 6]:
+            self.assertTrue(self.inventory.move_item(item_id, 1, "dungeon"))
+        self.assertFalse(self.inventory.has_room(7))
+        self.assertFalse(self.inventory.move_item(7, 1, "dungeon"))
+        self.assertTrue(self.inventory.move_item(0, 1, "dungeon"))
+        self.assertFalse(self.inventory.move_item(1, 1, "dungeon"))
+        self.assertTrue(self.inventory.move_item(6, 1, "player"))
+        inventory = Inventory.objects.get(pk=self.inventory.pk)
+        self.assertEqual(inventory.get_inventory("dungeon"), {0: 2, 1: 1})
+        self.assertEqual(inventory.get_inventory("player"), {6: 1, 7: 1})
+
     def test_get_templates(self):
         self.inventory.question_template = "0:1;"
         template = self.inventory.get_templates()
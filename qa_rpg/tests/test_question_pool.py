@@ -0,0 +1,165 @@
+import random
+
+from django.test import TestCase
+from qa_rpg.models import *
+from qa_rpg.question_pool import QuestionDeck, QuestionPool, question_pool, HARD, MAX_DEAL_SKIPS
+
+
+class QuestionPoolTest(TestCase):
+
+    def setUp(self):
+        """Setup for testing the question pool."""
+        question_pool.invalidate()
+        self.system = User.objects.create_user(username="test")
+        self.user = User.objects.create_user(username="demo")
+        self.question = Question.objects.create(question_text="test", owner=self.system)
+        self.own_question = Question.objects.create(question_text="own", owner=self.user)
+
+    def test_sample_enabled_question(self):
+        """Only enabled questions are drawn from the pool."""
+        disabled = Question.objects.create(question_text="disabled", owner=self.system, enable=False)
+        for _ in range(20):
+            self.assertNotEqual(question_pool.sample(), disabled.id)
+        self.assertEqual(len(question_pool), 2)
+
+    def test_sample_exclude_owner(self):
+        """A player never draws their own question."""
+        for _ in range(20):
+            self.assertEqual(question_pool.sample(exclude_owner=self.user.pk), self.question.id)
+
+    def test_sample_exclude_seen(self):
+        """Seen or reported questions are not drawn, and None is returned when nothing is left."""
+        self.assertEqual(question_pool.sample(exclude_ids={self.question.id}), self.own_question.id)
+        self.assertIsNone(question_pool.sample(exclude_owner=self.user.pk, exclude_ids={self.question.id}))
+
+    def test_sample_category(self):
+        """Draws can be restricted to a single category."""
+        player_question = Question.objects.create(question_text="player", owner=self.system, category="player")
+        self.assertEqual(question_pool.sample(category="player"), player_question.id)
+
+    def test_disabled_question_leaves_pool(self):
+        """Disabling or deleting a question removes it from a loaded pool."""
+        self.assertEqual(len(question_pool), 2)
+        self.question.enable = False
+        self.question.save()
+        self.assertEqual(len(question_pool), 1)
+        self.own_question.delete()
+        self.assertEqual(len(question_pool), 0)
+        self.assertIsNone(question_pool.sample())
+
+
+class WeightedQuestionPoolTest(TestCase):
+
+    def setUp(self):
+        """Setup questions spread over categories and damage tiers."""
+        self.system = User.objects.create_user(username="test")
+        self.easy = [Question.objects.create(question_text=f"easy{i}", owner=self.system, category="Math",
+                                             damage=20).id for i in range(10)]
+        self.hard = [Question.objects.create(question_text=f"hard{i}", owner=self.system, category="Math",
+                                             damage=35).id for i in range(10)]
+        self.player = [Question.objects.create(question_text=f"player{i}", owner=self.system, category="player",
+                                               damage=20).id for i in range(2)]
+
+    def test_sample_tier(self):
+        """Draws can be restricted to a damage tier."""
+        pool = QuestionPool()
+        for _ in range(20):
+            self.assertIn(pool.sample(tier=HARD), self.hard)
+
+    def test_bucket_weight(self):
+        """A bucket with no weight is never drawn and heavier buckets are drawn more often."""
+        pool = QuestionPool(category_weights={"player": 0}, tier_weights={HARD: 9})
+        drawn = [pool.sample() for _ in range(1000)]
+        self.assertFalse(set(drawn) & set(self.player))
+        self.assertGreater(sum(question_id in self.hard for question_id in drawn), 800)
+
+    def test_deck_bucket_weight(self):
+        """The decks of the encounters follow the bucket weights, and a full cycle deals no question twice."""
+        random.seed(0)
+        log = Log.objects.create(player=Player.objects.create(user=self.system))
+        pool = QuestionPool(category_weights={"player": 0}, tier_weights={HARD: 9})
+        drawn = [pool.deal(log) for _ in range(100)]
+        self.assertFalse(set(drawn) & set(self.player))
+        self.assertGreater(sum(question_id in self.hard for question_id in drawn), 4 * sum(
+            question_id in self.easy for question_id in drawn))
+        log.deck_cursor = log.deck_size
+        cycle = [pool.deal(log)]
+        seed = log.deck_seed
+        question_id = pool.deal(log)
+        while log.deck_seed == seed:
+            cycle.append(question_id)
+            question_id = pool.deal(log)
+        self.assertEqual(len(cycle), len(set(cycle)))
+
+    def test_move_question_between_buckets(self):
+        """Changing the damage of a question moves it to the bucket of its new tier."""
+        question_pool.invalidate()
+        self.assertEqual(len(question_pool), 22)
+        question = Question.objects.get(pk=self.easy[0])
+        question.damage = 40
+        question.save()
+        self.assertEqual(len(question_pool), 22)
+        drawn = {question_pool.sample(tier=HARD) for _ in range(200)}
+        self.assertIn(question.id, drawn)
+
+
+class QuestionDeckTest(TestCase):
+
+    def setUp(self):
+        """Setup for testing the per-player question deck."""
+        question_pool.invalidate()
+        self.system = User.objects.create_user(username="test")
+        self.user = User.objects.create_user(username="demo")
+        self.player = Player.objects.create(user=self.user)
+        self.log = Log.objects.create(player=self.player)
+        for i in range(30):
+            Question.objects.create(question_text=f"test{i}", owner=self.system)
+
+    def test_deck_is_permutation(self):
+        """Every id below the size of a deck appears exactly once in it."""
+        for size in [1, 2, 7, 64, 1000]:
+            deck = QuestionDeck(seed=size, size=size)
+            self.assertEqual(sorted(deck[cursor] for cursor in range(size)), list(range(size)))
+
+    def test_full_cycle_without_repeat(self):
+        """A player sees every question once before any question repeats."""
+        dealt = [question_pool.deal(self.log, self.user.pk) for _ in range(30)]
+        self.assertEqual(len(set(dealt)), 30)
+        seed = self.log.deck_seed
+        self.assertIn(question_pool.deal(self.log, self.user.pk), dealt)
+        self.assertNotEqual(self.log.deck_seed, seed)
+
+    def test_cycle_kept_across_pools(self):
+        """A cycle continues without repeats after a discard, a reload or on the pool of another process."""
+        dealt = [question_pool.deal(self.log, self.user.pk) for _ in range(10)]
+        question = Question.objects.exclude(id__in=dealt).first()
+        question.enable = False
+        question.save()
+        dealt += [question_pool.deal(self.log, self.user.pk) for _ in range(5)]
+        question_pool.invalidate()
+        dealt += [question_pool.deal(self.log, self.user.pk) for _ in range(5)]
+        other_pool = QuestionPool()
+        dealt += [other_pool.deal(self.log, self.user.pk) for _ in range(9)]
+        self.assertEqual(len(set(dealt)), 29)
+        self.assertNotIn(question.id, dealt)
+        self.assertEqual(set(dealt) | {question.id}, set(Question.objects.values_list("id", flat=True)))
+
+    def test_sparse_ids(self):
+        """A deal over ids that are mostly missing from the pool stops skipping after a bound and still deals."""
+        Question.objects.all().delete()
+        Question.objects.bulk_create(Question(question_text=f"sparse{i}", owner=self.system, enable=i % 250 == 0)
+                                     for i in range(1000))
+        enabled = set(Question.objects.filter(enable=True).values_list("id", flat=True))
+        pool = QuestionPool()
+        for _ in range(20):
+            cursor, seed = self.log.deck_cursor, self.log.deck_seed
+            self.assertIn(pool.deal(self.log, self.user.pk), enabled)
+            if self.log.deck_seed == seed:
+                self.assertLessEqual(self.log.deck_cursor - cursor, MAX_DEAL_SKIPS + 1)
+
+    def test_deal_skips_reported_question(self):
+        """Reported questions are skipped while dealing."""
+        reported = set(Question.objects.values_list("id", flat=True)[:10])
+        dealt = [question_pool.deal(self.log, self.user.pk, reported) for _ in range(20)]
+        self.assertTrue(reported.isdisjoint(dealt))
+        self.assertEqual(len(set(dealt)), 20)
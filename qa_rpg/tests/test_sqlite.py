@@ -0,0 +1,40 @@
+import os
+import tempfile
+
+from django.db import connection
+from django.db.backends.sqlite3.base import DatabaseWrapper
+from django.test import SimpleTestCase, override_settings
+
+PRODUCTION_PRAGMAS = {'journal_mode': 'WAL', 'synchronous': 'NORMAL', 'busy_timeout': 3000, 'mmap_size': 1048576}
+
+
+class SqlitePragmaTest(SimpleTestCase):
+
+    def open_connection(self, path):
+        """Open a new connection to a database file, which runs the pragmas of the profile."""
+        wrapper = DatabaseWrapper(dict(connection.settings_dict, NAME=path))
+        wrapper.ensure_connection()
+        self.addCleanup(wrapper.close)
+        return wrapper
+
+    def pragma(self, wrapper, name):
+        return wrapper.connection.execute(f"PRAGMA {name}").fetchone()[0]
+
+    @override_settings(SQLITE_PRAGMAS=PRODUCTION_PRAGMAS)
+    def test_production_pragmas(self):
+        """A new connection runs in WAL mode with the tuned pragmas."""
+        with tempfile.TemporaryDirectory() as directory:
+            wrapper = self.open_connection(os.path.join(directory, "game.sqlite3"))
+            self.assertEqual(self.pragma(wrapper, "journal_mode"), "wal")
+            self.assertEqual(self.pragma(wrapper, "synchronous"), 1)
+            self.assertEqual(self.pragma(wrapper, "busy_timeout"), 3000)
+            self.assertEqual(self.pragma(wrapper, "mmap_size"), 1048576)
+            wrapper.close()
+
+    @override_settings(SQLITE_PRAGMAS={})
+    def test_development_defaults(self):
+        """Without a profile the connection keeps the defaults of SQLite."""
+        with tempfile.TemporaryDirectory() as directory:
+            wrapper = self.open_connection(os.path.join(directory, "game.sqlite3"))
+            self.assertEqual(self.pragma(wrapper, "journal_mode"), "delete")
+            wrapper.close()
@@ -0,0 +1,82 @@
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from qa_rpg.models import *
+from qa_rpg.unit_of_work import UnitOfWork
+
+
+def updates_of(queries, table):
+    """Return the UPDATE statements on a table among captured queries."""
+    return [query['sql'] for query in queries if query['sql'].startswith(f'UPDATE "{table}"')]
+
+
+class UnitOfWorkTest(TestCase):
+
+    def setUp(self):
+        """Setup a player with a log and an inventory."""
+        self.user = User.objects.create_user(username="demo")
+        self.player = Player.objects.create(user=self.user)
+        self.log = Log.objects.create(player=self.player)
+        self.inventory = Inventory.objects.create(player=self.player)
+
+    def test_save_outside_unit_of_work(self):
+        """Without a unit of work the helpers save right away."""
+        self.player.set_activity("dungeon")
+        self.assertEqual(Player.objects.get(pk=self.player.pk).activity, "dungeon")
+
+    def test_coalesce_changed_fields(self):
+        """Several helper calls in a unit of work write the row once with only the changed fields."""
+        player = Player.objects.get(pk=self.player.pk)
+        with CaptureQueriesContext(connection) as queries:
+            with UnitOfWork():
+                player.set_activity("dungeon")
+                player.update_player_stats(health=-10, dungeon_currency=5)
+                player.update_player_stats(dungeon_currency=5)
+                self.assertEqual(Player.objects.get(pk=player.pk).activity, "index")
+        updates = updates_of(queries, "qa_rpg_player")
+        self.assertEqual(len(updates), 1)
+        self.assertNotIn('"max_hp"', updates[0])
+        player = Player.objects.get(pk=player.pk)
+        self.assertEqual((player.activity, player.current_hp, player.dungeon_currency), ("dungeon", 90, 10))
+
+    def test_unchanged_row_is_not_written(self):
+        """A save that changes nothing issues no query."""
+        inventory = Inventory.objects.get(pk=self.inventory.pk)
+        with self.assertNumQueries(0):
+            with UnitOfWork():
+                inventory.update_inventory({}, "dungeon")
+
+    def test_discard_on_error(self):
+        """Pending writes are dropped when the unit of work exits with an error."""
+        player = Player.objects.get(pk=self.player.pk)
+        with self.assertRaises(ValueError):
+            with UnitOfWork():
+                player.set_activity("dungeon")
+                raise ValueError
+        self.assertEqual(Player.objects.get(pk=player.pk).activity, "index")
+
+
+class RequestUnitOfWorkTest(TestCase):
+
+    def setUp(self):
+        """Setup a logged in player in the dungeon."""
+        self.user = User.objects.create_user(username="demo")
+        self.user.set_password("12345")
+        self.user.save()
+        self.client.login(username="demo", password="12345")
+        self.player = Player.objects.create(user=self.user, activity="dungeon", dungeon_currency=10)
+        self.log = Log.objects.create(player=self.player, log_questions="-9999;")
+        self.inventory = Inventory.objects.create(player=self.player, dungeon_inventory="6:1;")
+
+    def test_exit_writes_each_row_once(self):
+        """Exiting the dungeon writes the player, log and inventory at most once each, besides the coin transfer."""
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(reverse("qa_rpg:action"), {"action": "exit"})
+        self.assertEqual(response.status_code, 302)
+        for table in ["qa_rpg_player", "qa_rpg_log", "qa_rpg_inventory"]:
+            updates = [sql for sql in updates_of(queries, table) if '"dungeon_currency" = 0' not in sql]
+            self.assertLessEqual(len(updates), 1)
+        player = Player.objects.get(pk=self.player.pk)
+        self.assertEqual((player.activity, player.currency, player.dungeon_currency), ("index", 10, 0))
+        self.assertEqual(Inventory.objects.get(pk=self.inventory.pk).get_inventory("player"), {6: 1})
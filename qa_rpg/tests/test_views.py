@@ -1,9 +1,14 @@
-from django.test import TestCase
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from qa_rpg.models import *
-from django.contrib.auth.models import User
+from qa_rpg.models import User
+from django.db import connection
 from django.urls import reverse
+from qa_rpg.admin import EstimatedCountPaginator
+from qa_rpg.battle_card import get_battle_card
 import random
 
+CHECK_QUERIES = 5
 empty_log = ['', '', '', '', '', '', '', '', '', '']
 
 
@@ -219,7 +224,7 @@ class BattleViewTest(TestCase):
             question_text="test new question", owner=self.system)
         response = self.client.get(reverse("qa_rpg:battle"))
         self.assertEqual(response.status_code, 200)
-        self.assertEqual(response.context["question"], self.question)
+        self.assertEqual(response.context["question"].id, self.question.id)
 
     def test_not_matching_activity(self):
         """If the player activity is not battle, redirect player to the correct page."""
@@ -232,6 +237,8 @@ class BattleViewTest(TestCase):
         self.assertEqual(response.status_code, 302)
 
 
+# The run is read back from the database after each request, so every request is a checkpoint.
+@override_settings(DUNGEON_CHECKPOINT_CLICKS=0)
 class BattleActionTest(TestCase):
 
     def setUp(self):
@@ -263,6 +270,26 @@ class BattleActionTest(TestCase):
                                     {"option": "not select"})
         self.assertEqual(response.status_code, 302)
 
+    def test_choice_of_other_question(self):
+        """A choice that does not belong to the question is rejected without affecting the player."""
+        other = Question.objects.create(question_text="other", owner=self.system)
+        other_choice = Choice.objects.create(question=other, choice_text='yes', correct_answer=True)
+        response = self.client.post(reverse("qa_rpg:check", args=(self.question.id,)),
+                                    {"choice": other_choice.id, "option": "not select"})
+        self.assertRedirects(response, reverse("qa_rpg:battle"), fetch_redirect_response=False)
+        self.player = Player.objects.get(pk=self.player.pk)
+        self.assertEqual(self.player.activity, "battle1")
+        self.assertEqual(self.player.current_hp, self.player.max_hp)
+
+    def test_check_query_budget(self):
+        """Answering a cached question in a cached dungeon run costs a fixed number of queries."""
+        get_battle_card(self.question.id)
+        Log.objects.create(player=self.player)
+        random.seed(100)
+        with self.settings(DUNGEON_CHECKPOINT_CLICKS=20), self.assertNumQueries(CHECK_QUERIES):
+            self.client.post(reverse("qa_rpg:check", args=(self.question.id,)),
+                             {"choice": self.wrong.id, "option": "not select"})
+
     def test_player_answers_correctly(self):
         """When player chooses the correct answer, player is given currency and health is not deducted."""
         random.seed(100)
@@ -284,7 +311,8 @@ class BattleActionTest(TestCase):
         self.question = Question.objects.get(pk=1)
         self.assertEqual(self.player.current_hp,
                          self.player.max_hp - self.question.damage)
-        self.assertEqual(self.question.currency, 5)
+        self.assertEqual(self.question.currency, 0)
+        self.assertEqual(self.question.claimable, 5)
         self.assertEqual(self.player.dungeon_currency, 0)
         self.assertEqual(self.player.luck, BASE_LUCK)
         self.assertEqual(self.player.activity, "dungeon")
@@ -404,6 +432,12 @@ class SummonViewTest(TestCase):
         response = self.client.get(reverse("qa_rpg:summon"))
         self.assertEqual(response.status_code, 302)
 
+    def test_rendering_summon_page_without_template(self):
+        """A player who has not chosen a template is sent back to the template page."""
+        self.player.set_activity("template")
+        response = self.client.get(reverse("qa_rpg:summon"))
+        self.assertRedirects(response, reverse("qa_rpg:template"), fetch_redirect_response=False)
+
 
 class CreateQuestionTest(TestCase):
     """Testing actions in summon page."""
@@ -476,6 +510,28 @@ class CreateQuestionTest(TestCase):
         self.assertEqual(self.player.currency, 20)
 
 
+    def test_template_not_owned(self):
+        """A template the player does not own is rejected before any coin is taken or monster created."""
+        self.player.set_activity("summon4 1")
+        self.player.currency = 200
+        self.player.save()
+        for template_id in ["5", "x"]:
+            response = self.client.post(reverse("qa_rpg:create"),
+                                        {"question0": "What ",
+                                         "question1": "is ",
+                                         "question2": "this",
+                                         "question3": "?",
+                                         "choice0": "1",
+                                         "choice1": "2",
+                                         "choice2": "3",
+                                         "choice3": "4",
+                                         "fee": "150", "index": "0", "template_id": template_id})
+            self.assertRedirects(response, reverse("qa_rpg:summon"), fetch_redirect_response=False)
+        self.assertEqual(Player.objects.get(pk=self.player.pk).currency, 200)
+        self.assertFalse(Question.objects.filter(owner=self.user).exists())
+        self.assertEqual(Inventory.objects.get(pk=self.inventory.pk).get_templates(), {0: 2})
+
+
 class ProfileViewTest(TestCase):
     """Testing actions in profile page."""
 
@@ -542,6 +598,8 @@ class TreasureViewTest(TestCase):
             user=self.user).activity, "treasure")
 
 
+# The run is read back from the database after each request, so every request is a checkpoint.
+@override_settings(DUNGEON_CHECKPOINT_CLICKS=0)
 class TreasureActionTest(TestCase):
 
     def setUp(self):
@@ -733,6 +791,13 @@ class BuyingTest(TestCase):
         self.player = Player.objects.get(pk=1)
         self.assertEqual(self.player.currency, 100)
 
+    def test_buy_items_at_store_price(self):
+        """The price of an item comes from the catalog, not from the posted listing."""
+        self.player.currency = 100
+        self.player.save()
+        self.client.post(reverse("qa_rpg:buy"), {"index": "[6, 0, 6, 6]", "amount": 1})
+        self.assertEqual(Player.objects.get(pk=self.player.pk).currency, 20)
+
     def test_remain_currency_after_buy_items(self):
         """Test remain currency after buying items."""
         random.seed(100)
@@ -816,6 +881,20 @@ class UpgradeTest(TestCase):
         self.assertEqual(self.player.question_rate_currency, 6)
         self.assertEqual(self.player.currency, 0)
 
+    def test_upgrade_query_count(self):
+        """An earning upgrade costs the same queries however many monsters the player owns."""
+        self.client.get(reverse("qa_rpg:upgrade"))
+        counts = []
+        for owned in [1, 30]:
+            while Question.objects.filter(owner=self.user).count() < owned:
+                Question.objects.create(question_text="test", owner=self.user)
+            Player.objects.filter(user=self.user).update(currency=100)
+            with CaptureQueriesContext(connection) as queries:
+                self.client.post(reverse("qa_rpg:upgrade_action"), {"upgrade": "max_earn", "price": 100})
+            counts.append(len(queries))
+        self.assertEqual(counts[0], counts[1])
+        self.assertEqual(set(Question.objects.filter(owner=self.user).values_list("max_currency", flat=True)), {24})
+
     def test_awaken_player_success(self):
         """Test that player can upgrade."""
         random.seed(100)
@@ -986,3 +1065,54 @@ class SelectItemTest(TestCase):
         self.assertEqual(response.status_code, 302)
         self.assertEqual(len(self.inventory.get_inventory("player")), 4)
         self.assertEqual(len(self.inventory.get_inventory("dungeon")), 0)
+
+
+class QuestionAdminTest(TestCase):
+
+    def setUp(self):
+        """Setup a moderator and reported questions."""
+        self.admin = User.objects.create_superuser(username="admin", password="admin")
+        self.client.login(username="admin", password="admin")
+        for i in range(20):
+            question = Question.objects.create(question_text=f"test{i}", owner=self.admin, report_count=i)
+            Choice.objects.create(question=question, choice_text="yes", correct_answer=True)
+
+    def test_changelist_query_count(self):
+        """The changelist does not query per row or build a filter for every user."""
+        with self.assertNumQueries(10):
+            response = self.client.get(reverse("admin:qa_rpg_question_changelist"))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context["cl"].result_list[0].report_count, 19)
+
+    def test_estimated_count(self):
+        """The paginator reads the row count from the statistics of the database once they exist."""
+        self.assertIsNone(EstimatedCountPaginator.estimate("default", "qa_rpg_question"))
+        with connection.cursor() as cursor:
+            cursor.execute("ANALYZE")
+        self.assertEqual(EstimatedCountPaginator.estimate("default", "qa_rpg_question"), 20)
+        self.assertEqual(EstimatedCountPaginator(Question.objects.all(), 10).count, 20)
+
+    def test_statistics_row_count(self):
+        """Row counts are read from the statistics of SQLite and PostgreSQL, a table never analyzed has none."""
+        self.assertEqual(EstimatedCountPaginator.row_count("20 1"), 20)
+        self.assertEqual(EstimatedCountPaginator.row_count(123456.0), 123456)
+        self.assertIsNone(EstimatedCountPaginator.row_count(-1.0))
+
+    def test_owner_autocomplete(self):
+        """The owner of a question can be searched in the autocomplete of the question form."""
+        response = self.client.get(reverse("admin:autocomplete"), {"app_label": "qa_rpg", "model_name": "question",
+                                                                  "field_name": "owner", "term": "adm"})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([result["text"] for result in response.json()["results"]], ["admin"])
+
+    def test_search_owner(self):
+        """Questions can be searched by the username of their owner."""
+        response = self.client.get(reverse("admin:qa_rpg_question_changelist"), {"q": "admin"})
+        self.assertEqual(response.context["cl"].result_count, 20)
+
+    def test_report_changelist(self):
+        """The report changelist renders without listing questions and users in its filters."""
+        ReportAndCommend.objects.create(question=Question.objects.first(), user=self.admin, vote=0)
+        response = self.client.get(reverse("admin:qa_rpg_reportandcommend_changelist"))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.context["cl"].filter_specs), 1)
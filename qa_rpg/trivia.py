@@ -0,0 +1,200 @@
+"""Module that contains the streaming reader and importer of OpenTDB trivia questions."""
+import codecs
+import hashlib
+import html
+import json
+import random
+import re
+
+from django.db import transaction
+
+from .models import Question, Choice
+
+DEFAULT_DAMAGE = 20
+DEFAULT_BATCH_SIZE = 500
+CHUNK_SIZE = 64 * 1024
+SEPARATOR = re.compile(r'[\s,]*')
+
+
+def text_digest(text: str):
+    """Return a compact 64 bit digest of a question text."""
+    return int.from_bytes(hashlib.blake2b(text.encode(), digest_size=8).digest(), 'big')
+
+
+def iter_jsonl_records(stream):
+    """
+    Yield one record per line of a JSON lines stream.
+    :param stream: binary or text file object
+    """
+    for line in stream:
+        line = line.strip()
+        if line:
+            yield json.loads(line)
+
+
+class TextChunks:
+    """Text buffer of a stream read a chunk at a time, the text before the position is dropped on each read."""
+
+    def __init__(self, stream, chunk_size: int = CHUNK_SIZE):
+        self.stream = stream
+        self.chunk_size = chunk_size
+        self.buffer = ''
+        self.position = 0
+        self.eof = False
+        self.__utf8 = codecs.getincrementaldecoder('utf-8')()
+
+    def fill(self):
+        """
+        Append the next chunk of the stream to the buffer.
+        :return: whether the stream had more to read
+        """
+        chunk = self.stream.read(self.chunk_size)
+        if not chunk:
+            self.eof = True
+        text = chunk if isinstance(chunk, str) else self.__utf8.decode(chunk, final=self.eof)
+        self.buffer, self.position = self.buffer[self.position:] + text, 0
+        return not self.eof
+
+
+def find_records_start(chunks: TextChunks):
+    """
+    Move the position of the chunks past the opening bracket of a bare JSON array, or of the "results" array.
+    :param chunks: TextChunks of the document
+    :return: whether an array was found
+    """
+    while True:
+        if chunks.buffer.lstrip().startswith('['):
+            chunks.position = chunks.buffer.index('[') + 1
+            return True
+        key = chunks.buffer.find('"results"')
+        if key != -1 and chunks.buffer.find('[', key) != -1:
+            chunks.position = chunks.buffer.find('[', key) + 1
+            return True
+        if not chunks.fill():
+            return False
+
+
+def iter_json_records(stream, chunk_size: int = CHUNK_SIZE):
+    """
+    Yield the records of an OpenTDB response, or of a bare JSON array, without loading the whole document.
+    Only the current chunk and the record being decoded are kept in memory.
+    :param stream: binary file object
+    :param chunk_size: number of bytes read at a time
+    """
+    decoder = json.JSONDecoder()
+    chunks = TextChunks(stream, chunk_size)
+    if not find_records_start(chunks):
+        return
+    while True:
+        chunks.position = SEPARATOR.match(chunks.buffer, chunks.position).end()
+        if chunks.position == len(chunks.buffer):
+            if not chunks.fill():
+                return
+            continue
+        if chunks.buffer[chunks.position] == ']':
+            return
+        try:
+            record, chunks.position = decoder.raw_decode(chunks.buffer, chunks.position)
+        except json.JSONDecodeError:
+            if not chunks.fill():
+                raise
+            continue
+        yield record
+
+
+def iter_trivia_records(stream, data_format: str = 'json'):
+    """Yield records of a stream in the json or jsonl format."""
+    if data_format == 'jsonl':
+        return iter_jsonl_records(stream)
+    return iter_json_records(stream)
+
+
+class TriviaImporter:
+    """Insert OpenTDB formatted questions in batches, skipping questions the owner already has."""
+
+    def __init__(self, owner, category: str = None, damage: int = DEFAULT_DAMAGE,
+                 batch_size: int = DEFAULT_BATCH_SIZE, low_memory: bool = False, on_flush=None):
+        """
+        :param owner: User owning the imported questions
+        :param category: category of every question instead of the category of the record
+        :param damage: damage of the imported questions
+        :param batch_size: number of questions written per bulk insert
+        :param low_memory: look up duplicates per batch instead of preloading digests of every existing text
+        :param on_flush: callable receiving the importer after each committed batch
+        """
+        self.owner = owner
+        self.category = category
+        self.damage = damage
+        self.batch_size = batch_size
+        self.low_memory = low_memory
+        self.on_flush = on_flush
+        self.processed = 0
+        self.created = 0
+        self.choices_created = 0
+        self.skipped = 0
+        self.__existing = set()
+        if not low_memory:
+            self.__existing = {text_digest(text) for text in Question.objects.filter(owner=owner)
+                               .values_list('question_text', flat=True).iterator(chunk_size=2000)}
+        self.__pending = []
+
+    def add(self, record: dict):
+        """
+        Queue one OpenTDB question, the batch is written once it is full.
+        :param record: dict with question, correct_answer and incorrect_answers keys
+        """
+        self.processed += 1
+        question_text = html.unescape(record['question'])
+        digest = text_digest(question_text)
+        if digest in self.__existing:
+            self.skipped += 1
+            return
+        self.__existing.add(digest)
+        correct = html.unescape(record['correct_answer'])
+        choices = [(correct, True)] + [(html.unescape(answer), False) for answer in record['incorrect_answers']]
+        random.shuffle(choices)
+        question = Question(question_text=question_text,
+                            damage=self.damage,
+                            category=self.category or html.unescape(record.get('category', '')),
+                            owner=self.owner)
+        self.__pending.append((question, choices))
+        if len(self.__pending) >= self.batch_size:
+            self.flush()
+
+    def add_all(self, records):
+        """Queue every record of an iterable and write the last partial batch."""
+        for record in records:
+            self.add(record)
+        self.flush()
+
+    def __drop_existing(self):
+        """Drop queued questions that the owner already has, used in low memory mode."""
+        texts = [question.question_text for question, _ in self.__pending]
+        existing = set(Question.objects.filter(owner=self.owner, question_text__in=texts)
+                       .values_list('question_text', flat=True))
+        pending = [(question, choices) for question, choices in self.__pending
+                   if question.question_text not in existing]
+        self.skipped += len(self.__pending) - len(pending)
+        self.__pending = pending
+
+    def flush(self):
+        """Write the queued questions and their choices with one bulk insert each, then point the correct choices."""
+        with transaction.atomic():
+            if self.low_memory:
+                self.__drop_existing()
+                self.__existing = set()
+            if self.__pending:
+                questions = Question.objects.bulk_create([question for question, _ in self.__pending])
+                choices = [Choice(question=question, choice_text=choice_text, correct_answer=correct)
+                           for question, (_, question_choices) in zip(questions, self.__pending)
+                           for choice_text, correct in question_choices]
+                Choice.objects.bulk_create(choices, batch_size=self.batch_size * 4)
+                for choice in choices:
+                    if choice.correct_answer:
+                        choice.question.correct_choice = choice
+                Question.objects.bulk_update(questions, ['correct_choice'], batch_size=self.batch_size)
+                self.created += len(questions)
+                self.choices_created += len(choices)
+                self.__pending = []
+        if self.on_flush is not None:
+            self.on_flush(self)
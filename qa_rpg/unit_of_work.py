@@ -0,0 +1,150 @@
+"""Module that contains the request scoped unit of work coalescing writes of player state."""
+from contextvars import ContextVar
+
+from asgiref.sync import sync_to_async
+from django.db import transaction
+
+_current = ContextVar('unit_of_work', default=None)
+
+
+def current_unit_of_work():
+    """Return the unit of work of the running request, or None outside of one."""
+    return _current.get()
+
+
+class UnitOfWork:
+    """
+    Collect saves of tracked models and write each changed row once, with only its changed fields.
+    Used as a context manager, the pending writes are flushed when the block exits without an error.
+    As an async context manager the flush runs in a thread, as the ORM transactions are synchronous.
+    """
+
+    def __init__(self):
+        self.__pending = {}
+        self.__hooks = []
+        self.__token = None
+
+    def register(self, instance):
+        """Queue a tracked model instance to be written on flush."""
+        self.__pending[id(instance)] = instance
+
+    def before_flush(self, hook):
+        """
+        Call hook at the start of every flush with queued instances, it may queue more of them.
+        Hooks run in reverse order of registration, so a hook added on top of another one runs first.
+        """
+        self.__hooks.append(hook)
+
+    def flush(self):
+        """Write every queued instance in one transaction."""
+        if not self.__pending:
+            return
+        for hook in reversed(self.__hooks):
+            hook()
+        pending, self.__pending = list(self.__pending.values()), {}
+        with transaction.atomic(savepoint=False):
+            for instance in pending:
+                instance.flush()
+
+    def discard(self):
+        """Forget the queued instances without writing them."""
+        self.__pending = {}
+
+    def __enter__(self):
+        self.__token = _current.set(self)
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        _current.reset(self.__token)
+        if exc_type is None:
+            self.flush()
+        else:
+            self.discard()
+
+    async def __aenter__(self):
+        return self.__enter__()
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        _current.reset(self.__token)
+        if exc_type is None:
+            await sync_to_async(self.flush)()
+        else:
+            self.discard()
+
+
+class TrackedModelMixin:
+    """
+    Model mixin remembering the loaded field values, so that saves inside a unit of work are deferred
+    and written with update_fields limited to the fields that changed. Held fields are left out of
+    those writes until they are released.
+    """
+
+    _loaded_values = None
+    _held_fields = frozenset()
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        """Remember the loaded values of the instance."""
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_values = dict(zip(field_names, values))
+        return instance
+
+    def changed_fields(self):
+        """Return names of the loaded fields whose value changed, or None when the instance was not loaded."""
+        if self._loaded_values is None:
+            return None
+        return [field.name for field in self._meta.concrete_fields
+                if field.attname in self._loaded_values
+                and getattr(self, field.attname) != self._loaded_values[field.attname]]
+
+    def save(self, *args, **kwargs):
+        """Defer a plain save of a stored instance to the running unit of work, save right away otherwise."""
+        unit_of_work = current_unit_of_work()
+        if unit_of_work is not None and not args and not kwargs and not self._state.adding:
+            unit_of_work.register(self)
+            return
+        super().save(*args, **kwargs)
+        self._remember_values()
+
+    def flush(self):
+        """Write the changed fields of the instance that are not held."""
+        fields = self.changed_fields()
+        if fields is None:
+            super().save()
+        else:
+            fields = [field for field in fields if field not in self._held_fields]
+            if fields:
+                super().save(update_fields=fields)
+        self._remember_values()
+
+    def hold_fields(self, *fields):
+        """Keep changes of fields out of the flushes, the stored values stay the loaded ones."""
+        self._held_fields = frozenset(fields)
+
+    def release_fields(self):
+        """Write the changes of the held fields again, starting with the next flush."""
+        self._held_fields = frozenset()
+
+    def refresh_stored_fields(self, *fields):
+        """Load the stored value of fields changed by a direct update, they are no longer pending for the flush."""
+        values = type(self)._base_manager.filter(pk=self.pk).values(*fields).get()
+        for field, value in values.items():
+            setattr(self, field, value)
+            if self._loaded_values is not None:
+                self._loaded_values[field] = value
+
+    async def arefresh_stored_fields(self, *fields):
+        """Load the stored value of fields with the async ORM, see refresh_stored_fields."""
+        values = await type(self)._base_manager.filter(pk=self.pk).values(*fields).aget()
+        for field, value in values.items():
+            setattr(self, field, value)
+            if self._loaded_values is not None:
+                self._loaded_values[field] = value
+
+    def _remember_values(self):
+        """Take the current field values as the stored ones, except for the held fields."""
+        stored = self._loaded_values or {}
+        self._loaded_values = {field.attname: stored[field.attname]
+                               if field.attname in self._held_fields and field.attname in stored
+                               else getattr(self, field.attname)
+                               for field in self._meta.concrete_fields}
@@ -1,6 +1,12 @@
+from django.conf import settings
 from django.urls import path
 
-from . import views
+from . import async_views, views
+
+if settings.ASYNC_DUNGEON_VIEWS:
+    dungeon, battle, hot_path = async_views.dungeon, async_views.battle, async_views
+else:
+    dungeon, battle, hot_path = views.DungeonView.as_view(), views.BattleView.as_view(), views
 
 app_name = 'qa_rpg'
 urlpatterns = [
@@ -9,15 +15,15 @@ urlpatterns = [
     path('template/choose', views.choose, name='choose'),
     path('template/summon/', views.SummonView.as_view(), name='summon'),
     path('template/summon/create', views.create, name='create'),
-    path('dungeon/', views.DungeonView.as_view(), name='dungeon'),
+    path('dungeon/', dungeon, name='dungeon'),
     path('dungeon/report_previous', views.report_previous, name='report_previous'),
-    path('dungeon/action', views.action, name='action'),
-    path('dungeon/battle', views.BattleView.as_view(), name='battle'),
-    path('dungeon/battle/item', views.item, name='item'),
-    path('dungeon/battle/check/<int:question_id>', views.check, name='check'),
-    path('dungeon/battle/run_away/<int:question_id>', views.run_away, name='run_away'),
+    path('dungeon/action', hot_path.action, name='action'),
+    path('dungeon/battle', battle, name='battle'),
+    path('dungeon/battle/item', hot_path.item, name='item'),
+    path('dungeon/battle/check/<int:question_id>', hot_path.check, name='check'),
+    path('dungeon/battle/run_away/<int:question_id>', hot_path.run_away, name='run_away'),
     path('dungeon/treasure', views.TreasureView.as_view(), name='treasure'),
-    path('dungeon/treasure/treasure_action', views.treasure_action, name='treasure_action'),
+    path('dungeon/treasure/treasure_action', hot_path.treasure_action, name='treasure_action'),
     path('shop/', views.ShopView.as_view(), name='shop'),
     path('shop/buy/', views.buy, name='buy'),
     path('profile/', views.ProfileView.as_view(), name='profile'),
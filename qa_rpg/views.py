@@ -1,21 +1,28 @@
 """Module containing view classes."""
 import random
-import difflib
 import logging
 from datetime import datetime
 from django.utils.decorators import method_decorator
 from django.views import generic
 from django.shortcuts import render, redirect
+from django.conf import settings
 from django.contrib import messages
-from django.db.models import Q
+from django.db import transaction
+from django.db.models import F
 from django.contrib.auth.mixins import LoginRequiredMixin
 
 from django.views.decorators.cache import never_cache
 
-from .models import Question, Choice, Player, Log, Inventory, ReportAndCommend
+from .models import Question, Choice, Player, Log, Inventory, ReportAndCommend, Activity, ACTIVITY_REDIRECTS, \
+    RunEventKind
 from .dialogue import Dialogue
 from .template_question import TemplateCatalog
-from .items_catalog import ItemCatalog
+from .items_catalog import ItemCatalog, NO_ITEM, apply_effect, modifies
+from .catalog import catalog
+from .loot import loot_tables
+from .question_pool import question_pool
+from .battle_card import get_battle_card, invalidate_battle_card
+from .economy import spend, claim_question_coins
 
 from django.contrib.auth import get_user_model
 User = get_user_model()
@@ -23,7 +30,6 @@ User = get_user_model()
 logging.basicConfig(filename='qa-rpg_game.log', filemode='w', level=logging.DEBUG)
 logger = logging.getLogger('game')
 
-TREASURE_AMOUNT = [15, 30, 35, 40, 45, 50, 60, 69]
 TREASURE_THRESHOLD = 0.55
 ITEM_CHANCE = 0.37
 MAX_QUESTIONS_SEEN = 50
@@ -53,70 +59,38 @@ TEXT_COLOR_CODE = {
     "item": 'text-blue-600'
 }
 MAX_AWAKEN = 3
+REPORT_LIMIT = 7
+COMMEND_WEIGHT = 0.5
+SUMMON_CHOICES = 4
+
+INDEX_ACTIVITIES = frozenset({Activity.SUMMON, Activity.INDEX, Activity.TEMPLATE,
+                              Activity.PROFILE, Activity.SHOP, Activity.SELECT_DUNGEON})
+DUNGEON_ACTIVITIES = frozenset({Activity.SELECT_DUNGEON, Activity.DUNGEON})
+ACTION_ACTIVITIES = frozenset({Activity.DUNGEON})
+TREASURE_ACTIVITIES = frozenset({Activity.DUNGEON, Activity.TREASURE})
+TREASURE_ACTION_ACTIVITIES = frozenset({Activity.TREASURE})
+BATTLE_ACTIVITIES = frozenset({Activity.BATTLE, Activity.FOUND_MONSTER})
+TEMPLATE_ACTIVITIES = frozenset({Activity.SUMMON, Activity.INDEX, Activity.TEMPLATE})
+SUMMON_ACTIVITIES = frozenset({Activity.CHOOSE, Activity.SUMMON})
+CREATE_ACTIVITIES = frozenset({Activity.SUMMON})
+PROFILE_ACTIVITIES = frozenset({Activity.INDEX, Activity.PROFILE, Activity.UPGRADE})
+SHOP_ACTIVITIES = frozenset({Activity.INDEX, Activity.SHOP, Activity.TEMPLATE})
+UPGRADE_ACTIVITIES = frozenset({Activity.PROFILE, Activity.UPGRADE, Activity.SELECT_DUNGEON})
+SELECT_ITEMS_ACTIVITIES = frozenset({Activity.INDEX, Activity.SELECT_DUNGEON})
 
 item_list = ItemCatalog()
 question_templates = TemplateCatalog()
 
 
-def get_player(user: User):
-    """
-    Check if Player of the user exists, if not create a new one.
-    :param user: logged in User
-    :return: Player object
-    """
-    try:
-        player = Player.objects.get(user=user)
-    except Player.DoesNotExist:
-        player = Player.objects.create(user=user)
-        player.save()
-    return player
-
-
-def get_log(player: Player):
-    """
-    Check if Log of the player exists, if not create a new one.
-    :param player:
-    :return: Log object
-    """
-    try:
-        log = Log.objects.get(player=player)
-    except Log.DoesNotExist:
-        log = Log.objects.create(player=player)
-        log.save()
-    return log
-
-
-def get_inventory(player: Player):
-    """
-    Check if Inventory of the player exists, if not create a new one.
-    :param player:
-    :return: Inventory object
-    """
-    try:
-        inventory = Inventory.objects.get(player=player)
-    except Inventory.DoesNotExist:
-        inventory = Inventory.objects.create(player=player)
-        inventory.update_inventory({0: 5}, "player")
-        inventory.update_templates({0: 1, 1: 1})
-        inventory.save()
-    return inventory
-
-
-def check_player_activity(player: Player, allowed_activity: list):
+def check_player_activity(player: Player, allowed_activity: frozenset):
     """
     Check player activity if the player is allowed to be in this page.
     :param player: Player
-    :param allowed_activity:
+    :param allowed_activity: activities accepted by the page
     :return: url that player should be in
     """
-    if not difflib.get_close_matches(player.activity, allowed_activity):
-        if player.activity == "found monster":
-            return "qa_rpg:battle"
-        if difflib.get_close_matches(player.activity, ["choose"]):
-            return "qa_rpg:summon"
-        if difflib.get_close_matches(player.activity, ["battle", "summon"]):
-            return f"qa_rpg:{player.activity[:6]}"
-        return f"qa_rpg:{player.activity}"
+    if player.activity_state not in allowed_activity:
+        return ACTIVITY_REDIRECTS[player.activity_state]
     return None
 
 
@@ -128,45 +102,45 @@ def get_available_template(inventory: Inventory):
     """
     available = {}
     for index, value in inventory.get_templates().items():
-        available[" ".join(question_templates.get_template(index)) + " ?"] = [index, value]
+        available[catalog.template_texts[index]] = [index, value]
     return available
 
 
-def add_reports_or_commends(request, question, log):
+def add_reports_or_commends(request, question_id, log):
     """
     Add a report or commend of the question.
     :param request: HTML request
-    :param question: question object
+    :param question_id:
     :param log: player log object
     """
     if request.POST['option'] == 'report':
-        report = ReportAndCommend.objects.create(question=question, user=request.user, vote=0)
+        report = ReportAndCommend.objects.create(question_id=question_id, user=request.user, vote=0)
         report.save()
-        log.add_report_question(question.id)
+        log.add_report_question(question_id)
     elif request.POST['option'] == 'commend':
-        commend = ReportAndCommend.objects.create(question=question, user=request.user, vote=1)
+        commend = ReportAndCommend.objects.create(question_id=question_id, user=request.user, vote=1)
         commend.save()
 
 
-def one_user_per_report(request, question, log):
+def one_user_per_report(request, question_id, log):
     """
     One player can only report or commend once.
     :param request: HTML request
-    :param question: question object
+    :param question_id:
     :param log: player log object
     """
     user = request.user
     try:
-        option_select = ReportAndCommend.objects.get(question=question, user=user)
+        option_select = ReportAndCommend.objects.get(question_id=question_id, user=user)
         if request.POST['option'] == 'report':
             option_select.vote = 0
             option_select.save()
-            log.add_report_question(question.id)
+            log.add_report_question(question_id)
         elif request.POST['option'] == 'commend':
             option_select.vote = 1
             option_select.save()
     except ReportAndCommend.DoesNotExist:
-        add_reports_or_commends(request, question, log)
+        add_reports_or_commends(request, question_id, log)
 
 
 def set_question_activation(question_id):
@@ -174,16 +148,37 @@ def set_question_activation(question_id):
     Check the question of the player whether to disable the question or not.
     :param question_id:
     """
-    question = Question.objects.get(pk=question_id)
-    report_num = question.report
-    commend_num = question.commend
-    report_score = report_num
-    commend_score = commend_num * 0.5
-    limit = 7
-    if question.owner != User.objects.get(pk="08169793-f6d3-4368-bbc6-270e37156fc6",):
-        if report_score - commend_score > limit:
-            question.enable = False
-            question.save()
+    disabled = (Question.objects.filter(pk=question_id, enable=True,
+                                        report_count__gt=F('commend_count') * COMMEND_WEIGHT + REPORT_LIMIT)
+                .exclude(owner_id=settings.SYSTEM_USER_ID)
+                .update(enable=False))
+    if disabled:
+        question_pool.discard(int(question_id))
+        invalidate_battle_card(question_id)
+
+
+def draw_question(log: Log, owner_id, report_question: set, player_question: bool = False):
+    """
+    Deal the next question of the player's deck from the question pool.
+    :param log: player Log holding the question deck
+    :param owner_id: primary key of the player's user, whose own questions are never drawn
+    :param report_question: ids of questions reported by the player
+    :param player_question: draw a random question created by another player instead
+    :return: BattleCard of the question
+    """
+    for _ in range(2):
+        question_id = None
+        if player_question:
+            unwanted_questions_id = report_question.union(int(question_id) for question_id in log.split_log("question"))
+            question_id = question_pool.sample(owner_id, unwanted_questions_id, category='player')
+        if question_id is None:
+            question_id = question_pool.deal(log, owner_id, report_question)
+            log.save()
+        try:
+            return get_battle_card(question_id)
+        except Question.DoesNotExist:
+            question_pool.invalidate()
+    raise Question.DoesNotExist("No question is available to be drawn.")
 
 
 class HomeView(generic.TemplateView):
@@ -204,22 +199,45 @@ class IndexView(LoginRequiredMixin, generic.TemplateView):
     @method_decorator(never_cache, name='self.get')
     def get(self, request):
         """Return Index page."""
-        player = get_player(request.user)
-        log, inventory = get_log(player), get_inventory(player)
+        player = request.game.player
+        log, inventory = request.game.log, request.game.inventory
 
-        check_url = check_player_activity(player=player,
-                                          allowed_activity=["summon", "index", "template",
-                                                            "profile", "shop", "select_dg"])
+        check_url = check_player_activity(player, INDEX_ACTIVITIES)
         if check_url is not None:
             return redirect(check_url)
 
-        player.set_activity("index")
+        player.set_activity(Activity.INDEX)
         player.reset_stats()
         log.clear_log()
         log.remove_question(EXIT_CHECK)
         return render(request, self.template_name, {"player": player})
 
 
+def dungeon_page(request, player: Player, log: Log):
+    """
+    Render the dungeon page, a player coming from the dungeon selection starts a run.
+    :param request: HTML request
+    :param player: Player allowed on the dungeon page
+    :param log: Log of the player
+    :return: render of the dungeon page
+    """
+    if player.activity_state == Activity.SELECT_DUNGEON:
+        logger.info(f'{str(datetime.now())}: {player.player_name}({player.pk}) has entered the dungeon')
+        log.record_event(RunEventKind.START)
+
+    if EXIT_CHECK in log.split_log("question"):
+        log.add_log(f"{TEXT_COLOR_CODE['normal']}:The coast is clear, you may now exit the dungeon.")
+
+    log_text_and_color = log.recent_logs()
+    previous_question = ""
+    if log.split_log("question"):
+        previous_question = log.split_log("question")[-1]
+    player.set_activity(Activity.DUNGEON)
+    return render(request, "qa_rpg/dungeon.html", {"logs": log_text_and_color,
+                                                   "player": player,
+                                                   "report_previous": previous_question})
+
+
 class DungeonView(LoginRequiredMixin, generic.ListView):
     """Dungeon page of application."""
 
@@ -228,36 +246,22 @@ class DungeonView(LoginRequiredMixin, generic.ListView):
     @method_decorator(never_cache, name='self.get')
     def get(self, request):
         """Return Dungeon page."""
-        player = get_player(request.user)
-        log = get_log(player)
+        player = request.game.player
+        log = request.game.log
 
-        check_url = check_player_activity(player, ["select_dg", "dungeon"])
+        check_url = check_player_activity(player, DUNGEON_ACTIVITIES)
         if check_url is not None:
             return redirect(check_url)
-
-        if player.activity == 'select_dg':
-            logger.info(f'{str(datetime.now())}: {player.player_name}({player.pk}) has entered the dungeon')
-
-        if EXIT_CHECK in log.split_log("question"):
-            log.add_log(f"{TEXT_COLOR_CODE['normal']}:The coast is clear, you may now exit the dungeon.")
-
-        log_text_and_color = [log_text.split(":") for log_text in log.split_log("text")]
-        previous_question = ""
-        if log.split_log("question"):
-            previous_question = log.split_log("question")[-1]
-        player.set_activity("dungeon")
-        return render(request, self.template_name, {"logs": log_text_and_color,
-                                                    "player": player,
-                                                    "report_previous": previous_question})
+        return dungeon_page(request, player, log)
 
 
 @never_cache
 def report_previous(request):
-    player = get_player(request.user)
-    log = get_log(player)
+    player = request.game.player
+    log = request.game.log
     question = Question.objects.get(pk=request.POST['question_id'])
 
-    one_user_per_report(request, question, log)
+    one_user_per_report(request, question.id, log)
     set_question_activation(request.POST['question_id'])
 
     previous_question = ""
@@ -267,30 +271,25 @@ def report_previous(request):
 
     logger.info(f'{str(datetime.now())}: {player.player_name}({player.pk}) reported the question id {question.pk}')
 
-    log_text_and_color = [log_text.split(":") for log_text in log.split_log("text")]
+    log_text_and_color = log.recent_logs()
     return render(request, "qa_rpg/dungeon.html", {"logs": log_text_and_color,
                                                    "player": player,
                                                    "report_previous": previous_question})
 
 
-@never_cache
-def action(request):
+def walk_or_exit(player: Player, log: Log, inventory: Inventory, player_action: str):
     """
-    Check if player found monster in walking or exiting.
-    :param request: HTML request
-    :return: redirect player to dungeon or index page
+    Resolve the player walking in the dungeon or trying to exit it, except for moving the dungeon coins.
+    :param player: Player in the dungeon
+    :param log: Log of the player
+    :param inventory: Inventory of the player
+    :param player_action: "walk" or "exit"
+    :return: name of the url to redirect to, "qa_rpg:index" once the player exited
     """
-    player = get_player(request.user)
-
-    check_url = check_player_activity(player, ["dungeon"])
-    if check_url is not None:
-        return redirect(check_url)
-
-    log, inventory = get_log(player), get_inventory(player)
     event = random.random()
-    player_action = request.POST['action']
 
     if player_action == "walk":
+        log.record_event(RunEventKind.WALK)
 
         if EXIT_CHECK in log.split_log("question"):
             log.remove_question(EXIT_CHECK)
@@ -298,33 +297,52 @@ def action(request):
         if player.luck >= TREASURE_THRESHOLD and event <= (player.luck - TREASURE_THRESHOLD):
             log.add_log(f"{TEXT_COLOR_CODE['coin']}:You found a treasure chest.")
             player.update_player_stats(luck=-(player.luck - TREASURE_THRESHOLD))
-            player.set_activity("treasure")
-            return redirect("qa_rpg:treasure")
+            player.set_activity(Activity.TREASURE)
+            return "qa_rpg:treasure"
 
         if event <= player.luck:
             log.add_log(f"{TEXT_COLOR_CODE['normal']}:" + Dialogue.MONSTER.get_text+Dialogue.BATTLE_DIALOGUE.get_text)
-            player.set_activity("found monster")
-            return redirect("qa_rpg:battle")
+            player.set_activity(Activity.FOUND_MONSTER)
+            return "qa_rpg:battle"
 
         log.add_log(f"{TEXT_COLOR_CODE['normal']}:" + Dialogue.WALK_DIALOGUE.get_text)
         player.update_player_stats(luck=0.02)
-        return redirect("qa_rpg:dungeon")
+        return "qa_rpg:dungeon"
 
-    else:
-        if event <= 0.5 and EXIT_CHECK not in log.split_log("question"):
-            log.add_log(f"{TEXT_COLOR_CODE['normal']}:A " +
-                        Dialogue.MONSTER.get_text + " is blocking the dungeon exit.")
-            log.add_question(EXIT_CHECK)
-            player.set_activity("found monster")
-            return redirect("qa_rpg:battle")
+    if event <= 0.5 and EXIT_CHECK not in log.split_log("question"):
+        log.add_log(f"{TEXT_COLOR_CODE['normal']}:A " +
+                    Dialogue.MONSTER.get_text + " is blocking the dungeon exit.")
+        log.add_question(EXIT_CHECK)
+        player.set_activity(Activity.FOUND_MONSTER)
+        return "qa_rpg:battle"
 
-        player.set_activity("index")
+    log.record_event(RunEventKind.EXIT)
+    player.set_activity(Activity.INDEX)
+
+    logger.info(f'{str(datetime.now())}: {player.player_name}({player.pk}) has exited the dungeon')
+
+    inventory.reset_inventory()
+    return "qa_rpg:index"
+
+
+@never_cache
+def action(request):
+    """
+    Check if player found monster in walking or exiting.
+    :param request: HTML request
+    :return: redirect player to dungeon or index page
+    """
+    player = request.game.player
 
-        logger.info(f'{str(datetime.now())}: {player.player_name}({player.pk}) has exited the dungeon')
+    check_url = check_player_activity(player, ACTION_ACTIVITIES)
+    if check_url is not None:
+        return redirect(check_url)
 
+    log, inventory = request.game.log, request.game.inventory
+    url = walk_or_exit(player, log, inventory, request.POST['action'])
+    if url == "qa_rpg:index":
         player.add_dungeon_currency()
-        inventory.reset_inventory()
-        return redirect("qa_rpg:index")
+    return redirect(url)
 
 
 class TreasureView(LoginRequiredMixin, generic.DetailView):
@@ -334,37 +352,35 @@ class TreasureView(LoginRequiredMixin, generic.DetailView):
     @method_decorator(never_cache, name='self.get')
     def get(self, request):
         """Return Treasure page."""
-        player = get_player(request.user)
+        player = request.game.player
 
-        check_url = check_player_activity(player, ["dungeon", "treasure"])
+        check_url = check_player_activity(player, TREASURE_ACTIVITIES)
         if check_url is not None:
             return redirect(check_url)
 
-        player.set_activity(f"treasure")
+        player.set_activity(Activity.TREASURE)
         return render(request, self.template_name, {"player": player})
 
 
-@never_cache
-def treasure_action(request):
+def open_treasure(request, player: Player, log: Log, inventory: Inventory):
     """
-    Check if the player Choose between pick up item from treasure or walk away.
+    Resolve the player picking up the treasure chest or walking away from it.
     :param request: HTML request
-    :return: redirect to dungeon page
+    :param player: Player in front of the treasure chest
+    :param log: Log of the player
+    :param inventory: Inventory of the player
+    :return: redirect to dungeon page, or render of index page when the player died
     """
-    player = get_player(request.user)
-    log, inventory = get_log(player), get_inventory(player)
     event = random.random()
-
-    check_url = check_player_activity(player, ["treasure"])
-    if check_url is not None:
-        return redirect(check_url)
-    player.set_activity("dungeon")
+    player.set_activity(Activity.DUNGEON)
 
     if request.POST['action'] != "pick up":
+        log.record_event(RunEventKind.TREASURE)
         log.add_log(f"{TEXT_COLOR_CODE['normal']}:You walk away from the treasure chest.")
 
     elif (player.luck * ITEM_CHANCE) >= event:
-        item_id = random.choice(item_list.get_chest_items())
+        item_id = loot_tables.draw("chest")
+        log.record_event(RunEventKind.TREASURE, item_id=item_id)
         random_item = item_list.get_item(item_id)
         log.add_log(f"{TEXT_COLOR_CODE['item']}:You got the item '{str(random_item)}' from the chest !")
         dungeon_inventory = inventory.get_inventory("dungeon")
@@ -375,11 +391,13 @@ def treasure_action(request):
         inventory.update_inventory(dungeon_inventory, "dungeon")
 
     elif player.luck >= event:
-        coin_amount = random.choice(TREASURE_AMOUNT)
+        log.record_event(RunEventKind.TREASURE)
+        coin_amount = loot_tables.draw("treasure_coins")
         log.add_log(f"{TEXT_COLOR_CODE['coin']}:You found {coin_amount} coins in treasure chest.")
         player.update_player_stats(dungeon_currency=coin_amount)
 
     else:
+        log.record_event(RunEventKind.TREASURE)
         damages = random.randint(1, 10)
         player.update_player_stats(health=-damages)
 
@@ -393,6 +411,64 @@ def treasure_action(request):
     return redirect("qa_rpg:dungeon")
 
 
+@never_cache
+def treasure_action(request):
+    """
+    Check if the player Choose between pick up item from treasure or walk away.
+    :param request: HTML request
+    :return: redirect to dungeon page
+    """
+    player = request.game.player
+    log, inventory = request.game.log, request.game.inventory
+
+    check_url = check_player_activity(player, TREASURE_ACTION_ACTIVITIES)
+    if check_url is not None:
+        return redirect(check_url)
+    return open_treasure(request, player, log, inventory)
+
+
+def encounter(log: Log, owner_id):
+    """
+    Draw the monster the player encounters, and record it in the log.
+    :param log: Log of the player
+    :param owner_id: primary key of the player's user
+    :return: BattleCard of the question
+    """
+    seen_question = log.split_log("question")
+    report_question = {int(question_id) for question_id in log.split_log("report")}
+
+    amount_seen = len(seen_question)
+    if amount_seen > MAX_QUESTIONS_SEEN:
+        log.clear_question()
+
+    question = draw_question(log, owner_id, report_question,
+                             player_question=(amount_seen % 10) == 0 and amount_seen != 0)
+    log.add_question(question.id)
+    log.record_event(RunEventKind.ENCOUNTER, question_id=question.id)
+    return question
+
+
+def battle_page(request, question, player: Player, inventory: Inventory):
+    """
+    Render the battle page with the dungeon items and the item in use.
+    :param request: HTML request
+    :param question: BattleCard of the monster
+    :param player: Player in battle
+    :param inventory: Inventory of the player
+    :return: render of the battle page
+    """
+    items = {}
+    for key, value in inventory.get_inventory("dungeon").items():
+        player_item = item_list.get_item(key)
+        items[str(player_item)] = [key, value, player_item.description, player_item.effect]
+    status = ""
+    if player.status != "":
+        status = str(item_list.get_item(int(player.status)))
+    return render(request, "qa_rpg/battle.html", {"question": question, "player": player,
+                                                  "items": items,
+                                                  "status": status})
+
+
 class BattleView(LoginRequiredMixin, generic.DetailView):
     """Battle page of application."""
     template_name = 'battle.html'
@@ -400,70 +476,34 @@ class BattleView(LoginRequiredMixin, generic.DetailView):
     @method_decorator(never_cache, name='self.get')
     def get(self, request):
         """Return Battle page."""
-        player = get_player(request.user)
-        log, inventory = get_log(player), get_inventory(player)
+        player = request.game.player
+        log, inventory = request.game.log, request.game.inventory
 
-        check_url = check_player_activity(player, ["battle", "found monster"])
+        check_url = check_player_activity(player, BATTLE_ACTIVITIES)
         if check_url is not None:
             return redirect(check_url)
 
-        if difflib.get_close_matches(player.activity, ["battle"]):
-            question_id = int(player.activity[6:])
+        if player.activity_state == Activity.BATTLE and player.battle_question_id is not None:
+            question = get_battle_card(player.battle_question_id)
         else:
-            seen_question = log.split_log("question")
-            report_question = log.split_log("report")
-            unwanted_questions_id = seen_question + report_question
+            question = encounter(log, request.user.pk)
+        player.set_activity(Activity.BATTLE, question_id=question.id)
+        return battle_page(request, question, player, inventory)
 
-            unwanted_queryset = Question.objects.exclude(id__in=unwanted_questions_id)
-            unseen_player_questions = unwanted_queryset.filter(~Q(owner=request.user),
-                                                               category='player',
-                                                               enable=True).values_list("id", flat=True)
 
-            amount_seen = len(seen_question)
-            if amount_seen > MAX_QUESTIONS_SEEN:
-                log.clear_question()
-
-            if ((amount_seen % 10) != 0) or amount_seen == 0 or len(unseen_player_questions) == 0:
-                question_id = random.choice(unwanted_queryset.filter(~Q(owner=request.user),
-                                                                     enable=True).values_list('id', flat=True))
-
-            else:
-                question_id = random.choice(unseen_player_questions)
-
-            log.add_question(question_id)
-
-        question = Question.objects.get(pk=question_id)
-        player.set_activity(f"battle{question_id}")
-        items = {}
-        for key, value in inventory.get_inventory("dungeon").items():
-            player_item = item_list.get_item(key)
-            items[str(player_item)] = [key, value, player_item.description, player_item.effect]
-        status = ""
-        if player.status != "":
-            status += str(item_list.get_item(int(player.status)))
-        return render(request, "qa_rpg/battle.html", {"question": question, "player": player,
-                                                      "items": items,
-                                                      "status": status})
-
-
-@never_cache
-def item(request):
+def use_item(request, index: int, player: Player, log: Log, inventory: Inventory):
     """
-    Check the items that the player chooses to use.
+    Apply the item used by the player in battle.
     :param request: HTML request
-    :return: redirect player to battle page
+    :param index: id of the item
+    :param player: Player in battle
+    :param log: Log of the player
+    :param inventory: Inventory of the player
+    :return: redirect player to battle page, or to index page when the item killed them
     """
-    try:
-        index = int(request.POST['item'])
-    except KeyError:
-        messages.error(request, "You need to select an item to use.")
-        return redirect("qa_rpg:battle")
-
-    player = get_player(request.user)
-    log, inventory = get_log(player), get_inventory(player)
-
     if player.status != "":
         return redirect("qa_rpg:battle")
+    log.record_event(RunEventKind.ITEM, item_id=index)
 
     player.status = str(index)
     player.save()
@@ -474,7 +514,7 @@ def item(request):
     inventory.update_inventory(dungeon_inventory, "dungeon")
     log.add_log(f"{TEXT_COLOR_CODE['normal']}:You used an item: " + str(used_item) + " !")
 
-    health_add = used_item.health_modifier(player.max_hp)
+    health_add = apply_effect(index, "health", player.max_hp)
     player.update_player_stats(health=health_add)
     if health_add > 0:
         log.add_log(f"{TEXT_COLOR_CODE['heal']}:You healed {health_add} health points.")
@@ -489,138 +529,182 @@ def item(request):
 
 
 @never_cache
-def check(request, question_id):
+def item(request):
     """
-    Checks the player's answer and checks the results of the item used by the player.
+    Check the items that the player chooses to use.
     :param request: HTML request
-    :param question_id:
-    :return: redirect player to right page
+    :return: redirect player to battle page
     """
-    question = Question.objects.get(pk=question_id)
-    player = get_player(request.user)
-    if player.activity != f"battle{question_id}":
-        return redirect("qa_rpg:dungeon")
-    log, inventory = get_log(player), get_inventory(player)
-
-    one_user_per_report(request, question, log)
-
-    if request.POST['option'] in ['report', 'commend']:
-        logger.info(f'{str(datetime.now())}: {player.player_name}({player.pk}) has {request.POST["option"]}ed the '
-                    f'question({question.pk})')
-
-    set_question_activation(question_id)
-
     try:
-        check_choice = Choice.objects.get(pk=request.POST['choice'])
+        index = int(request.POST['item'])
     except KeyError:
-        messages.error(request, "You didn't select a attack move.")
+        messages.error(request, "You need to select an item to use.")
         return redirect("qa_rpg:battle")
+    return use_item(request, index, request.game.player, request.game.log, request.game.inventory)
 
-    player.set_activity("dungeon")
 
-    if player.status == "":
-        applied_item = item_list.get_item(999)
+def reward(request, question, player: Player, log: Log, applied_id: int):
+    """
+    Give the player the loot or the coins of a defeated monster, with the effect of the item in use.
+    :param request: HTML request
+    :param question: BattleCard of the defeated monster
+    :param player: Player who answered correctly
+    :param log: Log of the player
+    :param applied_id: id of the item in use, NO_ITEM without one
+    """
+    chance = 0.23
+    if (modifies(applied_id, "item") or chance >= random.random()) and not modifies(applied_id, "coin"):
+        item_id = loot_tables.draw("cursed")
+        random_item = item_list.get_item(item_id)
+        inventory = request.game.inventory
+        dungeon_inventory = inventory.get_inventory("dungeon")
+        amount = 1 + apply_effect(applied_id, "item", 1)
+        try:
+            dungeon_inventory[item_id] += amount
+        except KeyError:
+            dungeon_inventory[item_id] = amount
+        log.add_log(f"{TEXT_COLOR_CODE['item']}:You loot the {amount} "
+                    f"'{str(random_item)}(s)' from the monster's corpse !")
+        inventory.update_inventory(dungeon_inventory, "dungeon")
     else:
-        applied_item = item_list.get_item(int(player.status))
-    player.status = ""
-    player.save()
-
-    if check_choice.correct_answer:
-        log.add_log(f"{TEXT_COLOR_CODE['normal']}:" + Dialogue.WIN_DIALOGUE.get_text)
-        chance = 0.23
-        if (applied_item.item_modifier(1) != 0 or chance >= random.random()) and not applied_item.coin_modifier(100):
-            item_id = random.choice(item_list.get_cursed_items())
-            random_item = item_list.get_item(item_id)
-            dungeon_inventory = inventory.get_inventory("dungeon")
-            amount = 1 + applied_item.item_modifier(1)
-            try:
-                dungeon_inventory[item_id] += amount
-            except KeyError:
-                dungeon_inventory[item_id] = amount
-            log.add_log(f"{TEXT_COLOR_CODE['item']}:You loot the {amount} "
-                        f"'{str(random_item)}(s)' from the monster's corpse !")
-            inventory.update_inventory(dungeon_inventory, "dungeon")
+        earn_coins = get_coins(question.damage)
+        bonus = apply_effect(applied_id, "coin", earn_coins)
+        earn_coins += bonus
+        if bonus > 0:
+            log.add_log(f"{TEXT_COLOR_CODE['coin']}:You earn {earn_coins} coins ({bonus} bonus coins).")
         else:
-            earn_coins = get_coins(question.damage)
-            bonus = applied_item.coin_modifier(earn_coins)
-            earn_coins += bonus
-            if bonus > 0:
-                log.add_log(f"{TEXT_COLOR_CODE['coin']}:You earn {earn_coins} coins ({bonus} bonus coins).")
-            else:
-                log.add_log(f"{TEXT_COLOR_CODE['coin']}:You earn {earn_coins} coins.")
-            player.update_player_stats(dungeon_currency=earn_coins, luck=0.03)
+            log.add_log(f"{TEXT_COLOR_CODE['coin']}:You earn {earn_coins} coins.")
+        player.update_player_stats(dungeon_currency=earn_coins, luck=0.03)
 
-    else:
-        log.add_log(f"{TEXT_COLOR_CODE['normal']}:" + Dialogue.LOSE_DIALOGUE.get_text)
-        nullified = applied_item.damage_modifier(question.damage)
-        if nullified > 0:
-            log.add_log(f"{TEXT_COLOR_CODE['heal']}:{nullified} damage from monster was blocked by your item.")
-        elif nullified < 0:
-            log.add_log(f"{TEXT_COLOR_CODE['damage']}:{-nullified} damage suffered from cursed item.")
-        player.update_player_stats(health=-(question.damage - nullified))
-        question.add_coin()
-        if player.check_death():
-            messages.error(request, "You lost consciousness in the dungeons.")
 
-            logger.info(f'{str(datetime.now())}: {player.player_name}({player.pk}) has exited via losing consciousness')
+def answer(request, question, player: Player, log: Log):
+    """
+    Check the player's answer and the results of the item used by the player, except for counting the fail.
+    :param request: HTML request
+    :param question: BattleCard of the monster
+    :param player: Player in battle with the question
+    :param log: Log of the player
+    :return: redirect player to right page, and whether the player failed the question
+    """
+    try:
+        check_choice = int(request.POST['choice'])
+    except (KeyError, ValueError):
+        messages.error(request, "You didn't select a attack move.")
+        return redirect("qa_rpg:battle"), False
+    if not question.has_choice(check_choice):
+        messages.error(request, "That attack move does not belong to this monster.")
+        return redirect("qa_rpg:battle"), False
+    log.record_event(RunEventKind.CORRECT if question.is_correct(check_choice) else RunEventKind.WRONG,
+                     question_id=question.id)
+
+    applied_id = NO_ITEM if player.status == "" else int(player.status)
+    player.status = ""
+    player.set_activity(Activity.DUNGEON)
 
-            return redirect("qa_rpg:index")
+    if question.is_correct(check_choice):
+        log.add_log(f"{TEXT_COLOR_CODE['normal']}:" + Dialogue.WIN_DIALOGUE.get_text)
+        reward(request, question, player, log, applied_id)
+        return redirect("qa_rpg:dungeon"), False
+
+    log.add_log(f"{TEXT_COLOR_CODE['normal']}:" + Dialogue.LOSE_DIALOGUE.get_text)
+    nullified = apply_effect(applied_id, "damage", question.damage)
+    if nullified > 0:
+        log.add_log(f"{TEXT_COLOR_CODE['heal']}:{nullified} damage from monster was blocked by your item.")
+    elif nullified < 0:
+        log.add_log(f"{TEXT_COLOR_CODE['damage']}:{-nullified} damage suffered from cursed item.")
+    player.update_player_stats(health=-(question.damage - nullified))
+    if player.check_death():
+        messages.error(request, "You lost consciousness in the dungeons.")
 
-        log.add_log(f"{TEXT_COLOR_CODE['damage']}:You lose {question.damage - nullified} health points.")
+        logger.info(f'{str(datetime.now())}: {player.player_name}({player.pk}) has exited via losing consciousness')
 
-    return redirect("qa_rpg:dungeon")
+        return redirect("qa_rpg:index"), True
+
+    log.add_log(f"{TEXT_COLOR_CODE['damage']}:You lose {question.damage - nullified} health points.")
+    return redirect("qa_rpg:dungeon"), True
 
 
 @never_cache
-def run_away(request, question_id):
+def check(request, question_id):
     """
-    Randomize whether the player can escape from the question or not.
+    Checks the player's answer and checks the results of the item used by the player.
     :param request: HTML request
     :param question_id:
-    :return: render or redirect player to battle or dungeon page
+    :return: redirect player to right page
     """
-    question = Question.objects.get(pk=question_id)
-    player = get_player(request.user)
-    log, inventory = get_log(player), get_inventory(player)
-
-    if player.activity != f"battle{question_id}":
+    question = get_battle_card(question_id)
+    player = request.game.player
+    if not player.in_battle(question_id):
         return redirect("qa_rpg:dungeon")
+    log = request.game.log
 
-    one_user_per_report(request, question, log)
-    set_question_activation(question_id)
+    if request.POST.get('option') in ['report', 'commend']:
+        one_user_per_report(request, question_id, log)
+        logger.info(f'{str(datetime.now())}: {player.player_name}({player.pk}) has {request.POST["option"]}ed the '
+                    f'question({question.id})')
+        if request.POST['option'] == 'report':
+            set_question_activation(question_id)
 
-    if player.status == "":
-        applied_item = item_list.get_item(999)
-    else:
-        applied_item = item_list.get_item(int(player.status))
+    response, failed = answer(request, question, player, log)
+    if failed:
+        Question.record_fail(question_id)
+    return response
+
+
+def flee(request, question, player: Player, log: Log, inventory: Inventory):
+    """
+    Randomize whether the player escapes from the question, except for counting the fail.
+    :param request: HTML request
+    :param question: BattleCard of the monster
+    :param player: Player in battle with the question
+    :param log: Log of the player
+    :param inventory: Inventory of the player
+    :return: render or redirect player to battle or dungeon page, and whether the player failed the question
+    """
+    applied_id = NO_ITEM if player.status == "" else int(player.status)
     player.status = ""
     player.save()
+    escape = apply_effect(applied_id, "escape", player.luck)
 
-    if random.random() >= player.luck - applied_item.escape_modifier(player.luck):
+    if random.random() >= player.luck - escape:
         log.add_log(f"{TEXT_COLOR_CODE['normal']}:" + Dialogue.RUN_DIALOGUE.get_text)
-        player.set_activity("dungeon")
-        return redirect("qa_rpg:dungeon")
+        player.set_activity(Activity.DUNGEON)
+        return redirect("qa_rpg:dungeon"), False
 
     run_fail = Dialogue.RUN_FAIL_DIALOGUE.get_text
     log.add_log(f"{TEXT_COLOR_CODE['damage']}:" + run_fail)
-    player.update_player_stats(health=-(question.damage - applied_item.damage_modifier(question.damage)))
-    question.add_coin()
+    player.update_player_stats(health=-(question.damage - apply_effect(applied_id, "damage", question.damage)))
     if player.check_death():
         messages.error(request, "You lost consciousness in the dungeons.")
-        return redirect("qa_rpg:index")
+        return redirect("qa_rpg:index"), True
 
     messages.error(request, run_fail)
-    items = {}
-    for key, value in inventory.get_inventory("dungeon").items():
-        player_item = item_list.get_item(key)
-        items[str(player_item)] = [key, value, player_item.description, player_item.effect]
-    if player.status == "":
-        status = ""
-    else:
-        status = str(item_list.get_item(int(player.status)))
-    return render(request,
-                  'qa_rpg/battle.html',
-                  {'question': question, 'player': player, "status": status, "items": items})
+    return battle_page(request, question, player, inventory), True
+
+
+@never_cache
+def run_away(request, question_id):
+    """
+    Randomize whether the player can escape from the question or not.
+    :param request: HTML request
+    :param question_id:
+    :return: render or redirect player to battle or dungeon page
+    """
+    question = get_battle_card(question_id)
+    player = request.game.player
+    log, inventory = request.game.log, request.game.inventory
+
+    if not player.in_battle(question_id):
+        return redirect("qa_rpg:dungeon")
+    log.record_event(RunEventKind.FLEE, question_id=question_id)
+
+    one_user_per_report(request, question_id, log)
+    set_question_activation(question_id)
+
+    response, failed = flee(request, question, player, log, inventory)
+    if failed:
+        Question.record_fail(question_id)
+    return response
 
 
 def get_coins(damage: int):
@@ -639,11 +723,10 @@ def get_coins(damage: int):
 
 @never_cache
 def report_commend(request):
-    player = get_player(request.user)
-    log = get_log(player)
+    log = request.game.log
     question = Question.objects.get(pk=request.POST['question_id'])
 
-    one_user_per_report(request, question, log)
+    one_user_per_report(request, question.id, log)
     set_question_activation(request.POST['question_id'])
 
     messages.success(request, f"Successfully {request.POST['option']}ed the question.")
@@ -657,16 +740,16 @@ class TemplateChooseView(LoginRequiredMixin, generic.DetailView):
     @method_decorator(never_cache, name='self.get')
     def get(self, request):
         """Return Template choose page."""
-        player = get_player(request.user)
-        inventory = get_inventory(player)
+        player = request.game.player
+        inventory = request.game.inventory
 
-        check_url = check_player_activity(player, ["summon", "index", "template"])
+        check_url = check_player_activity(player, TEMPLATE_ACTIVITIES)
         if check_url is not None:
             return redirect(check_url)
 
         available = get_available_template(inventory)
 
-        player.set_activity("template")
+        player.set_activity(Activity.TEMPLATE)
         return render(request, self.template_name, {"selection": available})
 
 
@@ -677,8 +760,8 @@ def choose(request):
     :param request: HTML request
     :return: redirect to summon page
     """
-    player = get_player(request.user)
-    player.set_activity(f"choose{request.GET['index']}")
+    player = request.game.player
+    player.set_activity(Activity.CHOOSE, template=int(request.GET['index']))
     return redirect("qa_rpg:summon")
 
 
@@ -689,17 +772,17 @@ class SummonView(LoginRequiredMixin, generic.DetailView):
     @method_decorator(never_cache, name='self.get')
     def get(self, request):
         """Return Summon page."""
-        player = get_player(request.user)
+        player = request.game.player
 
-        check_url = check_player_activity(player, ["choose", "summon", "template"])
+        check_url = check_player_activity(player, SUMMON_ACTIVITIES)
         if check_url is not None:
             return redirect(check_url)
 
-        if difflib.get_close_matches(player.activity, ['choose']):
-            template_index = int(player.activity[6:])
-            player.set_activity(f"summon4 {template_index}")
-        else:
-            template_index = int(player.activity.split(" ")[1])
+        template_index = player.summon_template
+        if template_index is None:
+            return redirect("qa_rpg:template")
+        if player.activity_state == Activity.CHOOSE:
+            player.set_activity(Activity.SUMMON, template=template_index, choices=SUMMON_CHOICES)
         return render(request, "qa_rpg/summon.html",
                       {"question": question_templates.get_template(template_index),
                        "id": template_index,
@@ -708,6 +791,20 @@ class SummonView(LoginRequiredMixin, generic.DetailView):
                        "player": player})
 
 
+def owned_template(request, owned: dict):
+    """
+    Return the id of the template posted to summon a monster if the player owns it.
+    :param request: HTML request
+    :param owned: templates of the player with their amounts
+    :return: template id or None if the player does not own the template
+    """
+    try:
+        template_id = int(request.POST["template_id"])
+    except (KeyError, ValueError):
+        return None
+    return template_id if owned.get(template_id, 0) > 0 else None
+
+
 @never_cache
 def create(request):
     """
@@ -715,10 +812,10 @@ def create(request):
     :param request: HTML select
     :return: redirect to index page if create success but if it fails to create redirect to summon page
     """
-    player = get_player(request.user)
-    inventory = get_inventory(player)
+    player = request.game.player
+    inventory = request.game.inventory
 
-    check_url = check_player_activity(player, ["summon"])
+    check_url = check_player_activity(player, CREATE_ACTIVITIES)
     if check_url is not None:
         return redirect(check_url)
 
@@ -728,13 +825,13 @@ def create(request):
         return redirect("qa_rpg:summon")
 
     try:
-        for num in range(int(player.activity.split(" ")[0][6:])):
+        for num in range(player.summon_choices or SUMMON_CHOICES):
             if len(request.POST[f'choice{num}']) > 75:
                 messages.error(request, "Your choices can not be over 75 characters.")
                 return redirect("qa_rpg:summon")
 
         question_text = ''
-        if int(player.activity.split(" ")[1]) >= 100:
+        if player.summon_template >= 100:
             question_text += request.POST['question0']
             question_text += request.POST['question1']
         else:
@@ -744,7 +841,7 @@ def create(request):
             question_text += "?"
         choices = []
         correct_index = int(request.POST['index'])
-        for num in range(int(player.activity.split(" ")[0][6:])):
+        for num in range(player.summon_choices or SUMMON_CHOICES):
             if num == correct_index:
                 choices.append([request.POST[f'choice{num}'], True])
             else:
@@ -753,25 +850,34 @@ def create(request):
         messages.error(request, "Please fill in every field and select a correct answer.")
         return redirect("qa_rpg:summon")
 
-    question = Question(question_text=question_text,
-                        owner=request.user,
-                        category="player",
-                        max_currency=player.question_max_currency,
-                        rate=player.question_rate_currency)
-    question.save()
-    for choice in choices:
-        choice = Choice(choice_text=choice[0],
-                        correct_answer=choice[1],
-                        question=question)
-        choice.save()
-    player.set_activity("index")
+    # The template is checked before the coins are taken, as the spend is written at once.
+    owned = inventory.get_templates()
+    template_id = owned_template(request, owned)
+    if template_id is None:
+        messages.error(request, "You don't own this template.")
+        return redirect("qa_rpg:summon")
+
+    with transaction.atomic():
+        if not spend(player, summon_fee):
+            messages.error(request, "You don't have enough coins to summon a monster.")
+            return redirect("qa_rpg:summon")
+        question = Question(question_text=question_text,
+                            owner=request.user,
+                            category="player",
+                            max_currency=player.question_max_currency,
+                            rate=player.question_rate_currency)
+        question.save()
+        for choice in choices:
+            choice = Choice(choice_text=choice[0],
+                            correct_answer=choice[1],
+                            question=question)
+            choice.save()
+    player.set_activity(Activity.INDEX)
     messages.success(request, "Successfully summoned a new monster.")
 
     logger.info(f'{str(datetime.now())}: {player.player_name}({player.pk}) has created the question({question.pk})')
 
-    player.currency -= summon_fee
-    owned = inventory.get_templates()
-    owned[int(request.POST["template_id"])] -= 1
+    owned[template_id] -= 1
     inventory.update_templates(owned)
     player.save()
     return redirect('qa_rpg:index')
@@ -784,11 +890,11 @@ class ProfileView(LoginRequiredMixin, generic.TemplateView):
     @method_decorator(never_cache, name='self.get')
     def get(self, request):
         """Return Profile page."""
-        player = get_player(request.user)
-        inventory = get_inventory(player)
-        questions = Question.objects.filter(owner=player.user)
+        player = request.game.player
+        inventory = request.game.inventory
+        questions = Question.objects.filter(owner=player.user).select_related('fail_counter')
 
-        check_url = check_player_activity(player, ["index", "profile", "upgrade"])
+        check_url = check_player_activity(player, PROFILE_ACTIVITIES)
         if check_url is not None:
             return redirect(check_url)
 
@@ -798,7 +904,7 @@ class ProfileView(LoginRequiredMixin, generic.TemplateView):
             player_inventory.append([str(player_item), val, player_item.description, player_item.effect])
 
         check_items = True
-        player.set_activity("profile")
+        player.set_activity(Activity.PROFILE)
         return render(request, self.template_name, {"player": player, "questions": questions,
                                                     "inventory": player_inventory, "check": check_items})
 
@@ -811,13 +917,8 @@ def claim_coin(request, question_id):
     :param question_id:
     :return: redirect to profile page
     """
-    player = get_player(request.user)
-    questions = Question.objects.get(pk=question_id)
-
-    player.currency += questions.currency
-    questions.currency = 0
-    player.save()
-    questions.save()
+    player = request.game.player
+    claim_question_coins(player, question_id)
     return redirect('qa_rpg:profile')
 
 
@@ -831,9 +932,9 @@ def select(request):
     if request.POST["select"] == "template":
         template_name = 'qa_rpg/profile.html'
 
-        player = get_player(request.user)
-        inventory = get_inventory(player)
-        questions = Question.objects.filter(owner=player.user)
+        player = request.game.player
+        inventory = request.game.inventory
+        questions = Question.objects.filter(owner=player.user).select_related('fail_counter')
         template = get_available_template(inventory)
 
         check_items = False
@@ -850,21 +951,15 @@ class ShopView(LoginRequiredMixin, generic.DetailView):
     @method_decorator(never_cache, name='self.get')
     def get(self, request):
         """Return Shop page."""
-        player = get_player(request.user)
+        player = request.game.player
 
-        check_url = check_player_activity(player, ["index", "shop", "template"])
+        check_url = check_player_activity(player, SHOP_ACTIVITIES)
         if check_url is not None:
             return redirect(check_url)
 
-        items = item_list.get_store_items()
-
-        template = {}
-        for index in question_templates.get_all_templates().keys():
-            template[" ".join(question_templates.get_template(index)) + " ?"] = [
-                question_templates.get_price(index), index]
-
-        player.set_activity("shop")
-        return render(request, self.template_name, {"player": player, "template": template, "items": items})
+        player.set_activity(Activity.SHOP)
+        return render(request, self.template_name, {"player": player, "template": catalog.shop_templates,
+                                                    "items": catalog.store_items})
 
 
 @never_cache
@@ -874,44 +969,31 @@ def buy(request):
     :param request:
     :return:
     """
-    player = get_player(request.user)
-    inventory = get_inventory(player)
+    player = request.game.player
+    inventory = request.game.inventory
 
     player_template = inventory.get_templates()
     player_item = inventory.get_inventory("player")
     amount = int(request.POST["amount"])
     try:
         template = int(request.POST["index"])
-        price = question_templates.get_price(template)
-        if price * amount >= player.currency:
-            messages.error(request, "You don't have enough coins to purchase.")
-            logger.info(f'{str(datetime.now())}: {player.player_name}({player.pk}) attempted purchase '
-                        f'with insufficient coins')
-            return redirect("qa_rpg:shop")
-
-        try:
-            player_template[template] += amount
-        except KeyError:
-            player_template[template] = amount
-        inventory.update_templates(player_template)
-        player.currency -= price * amount
-        player.save()
-
+        cost = catalog.template_prices[template] * amount
     except ValueError:
-        items = request.POST["index"][1:-1].split(",")
-        if int(items[1]) * amount > player.currency:
-            messages.error(request, "You don't have enough coins to purchase.")
-            logger.info(f'{str(datetime.now())}: {player.player_name}({player.pk}) attempted purchase '
-                        f'with insufficient coins')
-            return redirect("qa_rpg:shop")
+        item_id = int(request.POST["index"][1:-1].split(",")[0])
+        template, cost = None, catalog.item_prices[item_id] * amount
 
-        try:
-            player_item[int(items[0])] += amount
-        except KeyError:
-            player_item[int(items[0])] = amount
+    if amount < 1 or not spend(player, cost):
+        messages.error(request, "You don't have enough coins to purchase.")
+        logger.info(f'{str(datetime.now())}: {player.player_name}({player.pk}) attempted purchase '
+                    f'with insufficient coins')
+        return redirect("qa_rpg:shop")
+
+    if template is not None:
+        player_template[template] = player_template.get(template, 0) + amount
+        inventory.update_templates(player_template)
+    else:
+        player_item[item_id] = player_item.get(item_id, 0) + amount
         inventory.update_inventory(player_item, "player")
-        player.currency -= int(items[1]) * amount
-        player.save()
 
     messages.success(request, "Purchase Successful.")
     logger.info(f'{str(datetime.now())}: {player.player_name}({player.pk}) has purchased an item from the shop')
@@ -925,9 +1007,9 @@ class UpgradeView(LoginRequiredMixin, generic.DetailView):
     @method_decorator(never_cache, name='self.get')
     def get(self, request):
         """Return Upgrade page."""
-        player = get_player(request.user)
+        player = request.game.player
 
-        check_url = check_player_activity(player, ["profile", "upgrade", "select_dg"])
+        check_url = check_player_activity(player, UPGRADE_ACTIVITIES)
         if check_url is not None:
             return redirect(check_url)
 
@@ -947,7 +1029,7 @@ class UpgradeView(LoginRequiredMixin, generic.DetailView):
 
         awaken_rate = (0.5 - (0.1 * player.awake)) * 100
 
-        player.set_activity("upgrade")
+        player.set_activity(Activity.UPGRADE)
         return render(request, self.template_name, {"player": player, "price": price,
                                                     "upgrade_list": upgrade_list,
                                                     "upgrade_check": upgrade_check,
@@ -961,11 +1043,9 @@ def upgrade(request):
     :param request:
     :return:
     """
-    player = get_player(request.user)
-    player_question = Question.objects.filter(owner=request.user)
+    player = request.game.player
     price = int(request.POST["price"])
-    if player.currency >= price:
-        player.currency -= price
+    if spend(player, price):
         if request.POST["upgrade"] == "max_hp":
             if player.max_hp + UPGRADE["max_hp"] <= UPGRADE_BASE["max_hp"] + (UPGRADE_RATE["max_hp"] * (player.awake + 1)):
                 player.max_hp += UPGRADE["max_hp"]
@@ -978,10 +1058,9 @@ def upgrade(request):
             if player.question_rate_currency + UPGRADE["rate_earn"] <= UPGRADE_BASE["rate_earn"] + (UPGRADE_RATE["rate_earn"] * (player.awake + 1)):
                 player.question_rate_currency += UPGRADE["rate_earn"]
 
-        for question in player_question:
-            question.max_currency = player.question_max_currency
-            question.rate = player.question_rate_currency
-            question.save()
+        if request.POST["upgrade"] in ("max_earn", "rate_earn"):
+            Question.objects.filter(owner=request.user).update(max_currency=player.question_max_currency,
+                                                               rate=player.question_rate_currency)
         messages.success(request, "Upgrade Successful.")
         logger.info(f'{str(datetime.now())}: {player.player_name}({player.pk}) has upgraded {request.POST["upgrade"]}')
     else:
@@ -1000,13 +1079,12 @@ def awake(request):
     :param request:
     :return:
     """
-    player = get_player(request.user)
-    inventory = get_inventory(player)
+    player = request.game.player
+    inventory = request.game.inventory
 
     event = random.random()
     price = int(request.POST["price"])
-    if player.currency >= price:
-        player.currency -= price
+    if spend(player, price):
         if event < 0.5 - (0.1 * player.awake):
             player.awake += UPGRADE["awake"]
             inventory.max_inventory += UPGRADE["inventory"]
@@ -1032,10 +1110,10 @@ class SelectItemsView(LoginRequiredMixin, generic.DetailView):
     @method_decorator(never_cache, name='self.get')
     def get(self, request):
         """Return Select items page."""
-        player = get_player(request.user)
-        inventory = get_inventory(player)
+        player = request.game.player
+        inventory = request.game.inventory
 
-        check_url = check_player_activity(player, ["index", "select_dg"])
+        check_url = check_player_activity(player, SELECT_ITEMS_ACTIVITIES)
         if check_url is not None:
             return redirect(check_url)
 
@@ -1048,9 +1126,9 @@ class SelectItemsView(LoginRequiredMixin, generic.DetailView):
         for key, val in inventory.get_inventory("dungeon").items():
             dungeon_item = item_list.get_item(key)
             dungeon_inventory.append([key, str(dungeon_item), val, dungeon_item.description, dungeon_item.effect])
-        dungeon_inventory_num = [len(inventory.get_inventory("dungeon")), inventory.max_inventory]
+        dungeon_inventory_num = [len(dungeon_inventory), inventory.max_inventory]
 
-        player.set_activity("select_dg")
+        player.set_activity(Activity.SELECT_DUNGEON)
         check_items = False
         return render(request, self.template_name, {"player": player,
                                                     "inventory": player_inventory, "check": check_items,
@@ -1065,39 +1143,12 @@ def select_items(request):
     :param request: HTML request
     :return:
     """
-    player = get_player(request.user)
-    inventory = get_inventory(player)
+    inventory = request.game.inventory
     amount = int(request.POST["amount"])
-    dungeon_inventory = inventory.get_inventory("dungeon")
-    player_current_inventory = inventory.get_inventory("player")
-    if len(dungeon_inventory) < inventory.max_inventory and request.POST["select"][-1] == "1":
-        item_id = int(request.POST["select"][:-1])
-        if player_current_inventory[item_id] - amount >= 0:
-            try:
-                dungeon_inventory[item_id] += amount
-                player_current_inventory[item_id] -= amount
-            except KeyError:
-                dungeon_inventory[item_id] = amount
-                player_current_inventory[item_id] -= amount
-        else:
-            messages.error(request, "You don't have that many items.")
-    elif request.POST["select"][-1] == "2":
-        item_id = int(request.POST["select"][:-1])
-        if dungeon_inventory[item_id] - amount >= 0:
-            try:
-                player_current_inventory[item_id] += amount
-                dungeon_inventory[item_id] -= amount
-            except KeyError:
-                player_current_inventory[item_id] = amount
-                dungeon_inventory[item_id] -= amount
-            inventory.update_inventory(dungeon_inventory, "dungeon")
-            inventory.update_inventory(player_current_inventory, "player")
-        else:
-            messages.error(request, "You don't have that many items.")
-    else:
+    item_id, target = int(request.POST["select"][:-1]), request.POST["select"][-1]
+    if target == "1" and not inventory.has_room(item_id):
         messages.error(request, "Your bag is full.")
-
-    inventory.update_inventory(dungeon_inventory, "dungeon")
-    inventory.update_inventory(player_current_inventory, "player")
+    elif not inventory.move_item(item_id, amount, "dungeon" if target == "1" else "player"):
+        messages.error(request, "You don't have that many items.")
 
     return redirect('qa_rpg:select_dg')